@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pandas import DataFrame
+
+from methods.changepoints.detection import detect_changepoints
+from objects.caching.result_cache import cached_result
+
+# Number of replicates evaluated together by each worker
+REPLICATE_CHUNK_SIZE = 50
+# The number of standard deviations spanned by each half of a 95% age interval
+AGE_INTERVAL_SIGMA = 1.959964
+
+
+def _record_arrays(dataset: DataFrame, value: str, lower: str, upper: str, age_lower: str, age_upper: str,
+                   start: float, end: float) -> dict[str, np.ndarray]:
+    # The samples of a record as sorted arrays, with their value and age uncertainties (zero where not given)
+    columns = ["age_ka", value] + [column for column in (lower, upper, age_lower, age_upper) if column is not None]
+    record = dataset[list(dict.fromkeys(columns))].dropna().sort_values(by="age_ka")
+    if start is not None:
+        record = record[record.age_ka >= start]
+    if end is not None:
+        record = record[record.age_ka <= end]
+    ages = record.age_ka.to_numpy(dtype=float)
+    values = record[value].to_numpy(dtype=float)
+    arrays = {"ages": ages, "values": values,
+              "below": values - record[lower].to_numpy(dtype=float) if lower else np.zeros_like(values),
+              "above": record[upper].to_numpy(dtype=float) - values if upper else np.zeros_like(values),
+              "age_sigma": np.zeros_like(ages)}
+    if age_lower and age_upper:
+        interval = record[age_upper].to_numpy(dtype=float) - record[age_lower].to_numpy(dtype=float)
+        arrays["age_sigma"] = interval / (2 * AGE_INTERVAL_SIGMA)
+    return arrays
+
+
+def _replicate_changepoints(arrays: dict[str, np.ndarray], n_replicates: int, value_error: float, fs: float,
+                            start: float, end: float, detection: dict, seed: np.random.SeedSequence) -> np.ndarray:
+    # Changepoint ages of a batch of perturbed replicates of one record, as an (n_replicates x n_bkps) array
+    rng = np.random.default_rng(seed)
+    shape = (n_replicates, len(arrays["values"]))
+
+    # -------------- PERTURB VALUES AND AGES --------------
+    z = rng.standard_normal(shape)
+    values = arrays["values"] + np.where(z < 0, z * arrays["below"], z * arrays["above"])
+    values = values + value_error * rng.standard_normal(shape)
+    ages = arrays["ages"] + arrays["age_sigma"] * rng.standard_normal(shape)
+    # Keep the samples in stratigraphic order
+    order = np.argsort(ages, axis=1, kind="stable")
+    ages = np.take_along_axis(ages, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+
+    # -------------- DETECT --------------
+    n_bkps = detection.get("n_bkps", 1)
+    changepoints = np.full((n_replicates, n_bkps), np.nan)
+    grid = np.arange(start, end, fs) if fs is not None else None
+    for i in range(n_replicates):
+        if grid is not None:
+            signal, signal_ages = np.interp(grid, ages[i], values[i]), grid
+        else:
+            signal, signal_ages = values[i], ages[i]
+        span = signal.max() - signal.min()
+        signal = (signal - signal.min()) / span if span > 0 else signal - signal.min()
+        found = signal_ages[detect_changepoints(signal, cache=False, **detection)]
+        changepoints[i, :len(found)] = found[:n_bkps]
+    return changepoints
+
+
+@cached_result(ignore=("workers",))
+def bootstrap_changepoints(dataset: DataFrame, value: str, lower: str = None, upper: str = None,
+                           age_lower: str = None, age_upper: str = None, value_error: float = 0.0,
+                           n_replicates: int = 1000, n_bkps: int = 1, model: str = "rbf", fs: float = None,
+                           start: float = None, end: float = None, seed: int = 0, workers: int = None,
+                           **detection) -> DataFrame:
+    """
+    Sample the uncertainty of the changepoints of a record by perturbing it within its uncertainties.
+
+    Parameters:
+    - dataset (pandas.DataFrame): The record, with an 'age_ka' column.
+    - value (str): The column holding the values (e.g. 'temp' or 'd18O_unadj').
+    - lower (str, optional): The column of the lower 1 sigma bound of the values (e.g. 'temp_min1').
+    - upper (str, optional): The column of the upper 1 sigma bound of the values (e.g. 'temp_plus1').
+    - age_lower (str, optional): The column of the lower 95% bound of the ages (e.g. 'lower95_age').
+    - age_upper (str, optional): The column of the upper 95% bound of the ages (e.g. 'upper95_age').
+    - value_error (float, optional): A further 1 sigma uncertainty of every value, e.g. analytical (default: 0).
+    - n_replicates (int, optional): The number of replicates (default: 1000).
+    - n_bkps (int, optional): The number of changepoints in each replicate (default: 1).
+    - model (str, optional): The segment cost of detect_changepoints (default: 'rbf').
+    - fs (float, optional): Interpolate each replicate onto an even grid with this spacing in ka, as for the d18O
+      changepoints; the samples are used directly when not given (default: None).
+    - start (float, optional): The youngest age used (default: the whole record).
+    - end (float, optional): The oldest age used (default: the whole record).
+    - seed (int, optional): The seed of the replicates; the same seed gives the same result for any number of workers
+      (default: 0).
+    - workers (int, optional): The number of worker processes, or 1 to run in this process (default: all cores).
+    - detection: Any further arguments for detect_changepoints (e.g. min_size).
+
+    Returns:
+    - pandas.DataFrame: One row per replicate with the ages of its changepoints ('changepoint_1', 'changepoint_2', ...).
+
+    Each replicate draws every value from a split normal distribution between its 1 sigma bounds and every age from a
+    normal distribution matching its 95% interval, re-sorts the samples by age and detects the changepoints again. The
+    replicates run in batches across a process pool, each batch with its own seed spawned from 'seed'.
+    """
+    # -------------- CHECK INPUTS --------------
+    if (lower is None) != (upper is None) or (age_lower is None) != (age_upper is None):
+        raise ValueError("Bounds must be given as lower and upper pairs")
+    if n_replicates < 1:
+        raise ValueError("At least one replicate is required")
+    arrays = _record_arrays(dataset, value, lower, upper, age_lower, age_upper, start, end)
+    if fs is not None:
+        start = arrays["ages"].min() if start is None else start
+        end = arrays["ages"].max() if end is None else end
+    detection = {**detection, "n_bkps": n_bkps, "model": model}
+
+    # -------------- REPLICATES ----------------
+    sizes = [min(REPLICATE_CHUNK_SIZE, n_replicates - first) for first in range(0, n_replicates, REPLICATE_CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(arrays, size, value_error, fs, start, end, detection, chunk_seed)
+                 for size, chunk_seed in zip(sizes, seeds)]
+    if workers == 1 or len(arguments) == 1:
+        chunks = [_replicate_changepoints(*chunk) for chunk in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_replicate_changepoints, *zip(*arguments)))
+    changepoints = np.concatenate(chunks, axis=0)
+    return DataFrame(changepoints, columns=[f"changepoint_{i + 1}" for i in range(n_bkps)])
+
+
+def changepoint_posterior(replicates: DataFrame, bin_width: float = 2.0) -> DataFrame:
+    """
+    The histogram of the changepoint ages of bootstrap_changepoints.
+
+    Parameters:
+    - replicates (pandas.DataFrame): The output of bootstrap_changepoints.
+    - bin_width (float, optional): The width of the age bins in ka (default: 2).
+
+    Returns:
+    - pandas.DataFrame: The centre of each age bin ('age_ka') with, for each changepoint, the number of replicates in the
+      bin ('count_1', ...) and their share of all replicates ('probability_1', ...).
+    """
+    values = replicates.to_numpy(dtype=float)
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return DataFrame(columns=["age_ka"])
+    edges = np.arange(np.floor(finite.min() / bin_width) * bin_width, finite.max() + bin_width, bin_width)
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0] + bin_width])
+    posterior = {"age_ka": (edges[:-1] + edges[1:]) / 2}
+    for i in range(values.shape[1]):
+        counts, _ = np.histogram(values[:, i][np.isfinite(values[:, i])], bins=edges)
+        posterior[f"count_{i + 1}"] = counts
+        posterior[f"probability_{i + 1}"] = counts / len(values)
+    return DataFrame(posterior)
@@ -1,7 +1,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import ruptures as rpt
 
+from methods.changepoints.detection import detect_changepoints
 from methods.interpolations.generate_interpolations import generate_interpolation
 from objects.arguments.args_Nature import colours as clr
 from objects.core_data.isotopes import iso_1208, iso_1209
@@ -19,16 +19,12 @@ def find_change_point(dataset, value, n=1, known_bkps=False):
 
     data_array = normalise_array(data_array)
 
-    # Detect the change-point or points
+    # Detect the change-point or points (a known number, or with a penalty of n otherwise)
     if known_bkps:
-        algo = rpt.Dynp(model="rbf").fit(data_array)
-        result = algo.predict(n_bkps=n)
+        result = detect_changepoints(data_array, n_bkps=n, model="rbf")
     else:
-        algo = rpt.Pelt(model="rbf").fit(data_array)
-        result = algo.predict(pen=n)
+        result = detect_changepoints(data_array, penalty=n, model="rbf")
 
-    # Remove the final element
-    result.pop(-1)
     # Save the change-point (or points)
     changepoint = time_array[result]
 
@@ -38,16 +34,12 @@ def find_change_point(dataset, value, n=1, known_bkps=False):
 def change_points_interp(data_array, time_array, known_bkp=True, n=1):
     data_array = normalise_array(data_array)
 
-    # Detect the change-point or points
+    # Detect the change-point or points (a known number, or with a penalty of n otherwise)
     if known_bkp:
-        algo = rpt.Dynp(model="rbf").fit(data_array)
-        result = algo.predict(n_bkps=n)
+        result = detect_changepoints(data_array, n_bkps=n, model="rbf")
     else:
-        algo = rpt.Pelt(model="rbf").fit(data_array)
-        result = algo.predict(pen=n)
+        result = detect_changepoints(data_array, penalty=n, model="rbf")
 
-    # Remove the final element
-    result.pop(-1)
     # Save the change-point (or points)
     changepoint = time_array[result]
 
@@ -0,0 +1,255 @@
+import numpy as np
+
+from objects.caching.hashing import hash_array
+
+# The segment cost models: a change in mean ('l2'), a change in mean and variance ('normal') and a kernel change
+# ('rbf', as ruptures' CostRbf)
+COST_MODELS = ("l2", "normal", "rbf")
+# Largest series searched at once; longer series are decimated for the search and the changepoints then refined
+MAX_SEARCH_POINTS = 2000
+# Bounds of the scaled squared distances in the 'rbf' kernel, clipped as ruptures' CostRbf does to avoid exponential
+# under- and overflow
+RBF_CLIP = (1e-2, 1e2)
+# The bias added to the variance of every segment by the 'normal' cost, as ruptures' CostNormal
+NORMAL_BIAS = 1e-6
+# Number of fitted costs and of detections kept in memory
+COST_CACHE_SIZE = 16
+DETECTION_CACHE_SIZE = 64
+_FITTED_COSTS = {}
+_DETECTIONS = {}
+
+
+def _remember(cache: dict, size: int, key: tuple, value):
+    # Keep a value in one of the FIFO caches of this module
+    if len(cache) >= size:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+    return value
+
+
+def _rbf_gamma(signal: np.ndarray) -> float:
+    # The median heuristic of ruptures' CostRbf, 1 / median of the squared distances between samples. Every distance
+    # appears twice in the full matrix, which leaves the median unchanged, and the n zeros of the diagonal sort first
+    n = len(signal)
+    if n < 2:
+        return 1.0
+    squared = np.square(signal[:, None] - signal[None, :]).ravel()
+    middle = n + (n * (n - 1)) // 2
+    squared.partition([middle - 1, middle])
+    median = squared[middle - 1:middle + 1].mean()
+    return 1.0 / median if median > 0 else 1.0
+
+
+def fit_cost(signal: np.ndarray, model: str = "l2", gamma: float = None, cache: bool = True) -> dict:
+    """
+    Fit a segment cost to a signal, so that the cost of any segment can be read in constant time.
+
+    Parameters:
+    - signal (numpy.ndarray): The 1-D signal.
+    - model (str, optional): One of COST_MODELS (default: 'l2').
+    - gamma (float, optional): The bandwidth of the 'rbf' kernel (default: the median heuristic).
+    - cache (bool, optional): Keep the fitted cost for later calls (default: True).
+
+    Returns:
+    - dict: The model and its cumulative sums; prefix sums of the signal and its square for 'l2' and 'normal', and the
+      two-dimensional prefix sums of the kernel Gram matrix for 'rbf'.
+
+    Fitted costs are cached by a hash of the signal, so refitting the same series is free.
+    """
+    if model not in COST_MODELS:
+        raise ValueError(f"Model must be one of {', '.join(COST_MODELS)}")
+    signal = np.asarray(signal, dtype=float)
+    key = (hash_array(signal), model, gamma)
+    if key in _FITTED_COSTS:
+        return _FITTED_COSTS[key]
+
+    if model == "rbf":
+        gamma = _rbf_gamma(signal) if gamma is None else gamma
+        # As ruptures, the scaled distances between different samples are clipped and the diagonal kept at 1
+        scaled = np.clip(gamma * np.square(signal[:, None] - signal[None, :]), *RBF_CLIP)
+        np.fill_diagonal(scaled, 0.0)
+        gram = np.exp(-scaled)
+        prefix = np.zeros((len(signal) + 1, len(signal) + 1))
+        prefix[1:, 1:] = gram.cumsum(axis=0).cumsum(axis=1)
+        fitted = {"model": model, "prefix": prefix}
+    else:
+        fitted = {"model": model,
+                  "sum": np.concatenate(([0.0], np.cumsum(signal))),
+                  "square": np.concatenate(([0.0], np.cumsum(np.square(signal))))}
+    return _remember(_FITTED_COSTS, COST_CACHE_SIZE, key, fitted) if cache else fitted
+
+
+def segment_costs(fitted: dict, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    The costs of the segments [start, end) of a fitted signal, for broadcastable arrays of starts and ends.
+    """
+    starts, ends = np.asarray(starts), np.asarray(ends)
+    length = (ends - starts).astype(float)
+    if fitted["model"] == "rbf":
+        prefix = fitted["prefix"]
+        # The diagonal of the Gram matrix is 1, so the segment cost is its length less its mean kernel sum
+        return length - (prefix[ends, ends] - 2 * prefix[starts, ends] + prefix[starts, starts]) / length
+    total = fitted["sum"][ends] - fitted["sum"][starts]
+    square = fitted["square"][ends] - fitted["square"][starts]
+    if fitted["model"] == "l2":
+        return square - np.square(total) / length
+    # As ruptures' CostNormal, a small bias keeps the cost of constant segments (e.g. repeated values) finite
+    variance = np.maximum(square / length - np.square(total / length), 0.0) + NORMAL_BIAS
+    return length * np.log(variance)
+
+
+def _optimal_partition(fitted: dict, n: int, n_bkps: int, min_size: int) -> list[int]:
+    # Exact dynamic programme for the best split into n_bkps + 1 segments of at least min_size samples
+    ends = np.arange(n + 1)
+    best = np.full((n_bkps + 1, n + 1), np.inf)
+    previous = np.zeros((n_bkps + 1, n + 1), dtype=int)
+    best[0, min_size:] = segment_costs(fitted, 0, ends[min_size:])
+    for k in range(1, n_bkps + 1):
+        # The last split is only needed for the whole series
+        for end in (range((k + 1) * min_size, n + 1) if k < n_bkps else [n]):
+            starts = ends[(k * min_size):(end - min_size + 1)]
+            totals = best[k - 1, starts] + segment_costs(fitted, starts, end)
+            choice = np.argmin(totals)
+            best[k, end] = totals[choice]
+            previous[k, end] = starts[choice]
+    breakpoints = [n]
+    for k in range(n_bkps, 0, -1):
+        breakpoints.append(previous[k, breakpoints[-1]])
+    return sorted(breakpoints[1:])
+
+
+def _penalised_partition(fitted: dict, n: int, penalty: float, min_size: int) -> list[int]:
+    # PELT: the best split for a penalty per changepoint, pruning starts that can never be optimal
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    previous = np.zeros(n + 1, dtype=int)
+    candidates = np.array([0])
+    for end in range(min_size, n + 1):
+        usable = candidates[candidates <= end - min_size]
+        totals = best[usable] + segment_costs(fitted, usable, end) + penalty
+        choice = np.argmin(totals)
+        best[end] = totals[choice]
+        previous[end] = usable[choice]
+        # Starts that cannot beat the best split up to here can never be part of a later best split
+        keep = (totals - penalty) <= best[end]
+        candidates = np.concatenate((usable[keep], candidates[candidates > end - min_size], [end]))
+    breakpoints = []
+    end = n
+    while end > 0:
+        end = previous[end]
+        if end > 0:
+            breakpoints.append(end)
+    return sorted(breakpoints)
+
+
+def _decimate(signal: np.ndarray, factor: int) -> np.ndarray:
+    # Block means of 'factor' samples (the last block may be shorter)
+    starts = np.arange(0, len(signal), factor)
+    return np.add.reduceat(signal, starts) / np.diff(np.append(starts, len(signal)))
+
+
+def _refine(signal: np.ndarray, breakpoints: list[int], model: str, gamma: float, radius: int,
+            min_size: int, cache: bool) -> list[int]:
+    # Move each coarse changepoint to the best full resolution position within 'radius' samples of it
+    n = len(signal)
+    refined = list(breakpoints)
+    fitted = fit_cost(signal, model, gamma, cache) if model != "rbf" else None
+    for i, breakpoint in enumerate(refined):
+        left = refined[i - 1] if i > 0 else 0
+        right = refined[i + 1] if i + 1 < len(refined) else n
+        positions = np.arange(max(breakpoint - radius, left + min_size), min(breakpoint + radius, right - min_size) + 1)
+        if len(positions) == 0:
+            continue
+        if model == "rbf":
+            # The kernel cost is only fitted over the neighbourhood, which keeps the Gram matrix small
+            low, high = max(left, breakpoint - 2 * radius), min(right, breakpoint + 2 * radius)
+            positions = positions[(positions > low) & (positions < high)]
+            if len(positions) == 0:
+                continue
+            local = fit_cost(signal[low:high], model, gamma, cache=False)
+            costs = segment_costs(local, 0, positions - low) + segment_costs(local, positions - low, high - low)
+        else:
+            costs = segment_costs(fitted, left, positions) + segment_costs(fitted, positions, right)
+        refined[i] = int(positions[np.argmin(costs)])
+    return refined
+
+
+def detect_changepoints(signal: np.ndarray, n_bkps: int = 1, penalty: float = None, model: str = "l2",
+                        min_size: int = 2, decimate: int = None, radius: int = None, gamma: float = None,
+                        cache: bool = True) -> np.ndarray:
+    """
+    Detect changepoints in an evenly spaced signal.
+
+    Parameters:
+    - signal (numpy.ndarray): The 1-D signal.
+    - n_bkps (int, optional): The number of changepoints, found by an exact dynamic programme (default: 1).
+    - penalty (float, optional): Detect an unknown number of changepoints with PELT at this penalty per changepoint,
+      instead of a fixed number (default: None). The penalty is that of the full resolution series: PELT searches
+      every sample for the 'l2' and 'normal' costs, and for 'rbf' the kernel bandwidth is refitted to the block
+      means, which keeps the costs of the decimated series on the full resolution scale.
+    - model (str, optional): The segment cost, one of COST_MODELS (default: 'l2').
+    - min_size (int, optional): The fewest samples in a segment (default: 2).
+    - decimate (int, optional): Search block means of this many samples, then refine at full resolution
+      (default: just enough for the searched series to have at most MAX_SEARCH_POINTS samples). Not used by PELT
+      with the 'l2' and 'normal' costs.
+    - radius (int, optional): The distance, in samples, over which each changepoint is refined
+      (default: twice the decimation).
+    - gamma (float, optional): The bandwidth of the 'rbf' kernel (default: the median heuristic).
+    - cache (bool, optional): Keep the fitted cost and the result for later calls; turn off for one-off signals such
+      as resampled replicates (default: True).
+
+    Returns:
+    - numpy.ndarray: The indices at which each new segment starts, as returned by ruptures without the final index.
+
+    The 'l2' and 'normal' segment costs come from prefix sums, so every segment costs O(1) and the whole series never
+    needs a Gram matrix. The 'rbf' cost does need one, which the coarse search keeps to at most MAX_SEARCH_POINTS
+    squared. Fitted costs and detections are both cached by a hash of the signal.
+
+    Every position is a candidate changepoint, as in ruptures with jump=1; ruptures' default of jump=5 only considers
+    every fifth sample, so its results match these only when run with jump=1.
+    """
+    # -------------- CHECK INPUTS --------------
+    signal = np.asarray(signal, dtype=float)
+    if signal.ndim != 1:
+        raise ValueError("The signal must be one dimensional")
+    if np.isnan(signal).any():
+        raise ValueError("The signal must not contain missing values")
+    if penalty is None and len(signal) < (n_bkps + 1) * min_size:
+        raise ValueError("The signal is too short for the number of changepoints")
+    if penalty is not None and model != "rbf":
+        # PELT prunes most starts and needs no Gram matrix for these costs, so it searches every sample. Block means
+        # would also shrink the variance of short segments, which the 'normal' cost rewards with spurious changepoints
+        decimate = 1
+    if decimate is None:
+        decimate = max(1, int(np.ceil(len(signal) / MAX_SEARCH_POINTS)))
+    if radius is None:
+        radius = 2 * decimate
+    key = (hash_array(signal), n_bkps, penalty, model, min_size, decimate, radius, gamma)
+    if cache and key in _DETECTIONS:
+        return _DETECTIONS[key].copy()
+
+    # -------------- COARSE SEARCH --------------
+    coarse = _decimate(signal, decimate) if decimate > 1 else signal
+    coarse_size = max(1, -(-min_size // decimate))
+    if model == "rbf" and gamma is None:
+        # One bandwidth for the search and the refinement
+        gamma = _rbf_gamma(coarse)
+    fitted = fit_cost(coarse, model, gamma, cache)
+    if penalty is None:
+        breakpoints = _optimal_partition(fitted, len(coarse), n_bkps, coarse_size)
+    else:
+        breakpoints = _penalised_partition(fitted, len(coarse), penalty, coarse_size)
+
+    # -------------- REFINE AT FULL RESOLUTION --------------
+    breakpoints = [min(breakpoint * decimate, len(signal) - min_size) for breakpoint in breakpoints]
+    if decimate > 1 and breakpoints:
+        breakpoints = _refine(signal, breakpoints, model, gamma, radius, min_size, cache)
+    breakpoints = np.array(breakpoints, dtype=int)
+    return _remember(_DETECTIONS, DETECTION_CACHE_SIZE, key, breakpoints).copy() if cache else breakpoints
+
+
+def changepoint_ages(ages: np.ndarray, signal: np.ndarray, **kwargs) -> np.ndarray:
+    """
+    The ages of the changepoints of a signal, with the arguments of detect_changepoints.
+    """
+    return np.asarray(ages)[detect_changepoints(signal, **kwargs)]
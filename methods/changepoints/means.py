@@ -1,5 +1,8 @@
 import matplotlib.pyplot as plt
+import numpy as np
+from pandas import DataFrame
 
+from methods.changepoints.bootstrap import bootstrap_changepoints
 from methods.changepoints.age_split import age_split, plot_split
 from objects.core_data.isotopes import iso_1209, iso_1208
 from objects.core_data.psu import psu_1208, psu_1209
@@ -133,6 +136,30 @@ def change_points_mean(save_fig: bool = False):
         plt.show()
 
 
+def change_points_uncertainty(n_replicates: int = 1000, workers: int = None) -> DataFrame:
+    """
+    Bootstrap the uncertainty of the BWT and d18O changepoints of 1208 and 1209.
+    :param n_replicates: number of replicates of each record
+    :param workers: number of worker processes (default: all cores)
+    :return: the median changepoint of each record with its 68% and 95% intervals
+    """
+    records = {
+        "1208 BWT": dict(dataset=psu_1208, value="temp", lower="temp_min1", upper="temp_plus1"),
+        "1209 BWT": dict(dataset=psu_1209[psu_1209.age_ka < 2900], value="temp", lower="temp_min1",
+                         upper="temp_plus1"),
+        "1208 d18O": dict(dataset=iso_1208, value="d18O_unadj", age_lower="age_lower95", age_upper="age_upper95",
+                          fs=1.0, start=2400, end=3400),
+        "1209 d18O": dict(dataset=iso_1209, value="d18O_unadj", age_lower="lower95_age", age_upper="upper95_age",
+                          fs=1.0, start=2400, end=3400),
+    }
+    summary = []
+    for label, record in records.items():
+        changepoints = bootstrap_changepoints(n_replicates=n_replicates, workers=workers, **record).changepoint_1
+        quantiles = np.nanquantile(changepoints, [0.025, 0.16, 0.5, 0.84, 0.975])
+        summary.append({"record": label, "changepoint": quantiles[2], "lower68": quantiles[1], "upper68": quantiles[3],
+                        "lower95": quantiles[0], "upper95": quantiles[4]})
+    return DataFrame(summary)
+
 
 def bayesian_changepoint(save_fig: bool = False) -> None:
 
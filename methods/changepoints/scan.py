@@ -0,0 +1,146 @@
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from methods.changepoints.detection import detect_changepoints
+from objects.caching.columnar import ROOT, hash_file
+from objects.caching.result_cache import _code_files, _source_hash
+
+# The directories scanned for site records, and the cache of per-record results
+RECORD_DIRECTORIES = (ROOT / "data" / "cores", ROOT / "data" / "comparisons")
+SCAN_CACHE_DIRECTORY = ROOT / "data" / ".cache" / "changepoint_scan"
+# The PlioVAR compilation, which supplies the position and depth of the sites it includes
+PLIOVAR_FILE = ROOT / "data" / "comparisons" / "PlioVAR_changepoints.csv"
+PLIOVAR_COLUMNS = ["name", "latitude", "longitude", "depth", "changepoint", "ocean"]
+# The columns scanned in each record, in order of preference
+VALUE_COLUMNS = ("d18O_unadj", "d18O", "temp", "SST")
+# The fewest samples a record needs within the scanned interval
+MIN_SAMPLES = 20
+
+
+def site_name(path: Path) -> str:
+    """
+    The site of a record file, e.g. '1208' for '1208_cibs.csv' or 'planktics_1208A.csv' and 'U1313' for
+    'U1313_te.csv'. Files without a site number (e.g. 'LR04.csv') are named by their first word.
+    """
+    stem = Path(path).stem
+    match = re.search(r"U?\d{3,4}", stem)
+    return match.group(0) if match else stem.split("_")[0]
+
+
+def find_records(directories: tuple[Path, ...] = RECORD_DIRECTORIES,
+                 values: tuple[str, ...] = VALUE_COLUMNS) -> dict[Path, str]:
+    """
+    Every CSV file under 'directories' with an 'age_ka' column and one of 'values', mapped to the first of those values
+    it holds.
+    """
+    records = {}
+    for directory in directories:
+        for path in sorted(Path(directory).rglob("*.csv")):
+            try:
+                columns = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+            except (ValueError, UnicodeDecodeError):
+                continue
+            value = next((column for column in values if column in columns), None)
+            if "age_ka" in columns and value is not None:
+                records[path] = value
+    return records
+
+
+def _scan_record(path: Path, value: str, start: float, end: float, fs: float, detection: dict) -> dict:
+    # The changepoint of one record, interpolated onto an even grid over the part of the interval it covers
+    record = pd.read_csv(path, encoding="utf-8-sig")[["age_ka", value]].apply(pd.to_numeric, errors="coerce")
+    record = record.dropna().sort_values(by="age_ka").drop_duplicates(subset="age_ka")
+    record = record[record.age_ka.between(start, end)]
+    result = {"record": str(Path(path).relative_to(ROOT)), "value": value, "samples": len(record),
+              "age_min": np.nan, "age_max": np.nan, "changepoint": np.nan}
+    if len(record) < MIN_SAMPLES:
+        return result
+    ages = record.age_ka.to_numpy(dtype=float)
+    grid = np.arange(np.ceil(ages.min() / fs) * fs, ages.max(), fs)
+    signal = np.interp(grid, ages, record[value].to_numpy(dtype=float))
+    span = signal.max() - signal.min()
+    signal = (signal - signal.min()) / span if span > 0 else signal - signal.min()
+    changepoints = grid[detect_changepoints(signal, cache=False, **detection)]
+    result.update(age_min=ages.min(), age_max=ages.max(),
+                  changepoint=float(changepoints[0]) if len(changepoints) else np.nan)
+    return result
+
+
+def scan_changepoints(records: dict[Path, str] = None, start: float = 2200, end: float = 3600, fs: float = 1.0,
+                      workers: int = None, directory: Path = SCAN_CACHE_DIRECTORY, output: str = None,
+                      **detection) -> DataFrame:
+    """
+    Detect the changepoint of many site records and tabulate them in the schema of the PlioVAR compilation.
+
+    Parameters:
+    - records (dict, optional): The record files, each mapped to the column to scan (default: find_records()).
+    - start (float, optional): The youngest age scanned in ka (default: 2200).
+    - end (float, optional): The oldest age scanned in ka (default: 3600).
+    - fs (float, optional): The spacing in ka of the grid each record is interpolated onto (default: 1).
+    - workers (int, optional): The number of worker processes, or 1 to run in this process (default: all cores).
+    - directory (Path, optional): The cache of per-record results (default: data/.cache/changepoint_scan).
+    - output (str, optional): A CSV file to write the table to (default: not written).
+    - detection: Any further arguments for detect_changepoints (default: one changepoint with the 'rbf' cost, as in
+      changepoint.py).
+
+    Returns:
+    - pandas.DataFrame: One row per record with the PlioVAR columns ('name', 'latitude', 'longitude', 'depth',
+      'changepoint', 'ocean') followed by the record file, the scanned column, its number of samples and the ages it
+      covers. Position, depth and ocean come from PlioVAR_changepoints.csv for the sites it includes and are left
+      empty otherwise.
+
+    Each result is cached under a hash of the record file, the scan parameters and the code of the scan (this module,
+    detection.py and the helpers they call), so adding or changing a record only scans that record. The remaining
+    records are spread across a process pool.
+    """
+    if records is None:
+        records = find_records()
+    detection = {"n_bkps": 1, "model": "rbf", **detection}
+    parameters = json.dumps({"start": start, "end": end, "fs": fs, **detection}, sort_keys=True)
+    # The code files of the scan, found as for cached_result, so that a change in the detection rescans every record
+    code = "".join(_source_hash(path) for path in _code_files(_scan_record))
+    directory = Path(directory)
+
+    # -------------- READ CACHED RESULTS --------------
+    results = {}
+    pending = []
+    for path, value in records.items():
+        key = hashlib.sha1(f"{hash_file(path)}{value}{parameters}{code}".encode()).hexdigest()
+        try:
+            results[path] = json.loads((directory / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            pending.append((key, path, value))
+
+    # -------------- SCAN NEW RECORDS --------------
+    arguments = [(path, value, start, end, fs, detection) for _, path, value in pending]
+    if workers == 1 or len(arguments) <= 1:
+        scanned = [_scan_record(*record) for record in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scanned = list(executor.map(_scan_record, *zip(*arguments)))
+    directory.mkdir(parents=True, exist_ok=True)
+    for (key, path, _), result in zip(pending, scanned):
+        (directory / f"{key}.json").write_text(json.dumps(result))
+        results[path] = result
+
+    # -------------- PLIOVAR TABLE --------------
+    table = DataFrame([{"site": site_name(path), **results[path]} for path in records])
+    pliovar = pd.read_csv(PLIOVAR_FILE, encoding="utf-8-sig")
+    pliovar["site"] = pliovar.name.str.replace(r"^(ODP|DSDP|IODP)", "", regex=True)
+    table = table.merge(pliovar.drop(columns="changepoint"), on="site", how="left")
+    table["name"] = table.name.fillna(table.site)
+    table = table[PLIOVAR_COLUMNS + ["record", "value", "samples", "age_min", "age_max"]]
+    if output is not None:
+        table.to_csv(output, index=False)
+    return table
+
+
+if __name__ == "__main__":
+    print(scan_changepoints().to_string())
@@ -5,7 +5,7 @@ import numpy as np
 import pandas as pd
 from matplotlib.ticker import AutoMinorLocator
 
-from methods.interpolations.generate_interpolations import generate_interpolation
+from methods.interpolations.generate_interpolations import stack_interpolate
 from objects.arguments.colours import colours_04
 
 
@@ -17,7 +17,9 @@ def plot_sst_error_bars(ax: plt.Axes, datafile: pd.DataFrame, label: str = None,
 
 
 def add_trendlines(ax: plt.Axes, age_array, value_array, colour=colours_04[0]):
-    trendline = np.polyfit(age_array, value_array, 1)
+    # Fit only the ages the records cover
+    covered = np.isfinite(value_array)
+    trendline = np.polyfit(age_array[covered], value_array[covered], 1)
     plotline = np.poly1d(trendline)
     # add trend line to plot
     ax.plot(age_array, plotline(age_array), label=None, marker=None, color=colour, ls=":")
@@ -36,11 +38,9 @@ def show_sst_gradients(save_fig: bool = False, min_age: int = 2200, max_age: int
     sst_1208 = pd.read_csv("data/comparisons/alkenones/1208_alkenones.csv")
 
     # -------- INTERPOLATE DATA ------------
-    interp_846, age_array = generate_interpolation(sst_846, fs=1.0, start=min_age, end=max_age, pchip=False,
-                                                   value="temp")
-    interp_1012, _ = generate_interpolation(sst_1012, fs=1.0, start=min_age, end=max_age, pchip=False, value="temp")
-    interp_1417, _ = generate_interpolation(sst_1417, fs=1.0, start=min_age, end=max_age, pchip=False, value="temp")
-    interp_1208, _ = generate_interpolation(sst_1208, fs=1.0, start=min_age, end=max_age, pchip=False, value="temp")
+    age_array = np.arange(min_age, max_age, 1.0)
+    interp_846, interp_1012, interp_1417, interp_1208 = stack_interpolate(
+        {"846": sst_846, "1012": sst_1012, "1417": sst_1417, "1208": sst_1208}, value="temp", grid=age_array)
 
     # -------- DEFINE PLOT AREA -------------
     num_plots = 2
@@ -15,13 +15,8 @@ def plot_all_densities(save_fig: bool = False) -> None:
     # Generate the density plot
     ax = density_plot(min_sal=30, max_sal=36, min_temp=-3, max_temp=4, lv=10)
 
-    sal_1209 = []
-    for i in range(len(psu_1209.d18O_sw.values)):
-        sal_1209.append(full_inverse_salinity(psu_1209.d18O_sw.values[i], psu_1209.age_ka.values[i], mod_d18O_sw_1209, mod_sal_1209))
-
-    sal_1208 = []
-    for i in range(len(psu_1208.d18O_sw.values)):
-        sal_1208.append(full_inverse_salinity(psu_1208.d18O_sw.values[i], psu_1208.age_ka.values[i], mod_d18O_sw_1208, mod_sal_1208))
+    sal_1209 = full_inverse_salinity(psu_1209.d18O_sw.values, psu_1209.age_ka.values, mod_d18O_sw_1209, mod_sal_1209)
+    sal_1208 = full_inverse_salinity(psu_1208.d18O_sw.values, psu_1208.age_ka.values, mod_d18O_sw_1208, mod_sal_1208)
 
 
     ax.scatter(sal_1208, psu_1208.temp.values, c=colours[0], marker='+')
@@ -131,13 +131,8 @@ def plot_densities(save_fig: bool = False):
     ax.scatter(mod_sal_1209, mod_temp_1209, marker='D', label='1209 (Modern)', color=colour[1], s=marker_size)
     ax.scatter(sal_ct_1209, bwt_ct_1209, marker='s', color=colour[1], label='1209 (Holocene)', s=marker_size)
 
-    sal_1209 = []
-    for i in range(len(psu_1209.d18O_sw.values)):
-        sal_1209.append(full_inverse_salinity(psu_1209.d18O_sw.values[i], psu_1209.age_ka.values[i], mod_d18O_sw_1209, mod_sal_1209))
-
-    sal_1208 = []
-    for i in range(len(psu_1208.d18O_sw.values)):
-        sal_1208.append(full_inverse_salinity(psu_1208.d18O_sw.values[i], psu_1208.age_ka.values[i], mod_d18O_sw_1208, mod_sal_1208))
+    sal_1209 = full_inverse_salinity(psu_1209.d18O_sw.values, psu_1209.age_ka.values, mod_d18O_sw_1209, mod_sal_1209)
+    sal_1208 = full_inverse_salinity(psu_1208.d18O_sw.values, psu_1208.age_ka.values, mod_d18O_sw_1208, mod_sal_1208)
 
     # ax.scatter(sal_1208, psu_1208.temp.values, c=colour[0], marker='+', alpha=0.25)
     # ax.scatter(sal_1209, psu_1209.temp.values, c=colour[1], marker='+', alpha=0.25)
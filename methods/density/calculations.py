@@ -1,6 +1,9 @@
+from functools import lru_cache
+
 import matplotlib.pyplot as plt
+import numpy as np
 
-from objects.misc.sea_level import sea_level
+from objects.misc import sea_level as sea_level_record
 
 '''
 Full Inverse Salinity
@@ -12,23 +15,58 @@ d18Osw_t = d18Osw_orig - d18Osw_iv
 
 '''
 
+# The columns of the sea level record used in the salinity corrections
+SEA_LEVEL_COLUMNS = ("SL_m", "d18Ow_IV")
 
 
+@lru_cache(maxsize=1)
+def _sea_level_table() -> tuple[int, dict[str, np.ndarray]]:
+    # A dense copy of the sea level record with one entry per ka, so that an age maps straight onto its position
+    sea_level = sea_level_record.sea_level
+    ages = np.rint(sea_level.age_ka.to_numpy(dtype=float)).astype(int)
+    first = ages.min()
+    table = {}
+    for column in SEA_LEVEL_COLUMNS:
+        values = np.full((ages.max() - first + 1), np.nan)
+        values[ages - first] = sea_level[column].to_numpy(dtype=float)
+        table[column] = values
+    return first, table
 
 
-
-def age_d18o_correction(d18o_sw: float, age: float) -> float:
+def sea_level_lookup(age: float | np.ndarray, column: str = "SL_m", interpolate: bool = False) -> float | np.ndarray:
+    """
+    Looks up the sea level record from Rohling et al., 2021 at any number of ages at once.
+    :param age: Age, or array of ages, of the measurements
+    :param column: The column of the sea level record, either 'SL_m' or 'd18Ow_IV'
+    :param interpolate: Interpolate linearly between the 1 ka steps rather than use the nearest age
+    :return: The value of the record at each age (NaN outside the record)
+    """
+    if column not in SEA_LEVEL_COLUMNS:
+        raise ValueError(f"Column must be one of {', '.join(SEA_LEVEL_COLUMNS)}")
+    first, table = _sea_level_table()
+    values = table[column]
+    age = np.asarray(age, dtype=float)
+    if interpolate:
+        result = np.interp(age, np.arange(first, first + len(values)), values, left=np.nan, right=np.nan)
+    else:
+        # The sea level database stores ages as floats to the nearest 1 ka, and np.rint rounds halves to even like round
+        index = np.rint(age) - first
+        inside = (index >= 0) & (index < len(values))
+        result = np.where(inside, values[np.where(inside, index, 0).astype(int)], np.nan)
+    return result[()]
+
+
+def age_d18o_correction(d18o_sw: float | np.ndarray, age: float | np.ndarray,
+                        interpolate: bool = False) -> float | np.ndarray:
     """
     Calculates the offset d18O_sw based on the global sea level change in d18O_sw from Rohling et al., 2021.
     :param d18o_sw: Current d18O_sw
     :param age: Age of the measurement
+    :param interpolate: Interpolate the sea level record rather than use the nearest 1 ka
     :return: Adjusted d18O_sw
     """
-    # The sea level database stores ages as floats to the nearest 1 ka.
-    age_round = round(age)
     # Find the associated d18O change on the sea level expected for that age.
-    age_info = sea_level.loc[sea_level.age_ka == age_round]
-    return d18o_sw - age_info.d18Ow_IV
+    return np.asarray(d18o_sw, dtype=float) - sea_level_lookup(age, "d18Ow_IV", interpolate)
 
 
 def salinity_calculation_np(d18o: float) -> float:
@@ -43,41 +81,47 @@ def salinity_calculation_np(d18o: float) -> float:
     return salinity
 
 
-def inverse_age_d18o_correction(salinity: float, age: float) -> float:
+def inverse_age_d18o_correction(salinity: float | np.ndarray, age: float | np.ndarray,
+                                interpolate: bool = False) -> float | np.ndarray:
     """
     Calculates the actual d18O_sw based on the global sea level change in d18O_sw from Rohling et al., 2021.
     :param salinity: Adjusted d18O_sw
     :param age: Age of the measurement
+    :param interpolate: Interpolate the sea level record rather than use the nearest 1 ka
     :return: Correct d18O_sw
     """
-    # The sea level database stores ages as floats to the nearest 1 ka.
-    age_round = round(age)
     # Find the associated d18O change on the sea level expected for that age.
-    age_info = sea_level.loc[sea_level.age_ka == age_round]
-    add_salinity = age_info.d18Ow_IV * 1.1
-    return salinity + add_salinity
+    add_salinity = sea_level_lookup(age, "d18Ow_IV", interpolate) * 1.1
+    return np.asarray(salinity, dtype=float) + add_salinity
 
 
-def sea_level_salinity_change(age:float) -> float:
-    # The sea level database stores ages as floats to the nearest 1 ka.
-    age_round = round(age)
+def sea_level_salinity_change(age: float | np.ndarray, interpolate: bool = False) -> float | np.ndarray:
     # Find the associated change in the sea level expected for that age.
-    age_info = sea_level.loc[sea_level.age_ka == age_round]
+    rsl = sea_level_lookup(age, "SL_m", interpolate)
     # Convert this to a salinity
-    rsl = age_info.SL_m.values[0]
     add_salinity = (rsl/3682) * -34.7
     return add_salinity
 
 
-def full_inverse_salinity(d18o: float, age: float, d18O_sw_modern: float, salinity_modern: float) -> float:
-    adjusted_d18_o = age_d18o_correction(d18o, age)
+def full_inverse_salinity(d18o: float | np.ndarray, age: float | np.ndarray, d18O_sw_modern: float,
+                          salinity_modern: float, interpolate: bool = False) -> float | np.ndarray:
+    """
+    Calculates the salinity of any number of samples at once from their d18O_sw and age.
+    :param d18o: d18O_sw of the samples
+    :param age: Age of the samples
+    :param d18O_sw_modern: The modern d18O_sw measurement of the site
+    :param salinity_modern: The modern salinity measurement of the site
+    :param interpolate: Interpolate the sea level record rather than use the nearest 1 ka
+    :return: Salinity of the samples
+    """
+    adjusted_d18_o = age_d18o_correction(d18o, age, interpolate)
     # Calculates the difference in d18O_sw from this point in time and the modern.
     delta_d18O_sw = adjusted_d18_o - d18O_sw_modern
     # Calculates salinity change from seawater d18O values. From LeGrande and Schmidt, 2006, for the North Pacific where
     # local d18O_sw == 0.44 * Salinity - 15.13;
     delta_salinity = delta_d18O_sw * (1/0.44)
     # Calculates the final salinity from this point in time by adding the change to the modern.
-    delta_salinity = delta_salinity + sea_level_salinity_change(age)
+    delta_salinity = delta_salinity + sea_level_salinity_change(age, interpolate)
     salinity_final = salinity_modern + delta_salinity
     return salinity_final
 
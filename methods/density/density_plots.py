@@ -4,6 +4,24 @@ import numpy as np
 import pandas as pd
 
 from objects.arguments.colours import colours_extra
+from objects.caching.result_cache import cached_result
+
+
+@cached_result()
+def density_grid(min_temp: float, max_temp: float, min_sal: float, max_sal: float,
+                 n: int = 156) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The density (sigma-2) of an n x n grid of temperature and practical salinity, at the pressure and position of the
+    sites. Returns the salinity, temperature and density grids, which are kept on disk between sessions.
+    """
+    # Define the temperature and salinity space
+    temperatures = np.linspace(min_temp, max_temp, n)
+    salinity = np.linspace(min_sal, max_sal, n)
+    # Create a mesh of this space
+    temp, sal = np.meshgrid(temperatures, salinity)
+    # Generate a density space using this mesh
+    ab_sal = gsw.SA_from_SP(sal, (230.88 - 10.1325), 158.506, 32.652)
+    return sal, temp, gsw.sigma2(ab_sal, temp)
 
 
 def density_plot(min_temp: int = -4, max_temp=15, min_sal=33, max_sal=36, lv=9):
@@ -19,14 +37,7 @@ def density_plot(min_temp: int = -4, max_temp=15, min_sal=33, max_sal=36, lv=9):
     :param lv: number of levels specified in the plot
     :return: density plot
     """
-    # Define the temperature and salinity space
-    temperatures = np.linspace(min_temp, max_temp, 156)
-    salinity = np.linspace(min_sal, max_sal, 156)
-    # Create a mesh of this space
-    temp, sal = np.meshgrid(temperatures, salinity)
-    # Generate a density space using this mesh
-    ab_sal = gsw.SA_from_SP(sal, (230.88 - 10.1325), 158.506, 32.652)
-    densities = gsw.sigma2(ab_sal, temp)
+    sal, temp, densities = density_grid(min_temp, max_temp, min_sal, max_sal)
 
     # Create the figure
     fig, ax = plt.subplots(figsize=(7, 6))
@@ -1,5 +1,5 @@
 import matplotlib.pyplot as plt
-from objects.misc.mis_boundaries import mis_boundaries
+from objects.misc import mis_boundaries as boundaries
 
 
 def highlight_mis(axs) -> None:
@@ -27,6 +27,7 @@ def highlight_mis_single(ax) -> None:
 
 
 def highlight_all_mis(ax: plt.axis) -> plt.axis:
+    mis_boundaries = boundaries.mis_boundaries
     for _, row in mis_boundaries.iterrows():
         if row["glacial"] == "glacial":
             ax.axvspan(row["age_start"], row["age_end"], fc='tab:blue', ec=None, alpha=0.1)
@@ -37,6 +38,7 @@ def highlight_all_mis(ax: plt.axis) -> plt.axis:
 
 
 def highlight_all_mis_greyscale(ax: plt.axis, annotate: bool = False) -> plt.axis:
+    mis_boundaries = boundaries.mis_boundaries
     for _, row in mis_boundaries.iterrows():
         if row["glacial"] == "glacial":
             ax.axvspan(row["age_start"], row["age_end"], fc='tab:grey', ec=None, alpha=0.1)
@@ -11,7 +11,7 @@ from objects.core_data.isotopes import iso_1208, iso_1209
 def insolation_plots(age_min: float = 2300, age_max: float = 3600, save_fig: bool = False):
     # --------------- GENERATE DIFFERENCES ---------------
     resampling_freq = 5.0  # Resampling frequency in ka
-    filter_period = 5.0
+    filter_period = 50.0
     resampled_data = binning_multiple_series(
         iso_1208, iso_1209,
         names=["1208", "1209"],
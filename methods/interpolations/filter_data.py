@@ -1,22 +1,28 @@
+import numpy as np
 from pandas import DataFrame
 
 from methods.interpolations.low_pass_filter import butter_lowpass_filter
 
 
-def filter_difference(resampled_data: DataFrame, filter_period: float = 10.0):
+def filter_difference(resampled_data: DataFrame, filter_period: float = 10.0, fs: float = None):
     # --------------- RESAMPLE ISOTOPE DATA ---------------
     resampled_1209 = resampled_data.d18O_unadj_mean_1209.to_numpy()
     resampled_1208 = resampled_data.d18O_unadj_mean_1208.to_numpy()
 
     # --------------- FILTER PARAMETERS ---------------
-    fs = 2  # Sample rate, in ka
+    if fs is None:
+        # Sample rate, in samples per ka, taken from the spacing the data were resampled at
+        fs = 1.0 / float(np.median(np.diff(resampled_data.age_ka.to_numpy(dtype=float))))
     cutoff = 1.0 / filter_period  # Desired cutoff frequency of the filter, in 1\ka
     nyq = 0.5 * fs  # Nyquist Frequency
     order = 2  # Order of the filter
+    if cutoff >= nyq:
+        raise ValueError(f"The filter period must be longer than twice the sample spacing ({2 / fs:g} ka)")
 
     # --------------- FILTER DATA ---------------
-    filtered_1209 = butter_lowpass_filter(resampled_1209, cutoff, fs, order, nyq)
-    filtered_1208 = butter_lowpass_filter(resampled_1208, cutoff, fs, order, nyq)
+    # Both series are filtered together, as the rows of one block
+    filtered_1208, filtered_1209 = butter_lowpass_filter(np.vstack((resampled_1208, resampled_1209)), cutoff, fs,
+                                                         order, nyq, axis=1)
     return filtered_1208, filtered_1209
 
 
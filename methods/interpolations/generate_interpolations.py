@@ -5,7 +5,9 @@ from pandas import DataFrame
 from sklearn.linear_model import LinearRegression
 import matplotlib.pyplot as plt
 
-from objects.core_data.isotopes import iso_1208, iso_1209
+from methods.interpolations.binning_records import bin_arrays
+from objects.caching.hashing import hash_frame
+from objects.core_data import isotopes
 
 
 # Make an array with a spacing of 5 ka, starting at a known start point
@@ -14,27 +16,117 @@ from objects.core_data.isotopes import iso_1208, iso_1209
 
 
 
-def generate_interpolation(data_series, fs=1.0, start=2400, end=3400, pchip=False, value="d18O_unadj"):
-    # Define the age array
-    age_array = np.arange(start, end, fs)
-    # Drop any N/A values
-    data_series = data_series.dropna(subset=[value, "age_ka"])
+# Number of fitted interpolants kept in memory
+INTERPOLANT_CACHE_SIZE = 64
+_INTERPOLANTS = {}
+
+
+def record_interpolant(data_series: DataFrame, value: str = "d18O_unadj", pchip: bool = False) -> dict:
+    """
+    The cleaned samples of one column of a record and the interpolator fitted to them, memoised on the content of the
+    record.
+
+    Parameters:
+    - data_series (pandas.DataFrame): The record, with an 'age_ka' column.
+    - value (str, optional): The column to interpolate (default: 'd18O_unadj').
+    - pchip (bool, optional): Fit a PCHIP interpolator rather than a linear one (default: False).
+
+    Returns:
+    - dict: The sorted, de-duplicated ages ('ages') and values ('values') without missing samples, and the fitted
+      interpolator ('function'), which extrapolates beyond the ages of the record.
+
+    The cache is keyed by a hash of the age and value columns together with the method, so interpolating the same
+    record again, even from a different copy of the DataFrame, skips the cleaning and the fit. The returned arrays are
+    shared between calls, so they should not be changed.
+    """
+    key = (hash_frame(data_series, ["age_ka", value]), value, pchip)
+    if key in _INTERPOLANTS:
+        return _INTERPOLANTS[key]
 
-    # Drop any duplicate values and sort the dataset in ascending order
+    # Drop any N/A values and duplicate values and sort the dataset in ascending order
+    data_series = data_series.dropna(subset=[value, "age_ka"])
     data_series = data_series.sort_values(by="age_ka")
     data_series = data_series.drop_duplicates(subset='age_ka')
+    ages = data_series.age_ka.to_numpy(dtype=float)
+    values = data_series[value].to_numpy(dtype=float)
 
     if pchip:
-        # Interpolate across the dataset using the pChip interpolator
-        interpolated_dataset = interpol.pchip_interpolate(xi=data_series.age_ka, yi=data_series[value], x=age_array)
+        function = interpol.PchipInterpolator(ages, values, extrapolate=True)
     else:
-        function_int = interpol.interp1d(x=data_series.age_ka, y=data_series[value], fill_value="extrapolate")
-        # Interpolate across this age array
-        interpolated_dataset = function_int(age_array)
+        function = interpol.interp1d(x=ages, y=values, fill_value="extrapolate")
 
+    if len(_INTERPOLANTS) >= INTERPOLANT_CACHE_SIZE:
+        _INTERPOLANTS.pop(next(iter(_INTERPOLANTS)))
+    _INTERPOLANTS[key] = {"ages": ages, "values": values, "function": function}
+    return _INTERPOLANTS[key]
+
+
+def generate_interpolation(data_series, fs=1.0, start=2400, end=3400, pchip=False, value="d18O_unadj"):
+    # Define the age array
+    age_array = np.arange(start, end, fs)
+    # Interpolate across this age array with the (cached) interpolator of the record
+    interpolated_dataset = record_interpolant(data_series, value, pchip)["function"](age_array)
     return interpolated_dataset, age_array
 
 
+def interpolate_columns(data_series: DataFrame, values: list[str], fs: float = 1.0, start: float = 2400,
+                        end: float = 3400, pchip: bool = False, age_array: np.ndarray = None) -> DataFrame:
+    """
+    Interpolate several columns of a record onto one age grid.
+
+    Parameters:
+    - data_series (pandas.DataFrame): The record, with an 'age_ka' column.
+    - values (list[str]): The columns to interpolate (e.g. ['d18O_unadj', 'd13C']).
+    - fs (float, optional): The spacing of the age grid in ka (default: 1).
+    - start (float, optional): The first age of the grid (default: 2400).
+    - end (float, optional): The end of the grid, exclusive (default: 3400).
+    - pchip (bool, optional): Use PCHIP interpolators rather than linear ones (default: False).
+    - age_array (numpy.ndarray, optional): The ages to evaluate at, instead of the grid set by fs, start and end.
+
+    Returns:
+    - pandas.DataFrame: An 'age_ka' column followed by the interpolated columns.
+
+    Each column keeps its own samples (a sample missing one value still contributes the others), and each is fitted
+    once through record_interpolant, so later grids of the same record are only evaluated.
+    """
+    if age_array is None:
+        age_array = np.arange(start, end, fs)
+    columns = {"age_ka": age_array}
+    for value in values:
+        columns[value] = record_interpolant(data_series, value, pchip)["function"](age_array)
+    return DataFrame(columns)
+
+
+def stack_interpolate(records: dict[str, DataFrame], value: str = "temp", grid: np.ndarray = None, fs: float = 1.0,
+                      start: float = 2400, end: float = 3400) -> np.ndarray:
+    """
+    Linearly interpolate one column of many records onto a common age grid, as a (records x ages) matrix.
+
+    Parameters:
+    - records (dict[str, pandas.DataFrame]): The records, each with an 'age_ka' column, keyed by name (e.g. site). The
+      rows of the matrix follow the order of the dictionary.
+    - value (str, optional): The column to interpolate (default: 'temp').
+    - grid (numpy.ndarray, optional): The ages to interpolate onto, instead of the grid set by fs, start and end.
+    - fs (float, optional): The spacing of the age grid in ka (default: 1).
+    - start (float, optional): The first age of the grid (default: 2400).
+    - end (float, optional): The end of the grid, exclusive (default: 3400).
+
+    Returns:
+    - numpy.ndarray: The interpolated values, NaN wherever the grid falls outside the ages a record covers.
+
+    Unlike generate_interpolation, records are not extrapolated, so gradients, differences and trends across sites can
+    be taken directly on the rows of the matrix with NaN marking the ages a site does not cover. The cleaned samples of
+    each record come from the cache of record_interpolant.
+    """
+    grid = np.arange(start, end, fs) if grid is None else np.asarray(grid, dtype=float)
+    stack = np.full((len(records), len(grid)), np.nan)
+    for row, record in enumerate(records.values()):
+        interpolant = record_interpolant(record, value)
+        if len(interpolant["ages"]):
+            stack[row] = np.interp(grid, interpolant["ages"], interpolant["values"], left=np.nan, right=np.nan)
+    return stack
+
+
 def resampling(
         data_series: DataFrame,
         start: int = 2400,
@@ -81,12 +173,9 @@ def resampling(
     data_series = data_series.drop_duplicates(subset='age_ka')
 
     # ------------ OBTAIN VALUES ------------------
-    raw_values = []
-    for age in age_array:
-        value_avg = data_series[data_series.age_ka.between(age - gap, age + gap)][value].mean()
-        raw_values.append({"age_ka": age, "value_avg": value_avg})
+    binned = bin_arrays(data_series.age_ka.to_numpy(), data_series[value].to_numpy(), age_array, gap)
 
-    return DataFrame.from_records(raw_values)
+    return DataFrame({"age_ka": age_array, "value_avg": binned["mean"][:, 0]})
 
 
 def resample_both(fs: float = 5.0, min_age: int = 2300, max_age: int = 3700, value: str = "d18O_unadj") -> pd.DataFrame:
@@ -106,25 +195,22 @@ def resample_both(fs: float = 5.0, min_age: int = 2300, max_age: int = 3700, val
     It calculates the difference between the corresponding 'd18O_unadj' values in both datasets and returns the results in a DataFrame.
 
     Note:
-        - The 'iso_1208' and 'iso_1209' DataFrames are assumed to be available in the global scope.
+        - The 'iso_1208' and 'iso_1209' DataFrames are read from objects.core_data.isotopes when it is called.
         - The function relies on the 'age_ka' and 'd18O_unadj' columns in the input DataFrames.
 
     Example:
         >>> resampled_data = resample_both(fs=10, min_age=2400, max_age=3600)
         >>> print(resampled_data)
     """
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
     age_array = np.arange(min_age, max_age, fs)
 
-    interpolated_values = []
-
-    for age in age_array:
-        avg_1208 = iso_1208[iso_1208.age_ka.between(age - (fs / 2), age + (fs / 2))][value].mean()
-        avg_1209 = iso_1209[iso_1209.age_ka.between(age - (fs / 2), age + (fs / 2))][value].mean()
-        difference = avg_1208 - avg_1209
-        interpolated_values.append(
-            {"age_ka": age, "d18O_1208": avg_1208, "d18O_1209": avg_1209, "d18O_difference": difference})
+    avg_1208 = bin_arrays(iso_1208.age_ka.to_numpy(), iso_1208[value].to_numpy(), age_array, fs / 2)["mean"][:, 0]
+    avg_1209 = bin_arrays(iso_1209.age_ka.to_numpy(), iso_1209[value].to_numpy(), age_array, fs / 2)["mean"][:, 0]
 
-    return DataFrame.from_records(interpolated_values)
+    return DataFrame(
+        {"age_ka": age_array, "d18O_1208": avg_1208, "d18O_1209": avg_1209, "d18O_difference": avg_1208 - avg_1209})
 
 
 def linear_regression(dataset: pd.DataFrame, value_1: str = "d13C", value_2: str = "BCa"):
@@ -0,0 +1,137 @@
+import numpy as np
+from numpy import arange
+from pandas import DataFrame
+
+from objects.caching.result_cache import cached_result
+
+# Number of kernel widths (standard deviations) beyond which samples are ignored
+KERNEL_TRUNCATE = 4.0
+# Maximum number of cells gathered at once when summing the kernel weights
+KERNEL_CHUNK_CELLS = 5_000_000
+
+
+def period_to_sigma(filter_period: float) -> float:
+    """
+    The width in ka of the Gaussian kernel whose response falls to one half at 'filter_period' ka.
+
+    The response of a Gaussian of standard deviation sigma at frequency f is exp(-2 pi^2 sigma^2 f^2), so a kernel of
+    this width passes longer periods and damps shorter ones, like a low-pass filter with a cutoff of 1 / filter_period.
+    """
+    return float(filter_period) * np.sqrt(np.log(2) / 2) / np.pi
+
+
+def gaussian_smooth(ages: np.ndarray, values: np.ndarray, sigma: float, at: np.ndarray = None,
+                    truncate: float = KERNEL_TRUNCATE) -> np.ndarray:
+    """
+    Smooth an irregularly sampled record with a Gaussian kernel, without resampling it first.
+
+    Parameters:
+    - ages (numpy.ndarray): The ages of the samples in ka, in any order.
+    - values (numpy.ndarray): The values of the samples, either one value per sample or one row of several columns per
+      sample. Missing values are ignored.
+    - sigma (float): The standard deviation of the kernel in ka (see period_to_sigma).
+    - at (numpy.ndarray, optional): The ages to evaluate the smoothed record at (default: the sample ages).
+    - truncate (float, optional): The number of standard deviations beyond which samples are ignored
+      (default: KERNEL_TRUNCATE).
+
+    Returns:
+    - numpy.ndarray: The kernel-weighted mean of the samples at each age of 'at', with the shape of 'values' along the
+      columns. Ages with no sample within the truncated kernel are NaN.
+
+    The samples are sorted once, and the samples within 'truncate' sigma of each output age are found with a binary
+    search, so each output age only visits its own band of samples. The bands are gathered in padded blocks of at most
+    KERNEL_CHUNK_CELLS cells, which keeps the cost at O((n + m) log n + m w) for m output ages and bands of w samples
+    and lets records of hundreds of thousands of samples be smoothed in memory. Uneven sampling is handled by the
+    normalised weights, so dense parts of a record do not dominate sparse ones.
+    """
+    # -------------- CHECK INPUTS --------------
+    if sigma <= 0:
+        raise ValueError("The kernel width must be positive")
+    ages = np.asarray(ages, dtype=float)
+    values = np.asarray(values, dtype=float)
+    vector = values.ndim == 1
+    values = values.reshape(len(values), -1)
+    if len(ages) != len(values):
+        raise ValueError("Ages and values must have the same length")
+    at = ages if at is None else np.asarray(at, dtype=float)
+    scalar = at.ndim == 0
+    at = np.atleast_1d(at)
+
+    # -------------- SORT SAMPLES --------------
+    order = np.argsort(ages, kind="stable")
+    ages, values = ages[order], values[order]
+    present = np.isfinite(values)
+    keep = np.isfinite(ages) & present.any(axis=1)
+    ages, values, present = ages[keep], np.where(present, values, 0.0)[keep], present[keep]
+
+    # -------------- KERNEL BANDS --------------
+    half_width = truncate * sigma
+    left = np.searchsorted(ages, at - half_width, side="left")
+    right = np.searchsorted(ages, at + half_width, side="right")
+    smoothed = np.full((len(at), values.shape[1]), np.nan)
+    width = int((right - left).max(initial=0))
+    if width > 0:
+        step = max(1, KERNEL_CHUNK_CELLS // (width * values.shape[1]))
+        offsets = arange(width)
+        for first in range(0, len(at), step):
+            last = min(first + step, len(at))
+            index = left[first:last, None] + offsets
+            inside = index < right[first:last, None]
+            index = np.where(inside, index, 0)
+            weights = np.exp(-0.5 * np.square((ages[index] - at[first:last, None]) / sigma)) * inside
+            # Missing values are zero, so they only need leaving out of the total weight of their column
+            sums = np.einsum("cw,cwk->ck", weights, values[index])
+            totals = np.einsum("cw,cwk->ck", weights, present[index].astype(float))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                smoothed[first:last] = np.where(totals > 0, sums / totals, np.nan)
+    if vector:
+        smoothed = smoothed[:, 0]
+    return smoothed[0] if scalar else smoothed
+
+
+@cached_result()
+def smooth_record(record: DataFrame, columns: list[str], filter_period: float, at: np.ndarray = None,
+                  age_column: str = "age_ka") -> DataFrame:
+    """
+    Low-pass filter columns of an irregularly sampled record (e.g. iso_1208) with a Gaussian kernel.
+
+    Parameters:
+    - record (pandas.DataFrame): The record, with an age column.
+    - columns (list[str]): The columns to filter.
+    - filter_period (float): The period in ka at which the response of the filter falls to one half.
+    - at (numpy.ndarray, optional): The ages to evaluate the filtered record at (default: the sample ages).
+    - age_column (str, optional): The column holding the ages in ka (default: 'age_ka').
+
+    Returns:
+    - pandas.DataFrame: The ages and the filtered columns.
+    """
+    ages = record[age_column].to_numpy(dtype=float)
+    at = ages if at is None else np.asarray(at, dtype=float)
+    smoothed = gaussian_smooth(ages, record[columns].to_numpy(dtype=float), period_to_sigma(filter_period), at)
+    return DataFrame(np.column_stack((at, smoothed)), columns=[age_column] + list(columns))
+
+
+def smooth_difference(record_1: DataFrame, record_2: DataFrame, filter_period: float = 10.0, at: np.ndarray = None,
+                      column: str = "d18O_unadj") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Filter two irregularly sampled records onto common ages, as filter_difference does for binned records.
+
+    Parameters:
+    - record_1 (pandas.DataFrame): The first record (e.g. iso_1208).
+    - record_2 (pandas.DataFrame): The second record (e.g. iso_1209).
+    - filter_period (float, optional): The period in ka at which the response of the filter falls to one half
+      (default: 10).
+    - at (numpy.ndarray, optional): The common ages in ka (default: every sample age of either record).
+    - column (str, optional): The column to filter (default: 'd18O_unadj').
+
+    Returns:
+    - tuple[numpy.ndarray, numpy.ndarray]: The filtered values of each record at the common ages.
+    """
+    if at is None:
+        at = np.union1d(record_1.age_ka.to_numpy(dtype=float), record_2.age_ka.to_numpy(dtype=float))
+    sigma = period_to_sigma(filter_period)
+    filtered_1 = gaussian_smooth(record_1.age_ka.to_numpy(dtype=float), record_1[column].to_numpy(dtype=float),
+                                 sigma, at)
+    filtered_2 = gaussian_smooth(record_2.age_ka.to_numpy(dtype=float), record_2[column].to_numpy(dtype=float),
+                                 sigma, at)
+    return filtered_1, filtered_2
@@ -1,7 +1,25 @@
-from scipy.signal import butter, filtfilt
+from functools import lru_cache
 
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
 
-def butter_lowpass_filter(data, cutoff, fs, order, nyq):
+
+@lru_cache(maxsize=128)
+def butter_lowpass_sos(cutoff: float, fs: float, order: int, nyq: float = None) -> np.ndarray:
+    """
+    Design a Butterworth low-pass filter as second-order sections, memoised on (cutoff, fs, order, nyq).
+
+    The cutoff is normalised by 'nyq' (default: fs / 2), so it is passed to 'butter' without 'fs', which would normalise
+    it a second time. The returned array is shared between calls, so it should not be changed.
+    """
+    if nyq is None:
+        nyq = 0.5 * fs
+    normal_cutoff = (cutoff / nyq)
+    sos = butter(N=order, Wn=normal_cutoff, btype='low', analog=False, output='sos')
+    return sos
+
+
+def butter_lowpass_filter(data, cutoff, fs, order, nyq=None, axis=-1):
     """
     Apply a Butterworth low-pass filter to the input data.
 
@@ -10,7 +28,9 @@ def butter_lowpass_filter(data, cutoff, fs, order, nyq):
     - cutoff (float): The cutoff frequency (in Hertz) of the low-pass filter.
     - fs (float): The sampling frequency (in Hertz) of the input data.
     - order (int): The order of the Butterworth filter.
-    - nyq (float): The Nyquist frequency, which is half of the sampling frequency (fs / 2).
+    - nyq (float, optional): The Nyquist frequency, which is half of the sampling frequency (default: fs / 2).
+    - axis (int, optional): The axis along which to filter, so that a 2-D block of many series (e.g. sites x samples)
+      is filtered in one call (default: -1).
 
     Returns:
     - y (array-like): The filtered output data.
@@ -21,16 +41,16 @@ def butter_lowpass_filter(data, cutoff, fs, order, nyq):
     The 'nyq' parameter is calculated as half of the sampling frequency, and 'normal_cutoff' is the normalized
     cutoff frequency with respect to the Nyquist frequency.
 
-    The 'butter' function from the scipy.signal library is used to obtain the filter coefficients 'b' and 'a'.
-    Subsequently, the 'filtfilt' function is used to apply the filter to the input data, resulting in 'y'.
+    The filter is designed once for each (cutoff, fs, order, nyq) by butter_lowpass_sos, as second-order sections
+    rather than the numerically fragile 'b' and 'a' coefficients. Subsequently, the 'sosfiltfilt' function is used to
+    apply the filter forwards and backwards to the input data, resulting in 'y'.
 
     This function is useful for smoothing and removing high-frequency noise from time-series data.
 
     Usage:
     filtered_data = butter_lowpass_filter(data, cutoff=5.0, fs=100.0, order=4, nyq=50.0)
     """
-    normal_cutoff = (cutoff / nyq)
-    # Get the filter coefficients
-    b, a = butter(N=order, Wn=normal_cutoff, btype='low', analog=False, output='ba', fs=fs)
-    y = filtfilt(b, a, data)
+    # Get the (cached) filter sections
+    sos = butter_lowpass_sos(float(cutoff), float(fs), int(order), None if nyq is None else float(nyq))
+    y = sosfiltfilt(sos, np.asarray(data, dtype=float), axis=axis)
     return y
@@ -75,7 +75,7 @@ def plot_filtered_diff(filter_period: float, save_fig: bool = False):
         show()
 
 
-def plot_rolling_corr(window_size: int = 100, filter_period: float = 4.0, save_fig: bool = False):
+def plot_rolling_corr(window_size: int = 100, filter_period: float = 40.0, save_fig: bool = False):
     # --------------- GENERATE DIFFERENCES ---------------
     resampling_freq = 5.0  # Resampling frequency in ka
     age_min, age_max = 2300, 3600  # Minimum and maximum ages in ka
@@ -147,5 +147,5 @@ def plot_rolling_corr(window_size: int = 100, filter_period: float = 4.0, save_f
 
 
 if __name__ == "__main__":
-    plot_rolling_corr(save_fig=True, filter_period=5)
-    # plot_filtered_diff(filter_period=5, save_fig=False)
+    plot_rolling_corr(save_fig=True, filter_period=50)
+    # plot_filtered_diff(filter_period=50, save_fig=False)
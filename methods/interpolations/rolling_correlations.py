@@ -1,10 +1,12 @@
 from pandas import DataFrame
 
 from methods.interpolations.binning_records import binning_multiple_series
-from objects.core_data.isotopes import iso_1208, iso_1209
+from objects.core_data import isotopes
 
 
 def rolling_correlation(window_size: int = 20, frequency: float = 5.0):
+    iso_1209 = isotopes.iso_1209
+    iso_1208 = isotopes.iso_1208
     # Bin the records at frequency above
     joint_records = binning_multiple_series(iso_1209, iso_1208, names=["1209", "1208"], start=2350, end=3600,
                                             fs=frequency, value="d18O_unadj").dropna()
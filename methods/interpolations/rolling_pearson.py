@@ -1,6 +1,152 @@
+import numpy as np
 from numpy import arange
 from pandas import DataFrame
-from scipy.stats import pearsonr, spearmanr
+from scipy.stats import t as t_distribution
+
+from methods.interpolations.binning_records import bin_arrays
+from objects.caching.hashing import hash_frame
+
+# Maximum number of cells gathered at once when ranking windows for the Spearman correlation
+RANK_CHUNK_CELLS = 5_000_000
+# Number of aligned record pairs kept by align_records
+ALIGNMENT_CACHE_SIZE = 32
+_ALIGNED_RECORDS = {}
+
+
+def _prepare_pairs(database: DataFrame, value_01: str, value_02: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Drop incomplete pairs and sort the remaining samples by age
+    pairs = database[["age_ka", value_01, value_02]].dropna().sort_values(by="age_ka", kind="stable")
+    return pairs.age_ka.to_numpy(dtype=float), pairs[value_01].to_numpy(dtype=float), \
+        pairs[value_02].to_numpy(dtype=float)
+
+
+def _window_bounds(ages: np.ndarray, age_array: np.ndarray, gap: float) -> tuple[np.ndarray, np.ndarray]:
+    # Index of the first and one past the last sample in [age - gap, age + gap] for each window, on sorted ages
+    return np.searchsorted(ages, age_array - gap, side="left"), np.searchsorted(ages, age_array + gap, side="right")
+
+
+def _window_sums(values: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    # Sum of values[..., left:right] for every window, from a cumulative sum along the last axis
+    cumulative = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=cumulative[..., 1:])
+    return cumulative[..., right] - cumulative[..., left]
+
+
+def correlation_p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Two-sided p-values for correlation coefficients 'r' calculated from 'n' pairs, using the t-distribution with
+    n - 2 degrees of freedom (as in scipy.stats.pearsonr and scipy.stats.spearmanr).
+    """
+    r = np.asarray(r, dtype=float)
+    n = np.broadcast_to(n, r.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df = n - 2.0
+        t_value = np.abs(r) * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        p = 2.0 * t_distribution.sf(t_value, np.where(df > 0, df, np.nan))
+    # Two pairs always give a perfect correlation, which pearsonr reports with p = 1
+    return np.where(n == 2, np.where(np.isnan(r), np.nan, 1.0), p)
+
+
+def sliding_pearson(ages: np.ndarray, x: np.ndarray, y: np.ndarray, age_array: np.ndarray,
+                    gap: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation between 'x' and 'y' within [age - gap, age + gap] for every age in 'age_array'.
+
+    Parameters:
+    - ages (numpy.ndarray): The ages of each pair, sorted in ascending order.
+    - x (numpy.ndarray): The first variable, of shape (n,) or (..., n).
+    - y (numpy.ndarray): The second variable, broadcastable against 'x' along the leading axes.
+    - age_array (numpy.ndarray): The centre of each window.
+    - gap (float): The half-width of each window.
+
+    Returns:
+    - tuple[numpy.ndarray, numpy.ndarray]: The correlation coefficient for each window (with any leading axes of 'x'
+      and 'y' kept) and the number of pairs in each window.
+
+    The sums of x, y, x², y² and xy within every window come from cumulative sums over the age-sorted pairs, so all
+    windows (and any batch of series along the leading axes) are evaluated together in O(n) rather than by slicing the
+    data once per window.
+    """
+    left, right = _window_bounds(ages, np.asarray(age_array, dtype=float), gap)
+    n = (right - left).astype(float)
+
+    # Centre each series before summing to limit rounding error in the differences
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+
+    sum_x, sum_y = _window_sums(x, left, right), _window_sums(y, left, right)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = _window_sums(x * y, left, right) - sum_x * sum_y / n
+        variance_x = _window_sums(x * x, left, right) - sum_x ** 2 / n
+        variance_y = _window_sums(y * y, left, right) - sum_y ** 2 / n
+        r = covariance / np.sqrt(variance_x * variance_y)
+    r = np.where(n >= 2, np.clip(r, -1.0, 1.0), np.nan)
+    return r, n
+
+
+def _rank_rows(block: np.ndarray) -> np.ndarray:
+    # Average (tied) ranks along each row, with NaN padding sorted to the end of each row
+    order = np.argsort(block, axis=1, kind="stable")
+    ordered = np.take_along_axis(block, order, axis=1)
+    position = np.broadcast_to(arange(block.shape[1]), block.shape)
+    new_group = np.ones(block.shape, dtype=bool)
+    new_group[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    last_group = np.ones(block.shape, dtype=bool)
+    last_group[:, :-1] = new_group[:, 1:]
+    first = np.maximum.accumulate(np.where(new_group, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(last_group, position, block.shape[1])[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(block.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2.0 + 1.0, axis=1)
+    return ranks
+
+
+def sliding_spearman(ages: np.ndarray, x: np.ndarray, y: np.ndarray, age_array: np.ndarray,
+                     gap: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Spearman correlation between 'x' and 'y' within [age - gap, age + gap] for every age in 'age_array'.
+
+    Parameters:
+    - ages (numpy.ndarray): The ages of each pair, sorted in ascending order.
+    - x (numpy.ndarray): The first variable.
+    - y (numpy.ndarray): The second variable.
+    - age_array (numpy.ndarray): The centre of each window.
+    - gap (float): The half-width of each window.
+
+    Returns:
+    - tuple[numpy.ndarray, numpy.ndarray]: The correlation coefficient and the number of pairs in each window.
+
+    The windows are gathered into padded (windows x width) blocks, ranked together with one sort per block (ties take
+    their average rank) and correlated with masked sums, rather than ranking each window with a separate call.
+    """
+    left, right = _window_bounds(ages, np.asarray(age_array, dtype=float), gap)
+    n = (right - left).astype(float)
+    r = np.full(len(left), np.nan)
+    width = int((right - left).max(initial=0))
+    if width < 2:
+        return r, n
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = arange(width)
+    step = max(1, RANK_CHUNK_CELLS // width)
+    for first in range(0, len(left), step):
+        last = min(first + step, len(left))
+        index = left[first:last, None] + offsets
+        inside = index < right[first:last, None]
+        index = np.where(inside, index, 0)
+        rank_x = _rank_rows(np.where(inside, x[index], np.nan))
+        rank_y = _rank_rows(np.where(inside, y[index], np.nan))
+        # Ranks within each window run from 1 to n, so both have a mean of (n + 1) / 2
+        centre = (n[first:last, None] + 1.0) / 2.0
+        rank_x = np.where(inside, rank_x - centre, 0.0)
+        rank_y = np.where(inside, rank_y - centre, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r[first:last] = (rank_x * rank_y).sum(axis=1) / np.sqrt((rank_x ** 2).sum(axis=1) *
+                                                                    (rank_y ** 2).sum(axis=1))
+    r = np.where(n >= 2, np.clip(r, -1.0, 1.0), np.nan)
+    return r, n
 
 
 def rolling_pearson(database: DataFrame, value_01: str, value_02: str, start: int = 2300, end: int = 3600,
@@ -25,7 +171,8 @@ def rolling_pearson(database: DataFrame, value_01: str, value_02: str, start: in
 
     This function calculates Pearson correlation coefficients (r) and p-values (p) for the given two variables
     ('value_01' and 'value_02') in a rolling fashion, where the age interval moves with a specified window size.
-    It returns a DataFrame with the calculated values for each age interval.
+    It returns a DataFrame with the calculated values for each age interval. Pairs with a missing value are dropped,
+    and windows holding fewer than two pairs return NaN.
 
     The 'start' and 'end' parameters determine the age range over which the correlation is calculated, and the
     'window' parameter defines the width of the rolling window. If 'window' is set to a value larger than the
@@ -44,14 +191,11 @@ def rolling_pearson(database: DataFrame, value_01: str, value_02: str, start: in
     age_array = arange((start + gap - 1), (end - gap + 1), 1)
 
     # ------------ OBTAIN VALUES ------------------
-    raw_values = []
-    for age in age_array:
-        sampling = database[database.age_ka.between(age - gap, age + gap)]
-        r, p = pearsonr(sampling[value_01], sampling[value_02])
-        series_values = {"age_ka": age, "age_min": (age - gap), "age_max": (age + gap), "r": r, "p": p}
-        raw_values.append(series_values)
+    ages, x, y = _prepare_pairs(database, value_01, value_02)
+    r, n = sliding_pearson(ages, x, y, age_array, gap)
 
-    return DataFrame.from_records(raw_values)
+    return DataFrame({"age_ka": age_array, "age_min": (age_array - gap), "age_max": (age_array + gap), "r": r,
+                      "p": correlation_p_values(r, n)})
 
 
 def rolling_spearman(database: DataFrame, value_01: str, value_02: str, start: int = 2300, end: int = 3600,
@@ -76,7 +220,8 @@ def rolling_spearman(database: DataFrame, value_01: str, value_02: str, start: i
 
     This function calculates Spearman correlation coefficients (r) and p-values (p) for the given two variables
     ('value_01' and 'value_02') in a rolling fashion, where the age interval moves with a specified window size.
-    It returns a DataFrame with the calculated values for each age interval.
+    It returns a DataFrame with the calculated values for each age interval. Pairs with a missing value are dropped,
+    and windows holding fewer than two pairs return NaN.
 
     The 'start' and 'end' parameters determine the age range over which the correlation is calculated, and the
     'window' parameter defines the width of the rolling window. If 'window' is set to a value larger than the
@@ -95,19 +240,72 @@ def rolling_spearman(database: DataFrame, value_01: str, value_02: str, start: i
     age_array = arange((start + gap - 1), (end - gap + 1), 1)
 
     # ------------ OBTAIN VALUES ------------------
-    raw_values = []
-    for age in age_array:
-        sampling = database[database.age_ka.between(age - gap, age + gap)]
-        r, p = spearmanr(sampling[value_01], sampling[value_02])
-        series_values = {"age_ka": age, "age_min": (age - gap), "age_max": (age + gap), "r": r, "p": p}
-        raw_values.append(series_values)
+    ages, x, y = _prepare_pairs(database, value_01, value_02)
+    r, n = sliding_spearman(ages, x, y, age_array, gap)
+
+    return DataFrame({"age_ka": age_array, "age_min": (age_array - gap), "age_max": (age_array + gap), "r": r,
+                      "p": correlation_p_values(r, n)})
 
-    return DataFrame.from_records(raw_values)
 
 
+def align_records(database_01: DataFrame, value_01: str, database_02: DataFrame, value_02: str,
+                  start: int = 2300, end: int = 3600, fs: float = 2.0, method: str = "bin") -> DataFrame:
+    """
+    Place two independently sampled records onto a shared age grid.
+
+    Parameters:
+    - database_01 (pandas.DataFrame): The first record, with an 'age_ka' column.
+    - value_01 (str): The column of the first record to align.
+    - database_02 (pandas.DataFrame): The second record, with an 'age_ka' column.
+    - value_02 (str): The column of the second record to align.
+    - start (int, optional): The first age of the grid (default: 2300).
+    - end (int, optional): The end of the grid, exclusive (default: 3600).
+    - fs (float, optional): The grid spacing in ka (default: 2.0).
+    - method (str, optional): 'bin' to average the samples within ±fs/2 of each grid age, or 'interpolate' to
+      interpolate linearly between samples (default: 'bin').
+
+    Returns:
+    - pandas.DataFrame: Columns 'age_ka', 'value_01' and 'value_02', keeping only the ages where both records have a
+      value. Interpolation is not extended beyond the ages covered by each record.
+
+    Alignments are cached by the content of the two records and the grid parameters, so repeated correlations against
+    the same pair of records only align them once.
+    """
+    # -------------- CHECK ERRORS --------------
+    if method not in ("bin", "interpolate"):
+        raise ValueError("Method must be either 'bin' or 'interpolate'")
+
+    key = (hash_frame(database_01, ["age_ka", value_01]), hash_frame(database_02, ["age_ka", value_02]),
+           start, end, fs, method)
+    if key not in _ALIGNED_RECORDS:
+        age_array = arange(start, end, fs)
+        aligned = {"age_ka": age_array}
+        for name, database, value in (("value_01", database_01, value_01), ("value_02", database_02, value_02)):
+            if method == "bin":
+                aligned[name] = bin_arrays(database.age_ka.to_numpy(), database[value].to_numpy(), age_array,
+                                           fs / 2)["mean"][:, 0]
+            else:
+                record = database[["age_ka", value]].dropna().sort_values(by="age_ka").drop_duplicates(
+                    subset="age_ka")
+                aligned[name] = np.interp(age_array, record.age_ka.to_numpy(dtype=float),
+                                          record[value].to_numpy(dtype=float), left=np.nan, right=np.nan)
+        if len(_ALIGNED_RECORDS) >= ALIGNMENT_CACHE_SIZE:
+            _ALIGNED_RECORDS.pop(next(iter(_ALIGNED_RECORDS)))
+        _ALIGNED_RECORDS[key] = DataFrame(aligned).dropna().reset_index(drop=True)
+
+    return _ALIGNED_RECORDS[key].copy()
+
 
 def rolling_pearson_two_databases(database_01: DataFrame, value_01: str, database_02: DataFrame, value_02,
-                                  start: int = 2300, end: int = 3600, window: int = 100) -> DataFrame:
+                                  start: int = 2300, end: int = 3600, window: int = 100, fs: float = 2.0,
+                                  align: str = "bin") -> DataFrame:
+    """
+    Calculate rolling Pearson correlation coefficients between variables from two separately sampled records.
+
+    The two records are first placed on a shared age grid with align_records (spacing 'fs', using 'align' as the
+    method), and the rolling correlation is then calculated over the aligned pairs exactly as in rolling_pearson. The
+    output has the same 'age_ka', 'age_min', 'age_max', 'r' and 'p' columns.
+    """
     # -------------- CHECK ERRORS --------------
     if window > (end - start):
         raise ValueError("Window size is greater than age interval")
@@ -117,12 +315,9 @@ def rolling_pearson_two_databases(database_01: DataFrame, value_01: str, databas
     age_array = arange((start + gap - 1), (end - gap + 1), 1)
 
     # ------------ OBTAIN VALUES ------------------
-    raw_values = []
-    for age in age_array:
-        sampling_01 = database_01[database_01.age_ka.between(age - gap, age + gap)]
-        sampling_02 = database_02[database_02.age_ka.between(age - gap, age + gap)]
-        r, p = pearsonr(sampling_01[value_01], sampling_02[value_02])
-        series_values = {"age_ka": age, "age_min": (age - gap), "age_max": (age + gap), "r": r, "p": p}
-        raw_values.append(series_values)
-
-    return DataFrame.from_records(raw_values)
+    aligned = align_records(database_01, value_01, database_02, value_02, start=start, end=end, fs=fs, method=align)
+    r, n = sliding_pearson(aligned.age_ka.to_numpy(), aligned.value_01.to_numpy(), aligned.value_02.to_numpy(),
+                           age_array, gap)
+
+    return DataFrame({"age_ka": age_array, "age_min": (age_array - gap), "age_max": (age_array + gap), "r": r,
+                      "p": correlation_p_values(r, n)})
@@ -0,0 +1,167 @@
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy import arange
+from pandas import DataFrame
+
+from methods.interpolations.rolling_pearson import _prepare_pairs, correlation_p_values, sliding_pearson
+from objects.caching.result_cache import cached_result
+
+# Number of surrogates evaluated together by each worker
+SURROGATE_CHUNK_SIZE = 250
+# Largest even grid, as a multiple of the number of samples, that an uneven series is filled out to for its surrogates
+MAX_GRID_RATIO = 4
+
+
+def phase_randomised_surrogates(series: np.ndarray, n_surrogates: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Generate surrogates of an evenly spaced series with the same power spectrum (and so the same autocorrelation) but
+    random Fourier phases. Returns an (n_surrogates x n) array.
+    """
+    series = np.asarray(series, dtype=float)
+    n = len(series)
+    spectrum = np.fft.rfft(series - series.mean())
+    phases = rng.uniform(0.0, 2.0 * np.pi, size=(n_surrogates, len(spectrum)))
+    # Keep the mean and (for an even length) the Nyquist term real
+    phases[:, 0] = 0.0
+    if n % 2 == 0:
+        phases[:, -1] = 0.0
+    return np.fft.irfft(np.abs(spectrum) * np.exp(1j * phases), n=n, axis=-1) + series.mean()
+
+
+def block_bootstrap_surrogates(series: np.ndarray, n_surrogates: int, rng: np.random.Generator,
+                               block_length: int = None) -> np.ndarray:
+    """
+    Generate surrogates by joining randomly chosen (circular) blocks of the series, which keeps the autocorrelation
+    within each block. The default block length is n^(1/3). Returns an (n_surrogates x n) array.
+    """
+    series = np.asarray(series, dtype=float)
+    n = len(series)
+    if block_length is None:
+        block_length = max(1, int(round(n ** (1 / 3))))
+    n_blocks = -(-n // block_length)
+    starts = rng.integers(0, n, size=(n_surrogates, n_blocks, 1))
+    index = (starts + arange(block_length)).reshape(n_surrogates, -1)[:, :n] % n
+    return series[index]
+
+
+def _even_grid(ages: np.ndarray, series: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # The series on an even grid, for the surrogates, and the position of each sample on it. A binned series with
+    # empty bins (e.g. dropped by dropna) keeps its bin width, with those bins filled by linear interpolation; any
+    # other uneven series is interpolated at its median spacing. Evenly spaced series are returned as they are
+    steps = np.diff(ages)
+    steps = steps[steps > 0]
+    if len(steps) == 0 or np.allclose(steps, steps[0]):
+        return series, arange(len(series), dtype=float)
+    step = steps.min()
+    on_grid = np.allclose(steps / step, np.round(steps / step))
+    if not on_grid or (ages[-1] - ages[0]) / step > MAX_GRID_RATIO * len(ages):
+        step = np.median(steps)
+    grid = ages[0] + step * arange(int(np.floor((ages[-1] - ages[0]) / step + 1e-9)) + 1)
+    positions = np.clip((ages - ages[0]) / step, 0, len(grid) - 1)
+    rounded = np.round(positions)
+    return np.interp(grid, ages, series), np.where(np.isclose(positions, rounded), rounded, positions)
+
+
+def _at_positions(surrogates: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    # The surrogates at the (possibly fractional) grid positions of the samples, by linear interpolation
+    low = np.floor(positions).astype(int)
+    high = np.minimum(low + 1, surrogates.shape[-1] - 1)
+    weight = positions - low
+    return surrogates[:, low] * (1.0 - weight) + surrogates[:, high] * weight
+
+
+def _surrogate_correlations(ages: np.ndarray, x: np.ndarray, y_grid: np.ndarray, positions: np.ndarray,
+                            age_array: np.ndarray, gap: float, n_surrogates: int, method: str, block_length: int,
+                            seed: np.random.SeedSequence) -> np.ndarray:
+    # Rolling correlations of x against a batch of surrogates of y, generated on its even grid, as an
+    # (n_surrogates x windows) array
+    rng = np.random.default_rng(seed)
+    if method == "phase":
+        surrogates = phase_randomised_surrogates(y_grid, n_surrogates, rng)
+    else:
+        surrogates = block_bootstrap_surrogates(y_grid, n_surrogates, rng, block_length)
+    r, _ = sliding_pearson(ages, x, _at_positions(surrogates, positions), age_array, gap)
+    return r
+
+
+@cached_result(ignore=("workers",))
+def rolling_significance(database: DataFrame, value_01: str, value_02: str, start: int = 2300, end: int = 3600,
+                         window: int = 100, n_surrogates: int = 1000, method: str = "phase", block_length: int = None,
+                         confidence: float = 0.95, seed: int = 0, workers: int = None) -> DataFrame:
+    """
+    Calculate rolling Pearson correlations together with their significance against autocorrelated surrogates.
+
+    Parameters:
+    - database (pandas.DataFrame): The DataFrame containing the data, evenly spaced in age (e.g. binned). Bins left
+      empty (e.g. by dropna) are filled by linear interpolation for the surrogates only.
+    - value_01 (str): The name of the first variable.
+    - value_02 (str): The name of the second variable, which is replaced by surrogates.
+    - start (int, optional): The starting age of the age interval (default: 2300).
+    - end (int, optional): The ending age of the age interval (default: 3600).
+    - window (int, optional): The size of the rolling window (default: 100).
+    - n_surrogates (int, optional): The number of surrogate series (default: 1000).
+    - method (str, optional): 'phase' for phase-randomised surrogates or 'block' for a block bootstrap
+      (default: 'phase').
+    - block_length (int, optional): The block length, in bins, for the block bootstrap (default: n^(1/3)).
+    - confidence (float, optional): The width of the surrogate confidence band (default: 0.95).
+    - seed (int, optional): The seed for the surrogates; the same seed gives the same result for any number of
+      workers (default: 0).
+    - workers (int, optional): The number of worker processes, or 1 to run in this process (default: all cores).
+
+    Returns:
+    - pandas.DataFrame: The columns of rolling_pearson ('age_ka', 'age_min', 'age_max', 'r', 'p') together with
+      'p_surrogate', the two-sided empirical p-value of 'r' among the surrogates, and 'r_lower'/'r_upper', the
+      confidence band of the surrogate correlations in each window.
+
+    The analytic p-values from rolling_pearson assume independent samples, which binned d18O and sea level series
+    are not. Here the second series is replaced by surrogates that keep its autocorrelation, and the rolling
+    correlation of every surrogate is calculated in batches with the sliding_pearson kernel, spread across a process
+    pool. Each batch has its own seed spawned from 'seed'. Both kinds of surrogate treat neighbouring values as one
+    step apart, so they are generated on the full even grid of the series and read back at its ages, which keeps
+    their autocorrelation in time across missing bins.
+    """
+    # -------------- CHECK ERRORS --------------
+    if window > (end - start):
+        raise ValueError("Window size is greater than age interval")
+    if method not in ("phase", "block"):
+        raise ValueError("Method must be either 'phase' or 'block'")
+    if n_surrogates < 1:
+        raise ValueError("At least one surrogate is required")
+    # -------------- INITIALISE ARRAY ----------------
+    gap = window / 2
+    age_array = arange((start + gap - 1), (end - gap + 1), 1)
+    ages, x, y = _prepare_pairs(database, value_01, value_02)
+    r, n = sliding_pearson(ages, x, y, age_array, gap)
+    y_grid, positions = _even_grid(ages, y)
+
+    # ------------ SURROGATE CORRELATIONS ------------------
+    sizes = [min(SURROGATE_CHUNK_SIZE, n_surrogates - first) for first in range(0, n_surrogates, SURROGATE_CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(ages, x, y_grid, positions, age_array, gap, size, method, block_length, chunk_seed)
+                 for size, chunk_seed in zip(sizes, seeds)]
+    if workers == 1 or len(arguments) == 1:
+        chunks = [_surrogate_correlations(*chunk) for chunk in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_surrogate_correlations, *zip(*arguments)))
+    surrogate_r = np.concatenate(chunks, axis=0)
+
+    # ------------ SIGNIFICANCE ------------------
+    exceed = (np.abs(surrogate_r) >= np.abs(r)).sum(axis=0)
+    tail = (1.0 - confidence) / 2.0
+    with warnings.catch_warnings():
+        # Windows with fewer than two pairs have no surrogate correlations
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        r_lower, r_upper = np.nanquantile(surrogate_r, [tail, 1.0 - tail], axis=0)
+    return DataFrame({
+        "age_ka": age_array,
+        "age_min": (age_array - gap),
+        "age_max": (age_array + gap),
+        "r": r,
+        "p": correlation_p_values(r, n),
+        "p_surrogate": np.where(np.isnan(r), np.nan, (exceed + 1.0) / (n_surrogates + 1.0)),
+        "r_lower": r_lower,
+        "r_upper": r_upper,
+    })
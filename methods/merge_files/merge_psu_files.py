@@ -1,18 +1,69 @@
-import os
+from pathlib import Path
 
 import pandas as pd
 
-os.chdir('../..')
-cores = [607, 1208, 1209]
-for core in cores:
-    # Load the datasets
-    ages = pd.read_csv("data/PSU_Solver/RUN_5/{}_ages.csv".format(core), names=['age_ka'])
-    d18O_sw = pd.read_csv("data/PSU_Solver/RUN_5/{}_d18O_sw.csv".format(core),
-                          names=['d18O_sw', 'd18O_min1', 'd18O_plus1', 'd18O_min2', 'd18O_plus2'])
-    salinity = pd.read_csv("data/PSU_Solver/RUN_5/{}_sal.csv".format(core),
-                           names=['salinity', 'sal_min1', 'sal_plus1', 'sal_min2', 'sal_plus2'])
-    temp = pd.read_csv("data/PSU_Solver/RUN_5/{}_temp.csv".format(core),
-                       names=['temp', 'temp_min1', 'temp_plus1', 'temp_min2', 'temp_plus2'])
-    final = pd.concat([ages, d18O_sw, salinity, temp])
-
-    final.to_csv("data/PSU_Solver/RUN_5/{}_run.csv".format(core))
+from objects.caching.columnar import ROOT
+
+# The directory holding the RUN_N directories of the PSU Solver
+PSU_SOLVER_DIRECTORY = ROOT / "data" / "PSU_Solver"
+# The headerless files written by the PSU Solver for each core, with the names of their columns
+RAW_FILES = {
+    "ages": ['age_ka'],
+    "d18O_sw": ['d18O_sw', 'd18O_min1', 'd18O_plus1', 'd18O_min2', 'd18O_plus2'],
+    "sal": ['salinity', 'sal_min1', 'sal_plus1', 'sal_min2', 'sal_plus2'],
+    "temp": ['temp', 'temp_min1', 'temp_plus1', 'temp_min2', 'temp_plus2'],
+}
+
+
+def raw_data_directory(run: int | str | Path) -> Path:
+    """
+    The directory of raw PSU Solver files for a run, given its number or its directory. Older runs use 'Raw_data'
+    rather than 'raw_data'.
+    """
+    run_directory = Path(run) if isinstance(run, Path) else PSU_SOLVER_DIRECTORY / f"RUN_{run}"
+    for name in ("raw_data", "Raw_data"):
+        if (run_directory / name).is_dir():
+            return run_directory / name
+    raise ValueError(f"{run_directory} has no raw_data directory")
+
+
+def run_cores(run: int | str | Path) -> list[str]:
+    """
+    The cores (e.g. '1208', '1209_mPWP') with raw PSU Solver files in a run.
+    """
+    return sorted(path.name[:-len("_ages.csv")] for path in raw_data_directory(run).glob("*_ages.csv"))
+
+
+def read_raw_run(run: int | str | Path, core: str) -> pd.DataFrame:
+    """
+    Read the raw PSU Solver files of one core in a run into a single frame, one row per sample.
+    """
+    directory = raw_data_directory(run)
+    frames = [pd.read_csv(directory / f"{core}_{name}.csv", names=columns) for name, columns in RAW_FILES.items()]
+    return pd.concat(frames, axis=1)
+
+
+def merge_psu_files(run: int | str | Path = 5, cores: list[str] = None) -> list[Path]:
+    """
+    Merge the raw PSU Solver files of each core in a run into '{core}_run.csv' in the run directory.
+
+    Parameters:
+    - run (int, str or Path, optional): The run number, or the run directory (default: 5).
+    - cores (list[str], optional): The cores to merge (default: every core in the run).
+
+    Returns:
+    - list[Path]: The merged files.
+    """
+    if cores is None:
+        cores = run_cores(run)
+    written = []
+    for core in cores:
+        final = read_raw_run(run, core)
+        path = raw_data_directory(run).parent / f"{core}_run.csv"
+        final.to_csv(path, index=False)
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    merge_psu_files(run=5, cores=["607", "1208", "1209"])
@@ -1,142 +1,209 @@
 from methods.interpolations.binning_records import binning_multiple_series
 from methods.interpolations.filter_data import filter_difference
-from objects.core_data.isotopes import iso_1209, iso_1208
-from objects.core_data.alkenones import sst_846, sst_1208
-from objects.core_data.psu import psu_1208, psu_1209
-from objects.misc.sea_level import sea_level
-from objects.misc.mis_boundaries import mis_boundaries
+from objects.caching.products import ProductGraph
+from objects.core_data import alkenones, isotopes, psu
+from objects.misc import mis_boundaries as boundaries, sea_level as sea_level_record
+from objects.misc.mis_boundaries import label_mis
 from methods.interpolations.rolling_pearson import rolling_spearman, rolling_pearson
 from pandas import DataFrame
 
+# The products of the paper figures. Each is computed the first time it is requested (e.g. 'from analysis import
+# resampled_data', or products.get('resampled_data', resampling_freq=4) for other parameters), so a figure only pays
+# for the products it uses
+products = ProductGraph()
+
+# The parameters of the isotope and SST products, and of the PSU products
+ISOTOPE_PARAMETERS = {"resampling_freq": 2, "age_min": 2200, "age_max": 3600}  # Resampling frequency and ages in ka
+PSU_PARAMETERS = {"psu_resampling_freq": 3, "psu_age_min": 2300, "psu_age_max": 3000}
+
 
 ## ------------- GENERATE DIFFERENCES  -------------
-resampling_freq = 2  # Resampling frequency in ka
-age_min, age_max = 2200, 3600  # Minimum and maximum ages in ka
-resampled_data = binning_multiple_series(
-    iso_1208, iso_1209,
-    names=["1208", "1209"],
-    fs=resampling_freq,
-    start=age_min,
-    end=age_max
-).dropna()
-# Filter the difference in d18O
-filtered_1208, filtered_1209 = filter_difference(resampled_data, 5)
-resampled_data["filtered_difference"] = (filtered_1208 - filtered_1209).tolist()
-resampled_data["difference_d18O"] = resampled_data.d18O_unadj_mean_1208 - resampled_data.d18O_unadj_mean_1209
+@products.node("resampled_data", parameters={**ISOTOPE_PARAMETERS, "filter_period": 10})
+def _resampled_data(resampling_freq, age_min, age_max, filter_period):
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
+    resampled_data = binning_multiple_series(
+        iso_1208, iso_1209,
+        names=["1208", "1209"],
+        fs=resampling_freq,
+        start=age_min,
+        end=age_max
+    ).dropna()
+    # Filter the difference in d18O
+    filtered_1208, filtered_1209 = filter_difference(resampled_data, filter_period)
+    resampled_data["filtered_difference"] = (filtered_1208 - filtered_1209).tolist()
+    resampled_data["difference_d18O"] = resampled_data.d18O_unadj_mean_1208 - resampled_data.d18O_unadj_mean_1209
+    return resampled_data
 
 
 ## ------------- GENERATE DIFFERENCES AND LOOK AT CORRELATIONS WITH SEA LEVEL CURVES -------------
-sea_level_d18 = sea_level.rename(columns={"SL_m": "d18O_unadj"})
-correlate_data = binning_multiple_series(
-    iso_1208, iso_1209, sea_level_d18,
-    names=["1208", "1209", "sea_level"],
-    fs=resampling_freq,
-    start=age_min,
-    end=age_max
-).dropna()
-correlate_data["difference_d18O"] = correlate_data.d18O_unadj_mean_1208 - correlate_data.d18O_unadj_mean_1209
-rolling_corr_spear = rolling_spearman(correlate_data, "difference_d18O", "d18O_unadj_mean_sea_level",
-                                      window=100, start=2400, end=3400)
-rolling_corr_pears = rolling_pearson(correlate_data, "difference_d18O", "d18O_unadj_mean_sea_level",
-                                     window=100, start=2400, end=3400)
+@products.node("correlate_data", parameters=ISOTOPE_PARAMETERS)
+def _correlate_data(resampling_freq, age_min, age_max):
+    sea_level = sea_level_record.sea_level
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
+    sea_level_d18 = sea_level.rename(columns={"SL_m": "d18O_unadj"})
+    correlate_data = binning_multiple_series(
+        iso_1208, iso_1209, sea_level_d18,
+        names=["1208", "1209", "sea_level"],
+        fs=resampling_freq,
+        start=age_min,
+        end=age_max
+    ).dropna()
+    correlate_data["difference_d18O"] = correlate_data.d18O_unadj_mean_1208 - correlate_data.d18O_unadj_mean_1209
+    return correlate_data
+
+
+@products.node("rolling_corr_spear", inputs=("correlate_data",),
+               parameters={"window": 100, "correlation_start": 2400, "correlation_end": 3400})
+def _rolling_corr_spear(correlate_data, window, correlation_start, correlation_end):
+    return rolling_spearman(correlate_data, "difference_d18O", "d18O_unadj_mean_sea_level",
+                            window=window, start=correlation_start, end=correlation_end)
+
+
+@products.node("rolling_corr_pears", inputs=("correlate_data",),
+               parameters={"window": 100, "correlation_start": 2400, "correlation_end": 3400})
+def _rolling_corr_pears(correlate_data, window, correlation_start, correlation_end):
+    return rolling_pearson(correlate_data, "difference_d18O", "d18O_unadj_mean_sea_level",
+                           window=window, start=correlation_start, end=correlation_end)
+
 
 ## ------------- RESAMPLE AND LOOK AT DIFFERENCES IN SST RECORDS -------------
-resampled_SST = binning_multiple_series(
-    sst_846, sst_1208,
-    names=["846", "1208"],
-    start=age_min,
-    end=age_max,
-    value="SST",
-    fs=resampling_freq
-).dropna()
-resampled_SST["difference_SST"] = resampled_SST.SST_mean_846 - resampled_SST.SST_mean_1208
-
-resampled_SST['glacial'] = False
-for _, row in mis_boundaries.iterrows():
-    lower_age = row["age_start"]
-    upper_age = row['age_end']
-    if row["glacial"] == "glacial":
-        resampled_SST.loc[(resampled_SST.age_ka >= lower_age) & (resampled_SST.age_ka < upper_age), 'glacial'] = True
-
-SST_glacials = resampled_SST.loc[resampled_SST.glacial]
-SST_interglacials = resampled_SST.loc[~resampled_SST.glacial]
-
-sst_post = resampled_SST[resampled_SST.age_ka.between(2490, 2730)].difference_SST
-sst_pre = resampled_SST[resampled_SST.age_ka.between(2730, 2900)].difference_SST
-
-sst_glacial_post = SST_glacials[SST_glacials.age_ka.between(2490, 2730)].difference_SST
-sst_glacial_pre = SST_glacials[SST_glacials.age_ka.between(2730, 2900)].difference_SST
-
-sst_interglacial_post = SST_interglacials[SST_interglacials.age_ka.between(2490, 2730)].difference_SST
-sst_interglacial_pre = SST_interglacials[SST_interglacials.age_ka.between(2730, 2900)].difference_SST
-
-sst_gradients = {
-    "sst_grad_1": [sst_post.mean(), sst_post.std()],
-    "sst_grad_2": [sst_pre.mean(), sst_pre.std()],
-    "glacial_sst_grad_1": [sst_glacial_post.mean(), sst_glacial_post.std()],
-    "glacial_sst_grad_2": [sst_glacial_pre.mean(), sst_glacial_pre.std()],
-    "interglacial_sst_grad_1": [sst_interglacial_post.mean(), sst_interglacial_post.std()],
-    "interglacial_sst_grad_2": [sst_interglacial_pre.mean(), sst_interglacial_pre.std()]
-}
+@products.node("resampled_SST", parameters=ISOTOPE_PARAMETERS)
+def _resampled_SST(resampling_freq, age_min, age_max):
+    sst_846 = alkenones.sst_846
+    sst_1208 = alkenones.sst_1208
+    resampled_SST = binning_multiple_series(
+        sst_846, sst_1208,
+        names=["846", "1208"],
+        start=age_min,
+        end=age_max,
+        value="SST",
+        fs=resampling_freq
+    ).dropna()
+    resampled_SST["difference_SST"] = resampled_SST.SST_mean_846 - resampled_SST.SST_mean_1208
+    return label_mis(resampled_SST)
+
+
+@products.node("SST_glacials", inputs=("resampled_SST",))
+def _SST_glacials(resampled_SST):
+    return resampled_SST.loc[resampled_SST.glacial]
+
+
+@products.node("SST_interglacials", inputs=("resampled_SST",))
+def _SST_interglacials(resampled_SST):
+    return resampled_SST.loc[~resampled_SST.glacial]
+
+
+@products.node("sst_gradients", inputs=("resampled_SST", "SST_glacials", "SST_interglacials"))
+def _sst_gradients(resampled_SST, SST_glacials, SST_interglacials):
+    sst_post = resampled_SST[resampled_SST.age_ka.between(2490, 2730)].difference_SST
+    sst_pre = resampled_SST[resampled_SST.age_ka.between(2730, 2900)].difference_SST
+
+    sst_glacial_post = SST_glacials[SST_glacials.age_ka.between(2490, 2730)].difference_SST
+    sst_glacial_pre = SST_glacials[SST_glacials.age_ka.between(2730, 2900)].difference_SST
+
+    sst_interglacial_post = SST_interglacials[SST_interglacials.age_ka.between(2490, 2730)].difference_SST
+    sst_interglacial_pre = SST_interglacials[SST_interglacials.age_ka.between(2730, 2900)].difference_SST
+
+    return {
+        "sst_grad_1": [sst_post.mean(), sst_post.std()],
+        "sst_grad_2": [sst_pre.mean(), sst_pre.std()],
+        "glacial_sst_grad_1": [sst_glacial_post.mean(), sst_glacial_post.std()],
+        "glacial_sst_grad_2": [sst_glacial_pre.mean(), sst_glacial_pre.std()],
+        "interglacial_sst_grad_1": [sst_interglacial_post.mean(), sst_interglacial_post.std()],
+        "interglacial_sst_grad_2": [sst_interglacial_pre.mean(), sst_interglacial_pre.std()]
+    }
 
 
 ## ------------- GENERATE DIFFERENCES ACCORDING TO GLACIALS OR INTERGLACIALS -------------
-input_raw_values_glacials = []
-input_raw_values_interglacials = []
-for _, row in mis_boundaries.iterrows():
-    value_1208 = iso_1208[iso_1208.age_ka.between(row["age_start"], row["age_end"])].d18O_unadj.mean()
-    value_1209 = iso_1209[iso_1209.age_ka.between(row["age_start"], row["age_end"])].d18O_unadj.mean()
-    glacial = (row["glacial"] == "glacial")
-    mid_point = ((row["age_start"] + row["age_end"]) / 2) - 3
-    value = {"age_ka": mid_point, "value_1208": value_1208, "value_1209": value_1209}
-    if row["glacial"] == "glacial":
-        input_raw_values_glacials.append(value)
-    else:
-        input_raw_values_interglacials.append(value)
-
-glacial_means = DataFrame.from_records(input_raw_values_glacials)
-interglacial_means = DataFrame.from_records(input_raw_values_interglacials)
+@products.node("mis_means")
+def _mis_means():
+    mis_boundaries = boundaries.mis_boundaries
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
+    input_raw_values_glacials = []
+    input_raw_values_interglacials = []
+    for _, row in mis_boundaries.iterrows():
+        value_1208 = iso_1208[iso_1208.age_ka.between(row["age_start"], row["age_end"])].d18O_unadj.mean()
+        value_1209 = iso_1209[iso_1209.age_ka.between(row["age_start"], row["age_end"])].d18O_unadj.mean()
+        mid_point = ((row["age_start"] + row["age_end"]) / 2) - 3
+        value = {"age_ka": mid_point, "value_1208": value_1208, "value_1209": value_1209}
+        if row["glacial"] == "glacial":
+            input_raw_values_glacials.append(value)
+        else:
+            input_raw_values_interglacials.append(value)
+    return DataFrame.from_records(input_raw_values_glacials), DataFrame.from_records(input_raw_values_interglacials)
+
+
+@products.node("glacial_means", inputs=("mis_means",))
+def _glacial_means(mis_means):
+    return mis_means[0]
+
+
+@products.node("interglacial_means", inputs=("mis_means",))
+def _interglacial_means(mis_means):
+    return mis_means[1]
 
 
 ## ------------- COMPARE DIFFERENCES IN SST AND d18O -------------
+@products.node("resampled_SST_d18O", inputs=("resampled_SST", "resampled_data"), parameters=ISOTOPE_PARAMETERS)
+def _resampled_SST_d18O(resampled_SST, resampled_data, resampling_freq, age_min, age_max):
+    input_01 = resampled_SST.rename(columns={'difference_SST': 'values'})
+    input_02 = resampled_data.rename(columns={'difference_d18O': 'values'})
 
-input_01 = resampled_SST.rename(columns={'difference_SST': 'values'})
-input_02 = resampled_data.rename(columns={'difference_d18O': 'values'})
-
-resampled_SST_d18O = binning_multiple_series(
-    input_01, input_02,
-    names=["SST", "Dd18O"],
-    start=age_min,
-    end=age_max,
-    value="values",
-    fs=resampling_freq
-).dropna()
+    return binning_multiple_series(
+        input_01, input_02,
+        names=["SST", "Dd18O"],
+        start=age_min,
+        end=age_max,
+        value="values",
+        fs=resampling_freq
+    ).dropna()
 
 
+@products.node("rolling_corr_SST_d18O", inputs=("resampled_SST_d18O",),
+               parameters={"window": 100, "sst_correlation_start": 2500, "sst_correlation_end": 3300})
+def _rolling_corr_SST_d18O(resampled_SST_d18O, window, sst_correlation_start, sst_correlation_end):
+    return rolling_pearson(resampled_SST_d18O, "values_mean_Dd18O", "values_mean_SST",
+                           window=window, start=sst_correlation_start, end=sst_correlation_end)
 
-rolling_corr_SST_d18O = rolling_pearson(resampled_SST_d18O, "values_mean_Dd18O", "values_mean_SST",
-                                     window=100, start=2500, end=3300)
 
 ## ------------- GENERATE DIFFERENCES IN PSU  -------------
-resampling_freq = 3  # Resampling frequency in ka
-age_min, age_max = 2300, 3000  # Minimum and maximum ages in ka
-resampled_temp = binning_multiple_series(
-    psu_1208, psu_1209,
-    names=["1208", "1209"],
-    fs=resampling_freq,
-    start=age_min,
-    end=age_max,
-    value='temp'
-).dropna()
-
-resampled_sw = binning_multiple_series(
-    psu_1208, psu_1209,
-    names=["1208", "1209"],
-    fs=resampling_freq,
-    start=age_min,
-    end=age_max,
-    value='d18O_sw'
-).dropna()
-
-resampled_temp["difference_temp"] = resampled_temp.temp_mean_1208 - resampled_temp.temp_mean_1209
-resampled_sw['difference_d18Osw'] = resampled_sw.d18O_sw_mean_1208 - resampled_sw.d18O_sw_mean_1209
+@products.node("resampled_temp", parameters=PSU_PARAMETERS)
+def _resampled_temp(psu_resampling_freq, psu_age_min, psu_age_max):
+    psu_1208 = psu.psu_1208
+    psu_1209 = psu.psu_1209
+    resampled_temp = binning_multiple_series(
+        psu_1208, psu_1209,
+        names=["1208", "1209"],
+        fs=psu_resampling_freq,
+        start=psu_age_min,
+        end=psu_age_max,
+        value='temp'
+    ).dropna()
+    resampled_temp["difference_temp"] = resampled_temp.temp_mean_1208 - resampled_temp.temp_mean_1209
+    return resampled_temp
+
+
+@products.node("resampled_sw", parameters=PSU_PARAMETERS)
+def _resampled_sw(psu_resampling_freq, psu_age_min, psu_age_max):
+    psu_1208 = psu.psu_1208
+    psu_1209 = psu.psu_1209
+    resampled_sw = binning_multiple_series(
+        psu_1208, psu_1209,
+        names=["1208", "1209"],
+        fs=psu_resampling_freq,
+        start=psu_age_min,
+        end=psu_age_max,
+        value='d18O_sw'
+    ).dropna()
+    resampled_sw['difference_d18Osw'] = resampled_sw.d18O_sw_mean_1208 - resampled_sw.d18O_sw_mean_1209
+    return resampled_sw
+
+
+def __getattr__(name: str):
+    # The historic module level names (e.g. 'from analysis import resampled_data') are the products at their defaults
+    if name in products:
+        return products.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
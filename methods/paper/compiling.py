@@ -9,7 +9,7 @@ from methods.paper.plotting import (isotope_plot, iso_607_plot, psu_bwt_plot, ps
                                     difference_plot_glacials, average_difference_plot, difference_plot,
                                     planktic_difference_plot, isotope_plot_1207,
                                     alkenone_gradient_plot_glacial_interglacials, difference_temperature_plot,
-                                    difference_d18Osw_plot, probStack_plot)
+                                    difference_d18Osw_plot, probStack_plot, surrogate_significance_plot_sea_level)
 
 
 def figure_1(save_fig: bool = False) -> None:
@@ -200,8 +200,9 @@ def figure_alkenone_SSTs(save_fig: bool = False) -> None:
         plt.show()
 
 
-def figure_sea_level_correlation(save_fig: bool = False) -> None:
+def figure_sea_level_correlation(save_fig: bool = False, n_surrogates: int = 0) -> None:
     # Calculates the rolling correlation between difference in d18O and Sea Levels
+    # If n_surrogates is given, the significance is tested against that many sea level surrogates
     num_rows = 4
     fig, axs = plt.subplots(
         nrows=num_rows,
@@ -218,7 +219,10 @@ def figure_sea_level_correlation(save_fig: bool = False) -> None:
     axs[0] = sea_level_plot(axs[0], colour="k")  # Sea Level Plot
     axs[1] = filtered_difference_plot(axs[1])  # Filtered difference plot
     axs[2] = pearson_correlation_plot_sea_level(axs[2])  # Correlation Plot
-    axs[3] = pearson_significance_plot_sea_level(axs[3])  # Significance Plot
+    if n_surrogates:
+        axs[3] = surrogate_significance_plot_sea_level(axs[3], n_surrogates)  # Surrogate Significance Plot
+    else:
+        axs[3] = pearson_significance_plot_sea_level(axs[3])  # Significance Plot
 
     tick_dirs(axs, num_plots=num_rows, min_age=2400, max_age=3400, legend=False)
 
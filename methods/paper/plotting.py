@@ -1,21 +1,19 @@
 import matplotlib.pyplot as plt
 
 
-from objects.misc.sea_level import sea_level
-from objects.misc.mis_boundaries import mis_boundaries
 from objects.arguments.args_Nature import args_1209, args_1208, fill_1208, fill_1209, args_607, fill_607, colours, args_1207
-from objects.core_data.psu import psu_1208, psu_1209, psu_607
-from objects.core_data.isotopes import iso_1208, iso_1209, iso_607, iso_1207
-from objects.core_data.lr04 import iso_probstack
-from objects.core_data.misc_proxies import opal_882
-from objects.core_data.alkenones import sst_846, sst_1208
-from objects.core_data.planktics import planktics_1208, planktics_1209, planktics_1207
-from analysis import (resampled_data, resampled_SST, rolling_corr_spear, rolling_corr_pears, sst_gradients,
-                      glacial_means, interglacial_means, resampled_temp, resampled_sw)
+# The datasets and analysis products are read from their modules inside each plot, so a figure only loads the datasets
+# and computes the products it uses
+from objects.misc import mis_boundaries as boundaries, sea_level as sea_level_record
+from objects.core_data import alkenones, isotopes, lr04, misc_proxies, planktics, psu
+import analysis
+from methods.interpolations.rolling_significance import rolling_significance
 from methods.figures.arrows import draw_arrows
 
 
 def isotope_plot(ax: plt.axis) -> plt.axis:
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
     ax.plot(iso_1208.age_ka, iso_1208.d18O_unadj, **args_1208)
     ax.fill_between(iso_1208.age_ka, iso_1208.d18O_unadj - 0.05, iso_1208.d18O_unadj + 0.05, **fill_1208)
     ax.plot(iso_1209.age_ka, iso_1209.d18O_unadj, **args_1209)
@@ -26,6 +24,9 @@ def isotope_plot(ax: plt.axis) -> plt.axis:
 
 
 def isotope_plot_1207(ax: plt.axis) -> plt.axis:
+    iso_1207 = isotopes.iso_1207
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
     ax.plot(iso_1207.age_ka, iso_1207.d18O_unadj, **args_1207)
     ax.plot(iso_1208.age_ka, iso_1208.d18O_unadj, **args_1208)
     ax.plot(iso_1209.age_ka, iso_1209.d18O_unadj, **args_1209)
@@ -35,6 +36,8 @@ def isotope_plot_1207(ax: plt.axis) -> plt.axis:
 
 
 def psu_bwt_plot(ax: plt.axis) -> plt.axis:
+    psu_1208 = psu.psu_1208
+    psu_1209 = psu.psu_1209
     ax.plot(psu_1208.age_ka, psu_1208.temp, **args_1208)
     ax.fill_between(psu_1208.age_ka, psu_1208.temp_min1, psu_1208.temp_plus1, **fill_1208)
     ax.plot(psu_1209.age_ka, psu_1209.temp, **args_1209)
@@ -44,6 +47,8 @@ def psu_bwt_plot(ax: plt.axis) -> plt.axis:
 
 
 def psu_d18sw_plot(ax: plt.axis) -> plt.axis:
+    psu_1208 = psu.psu_1208
+    psu_1209 = psu.psu_1209
     ax.plot(psu_1208.age_ka, psu_1208.d18O_sw, **args_1208)
     ax.fill_between(psu_1208.age_ka, psu_1208.d18O_min1, psu_1208.d18O_plus1, **fill_1208)
     ax.plot(psu_1209.age_ka, psu_1209.d18O_sw, **args_1209)
@@ -54,17 +59,20 @@ def psu_d18sw_plot(ax: plt.axis) -> plt.axis:
 
 
 def iso_607_plot(ax: plt.axis) -> plt.axis:
+    iso_607 = isotopes.iso_607
     ax.plot(iso_607.age_ka, iso_607.d18O, **args_607)
     return ax
 
 
 def psu_607_plot(ax: plt.axis) -> plt.axis:
+    psu_607 = psu.psu_607
     ax.plot(psu_607.age_ka, psu_607.temp, **args_607)
     ax.fill_between(psu_607.age_ka, psu_607.temp_min1, psu_607.temp_plus1, **fill_607)
     return ax
 
 
 def sea_level_plot(ax: plt.axis, colour: str = None,  age_min: int = 2400, age_max: int = 3600) -> plt.axis:
+    sea_level = sea_level_record.sea_level
     if colour:
         args = {"marker": None, "color": colour}
     else:
@@ -78,6 +86,7 @@ def sea_level_plot(ax: plt.axis, colour: str = None,  age_min: int = 2400, age_m
 
 
 def difference_plot(ax: plt.axis, colour: str = None, centre_line: bool = False, left: int = 1) -> plt.axis:
+    resampled_data = analysis.resampled_data
     if colour:
         args = {"marker": None, "color": colour}
     else:
@@ -93,6 +102,8 @@ def difference_plot(ax: plt.axis, colour: str = None, centre_line: bool = False,
 
 
 def filtered_difference_plot(ax: plt.axis) -> plt.axis:
+    resampled_data = analysis.resampled_data
+    mis_boundaries = boundaries.mis_boundaries
     filter_diff = resampled_data[resampled_data.age_ka.between(2400, 3400)]
     filter_diff.insert(0, 'glacial', False)
     for _, row in mis_boundaries.iterrows():
@@ -112,6 +123,7 @@ def filtered_difference_plot(ax: plt.axis) -> plt.axis:
 
 
 def opal_plot(ax: plt.axis, colour: str = None) -> plt.axis:
+    opal_882 = misc_proxies.opal_882
     if colour:
         args = {"marker": None, "color": colour}
     else:
@@ -122,6 +134,8 @@ def opal_plot(ax: plt.axis, colour: str = None) -> plt.axis:
 
 
 def alkenone_plot(ax: plt.axis) -> plt.axis:
+    sst_846 = alkenones.sst_846
+    sst_1208 = alkenones.sst_1208
     ax.plot(sst_846.age_ka, sst_846.SST, color='gray', marker='o', label="ODP 846 (Equatorial Pacific)", ms=3, mfc="white")
     ax.plot(sst_1208.age_ka, sst_1208.temp, color='k', marker="D", label="ODP 1208 (NW Pacific)", ms=3, mfc="white")
     ax.legend(frameon=True)
@@ -130,6 +144,8 @@ def alkenone_plot(ax: plt.axis) -> plt.axis:
 
 
 def alkenone_gradient_plot(ax: plt.axis) -> plt.axis:
+    resampled_SST = analysis.resampled_SST
+    sst_gradients = analysis.sst_gradients
     args = {"marker": "+", "label": "846 - 1208", "color": "k", "lw": 1.2}
     ax.plot(resampled_SST.age_ka, resampled_SST.difference_SST, **args)
     ax.plot([2490, 2730], [sst_gradients["sst_grad_1"][0], sst_gradients["sst_grad_1"][0]], color='g')
@@ -143,6 +159,8 @@ def alkenone_gradient_plot(ax: plt.axis) -> plt.axis:
 
 
 def alkenone_gradient_plot_glacial_interglacials(ax: plt.axis) -> plt.axis:
+    resampled_SST = analysis.resampled_SST
+    sst_gradients = analysis.sst_gradients
     args = {"marker": "+", "label": "846 - 1208", "color": "k", "lw": 1.2}
     ax.plot(resampled_SST.age_ka, resampled_SST.difference_SST, **args)
     ax.plot([2490, 2730], [sst_gradients["glacial_sst_grad_1"][0], sst_gradients["glacial_sst_grad_1"][0]], color='b')
@@ -161,12 +179,14 @@ def alkenone_gradient_plot_glacial_interglacials(ax: plt.axis) -> plt.axis:
     return ax
 
 def spearman_correlation_plot_sea_level(ax: plt.axis) -> plt.axis:
+    rolling_corr_spear = analysis.rolling_corr_spear
     ax.plot(rolling_corr_spear.age_ka, (rolling_corr_spear.r ** 2), c="k")  # Plot the correlation
     ax.set(ylabel="Rolling Correlation ({})".format(r'r$^2$'))
     return ax
 
 
 def spearman_significance_plot_sea_level(ax: plt.axis) -> plt.axis:
+    rolling_corr_spear = analysis.rolling_corr_spear
     ax.plot(rolling_corr_spear.age_ka, rolling_corr_spear.p, c="k")  # Plot the significance
     ax.axhline(0.05, c='r', ls="--", label="p = 0.05")
     ax.invert_yaxis()
@@ -175,12 +195,14 @@ def spearman_significance_plot_sea_level(ax: plt.axis) -> plt.axis:
 
 
 def pearson_correlation_plot_sea_level(ax: plt.axis) -> plt.axis:
+    rolling_corr_pears = analysis.rolling_corr_pears
     ax.plot(rolling_corr_pears.age_ka, (rolling_corr_pears.r ** 2), c="k")  # Plot the correlation
     ax.set(ylabel="Rolling Correlation ({})".format(r'r$^2$'))
     return ax
 
 
 def pearson_significance_plot_sea_level(ax: plt.axis) -> plt.axis:
+    rolling_corr_pears = analysis.rolling_corr_pears
     ax.plot(rolling_corr_pears.age_ka, rolling_corr_pears.p, c="k")  # Plot the significance
     ax.axhline(0.05, c='r', ls="--", label="p = 0.05")
     ax.invert_yaxis()
@@ -188,7 +210,22 @@ def pearson_significance_plot_sea_level(ax: plt.axis) -> plt.axis:
     return ax
 
 
+def surrogate_significance_plot_sea_level(ax: plt.axis, n_surrogates: int = 1000) -> plt.axis:
+    # Significance of the rolling correlation against phase-randomised sea level surrogates
+    correlate_data = analysis.correlate_data
+    significance = rolling_significance(correlate_data, "difference_d18O", "d18O_unadj_mean_sea_level",
+                                        window=100, start=2400, end=3400, n_surrogates=n_surrogates)
+    ax.plot(significance.age_ka, significance.p_surrogate, c="k")  # Plot the significance
+    ax.axhline(0.05, c='r', ls="--", label="p = 0.05")
+    ax.invert_yaxis()
+    ax.set(ylabel="Surrogate Significance (p-value)", yscale="log")
+    return ax
+
+
 def difference_plot_glacials(ax: plt.axis, left: int = 1) -> plt.axis:
+    resampled_data = analysis.resampled_data
+    glacial_means = analysis.glacial_means
+    interglacial_means = analysis.interglacial_means
     filter_diff = resampled_data[resampled_data.age_ka.between(2400, 3400)]
     ax.plot(filter_diff.age_ka, filter_diff.difference_d18O, marker="+", color="tab:grey", label=None,
             alpha=0.7)
@@ -205,6 +242,7 @@ def difference_plot_glacials(ax: plt.axis, left: int = 1) -> plt.axis:
 
 
 def average_difference_plot(ax: plt.axis, start=2700, end=3300) -> plt.axis:
+    resampled_data = analysis.resampled_data
     ax.plot(resampled_data.age_ka, resampled_data.difference_d18O, marker=None)
     avg_pre = resampled_data[resampled_data.age_ka.between(start, end)].difference_d18O.mean()
     std_pre = resampled_data[resampled_data.age_ka.between(start, end)].difference_d18O.std()
@@ -216,6 +254,9 @@ def average_difference_plot(ax: plt.axis, start=2700, end=3300) -> plt.axis:
 
 
 def planktic_difference_plot(ax: plt.axis) -> plt.axis:
+    planktics_1207 = planktics.planktics_1207
+    planktics_1208 = planktics.planktics_1208
+    planktics_1209 = planktics.planktics_1209
     ax.plot(planktics_1207.age_ka, planktics_1207.d18O, label="1207", c=colours[2], marker="+")
     ax.plot(planktics_1208.age_ka, planktics_1208.d18O, label="1208", c=colours[0], marker="+")
     ax.plot(planktics_1209.age_ka, planktics_1209.d18O, label="1209", c=colours[1], marker="+")
@@ -225,6 +266,7 @@ def planktic_difference_plot(ax: plt.axis) -> plt.axis:
 
 
 def probStack_plot(ax: plt.axis, colour=colours[2]) -> plt.axis:
+    iso_probstack = lr04.iso_probstack
     ax.plot(iso_probstack.age_ka, iso_probstack.d18O_unadj, c=colour)
     ax.invert_yaxis()
     ax.set(ylabel='Probabilistic {} stack ({}, VPDB)'.format(r'$\delta^{18}$O', u"\u2030"))
@@ -232,6 +274,7 @@ def probStack_plot(ax: plt.axis, colour=colours[2]) -> plt.axis:
 
 
 def difference_temperature_plot(ax: plt.axis, colour=colours[1]) -> plt.axis:
+    resampled_temp = analysis.resampled_temp
     ax.plot(resampled_temp.age_ka, resampled_temp.difference_temp, marker='+', c=colour)
     ax.set(ylabel='Difference in BWT ({})'.format(u'\N{DEGREE SIGN}C'))
     ax.fill_between(resampled_temp.age_ka, resampled_temp.difference_temp, fc=colour, alpha=0.2)
@@ -239,6 +282,7 @@ def difference_temperature_plot(ax: plt.axis, colour=colours[1]) -> plt.axis:
 
 
 def difference_d18Osw_plot(ax: plt.axis, colour=colours[1]) -> plt.axis:
+    resampled_sw = analysis.resampled_sw
     ax.plot(resampled_sw.age_ka, resampled_sw.difference_d18Osw, marker='+', c=colour)
     ax.set(ylabel='Difference in {} ({})'.format(r'$\delta^{18}$O$_{sw}$', u"\u2030"))
     ax.fill_between(resampled_sw.age_ka, resampled_sw.difference_d18Osw, fc=colour, alpha=0.2)
@@ -0,0 +1,172 @@
+import hashlib
+import inspect
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from methods.density import calculations
+from methods.merge_files.merge_psu_files import read_raw_run
+from methods.psu_solver import solver
+from methods.psu_solver.solver import OUTPUT_NAMES, read_input_set, solve_psu
+from objects.caching.columnar import ROOT, hash_file, read_frame, write_frame
+from objects.caching.hashing import hash_frame
+
+# The PSU Solver input sets and the cache of solved runs
+SETS_DIRECTORY = ROOT / "data" / "PSU_Solver" / "sets"
+RUN_CACHE_DIRECTORY = ROOT / "data" / ".cache" / "psu_runs"
+# The sites run by default
+SITES = ("607", "849", "1208", "1209", "1014", "1018", "U1313")
+# The default solver parameters, so that a default left implicit and the same value given explicitly share a run
+SOLVER_DEFAULTS = {name: parameter.default for name, parameter in inspect.signature(solve_psu).parameters.items()
+                   if parameter.default is not inspect.Parameter.empty}
+# A hash of the solver code and the sea level corrections it uses, so that cached runs are solved again once they change
+SOLVER_HASH = hashlib.sha1("".join(hash_file(Path(module.__file__)) for module in (solver, calculations)).encode()
+                           ).hexdigest()
+# The largest differences from a PSU Solver RUN output accepted by check_run: of the median difference of each variable
+# (degC, psu, permil), and of the ratio of the 1 sigma widths from one
+RUN_TOLERANCE = {"temp": 0.2, "salinity": 0.3, "d18O_sw": 0.1, "width": 0.25}
+
+
+def site_input(site: str) -> Path:
+    """
+    The default input set of a site, data/PSU_Solver/sets/{site}_together.csv.
+    """
+    path = SETS_DIRECTORY / f"{site}_together.csv"
+    if not path.exists():
+        raise ValueError(f"No input set for site {site}; pass its input explicitly")
+    return path
+
+
+def run_key(data: DataFrame, parameters: dict) -> str:
+    """
+    The content address of a run: a hash of the input samples together with the solver parameters and code.
+    """
+    digest = hashlib.sha1(hash_frame(data, ["age_ka", "d18O", "MgCa"]).encode())
+    digest.update(SOLVER_HASH.encode())
+    digest.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _solve_site(site: str, data: DataFrame, parameters: dict, key: str, directory: Path) -> dict:
+    # Solve one site and write it to the cache, returning its metadata
+    started = time.perf_counter()
+    result = solve_psu(data, **parameters)
+    seconds = time.perf_counter() - started
+    directory.mkdir(parents=True, exist_ok=True)
+    path = write_frame(result, directory / key)
+    metadata = {"site": site, "key": key, "file": path.name, "parameters": parameters, "samples": len(data),
+                "seconds": seconds, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    (directory / f"{key}.json").write_text(json.dumps(metadata, default=str))
+    return metadata
+
+
+def run_sites(sites: list[str] | dict[str, str | DataFrame] = None, workers: int = None,
+              directory: Path = RUN_CACHE_DIRECTORY, **parameters) -> dict[str, DataFrame]:
+    """
+    Solve several sites with the PSU solver, reusing any run already in the cache.
+
+    Parameters:
+    - sites (list or dict, optional): The sites to run, as names (using their default input sets) or as a dictionary
+      mapping each site to an input set path or a DataFrame of samples (default: every site in SITES with an input
+      set).
+    - workers (int, optional): The number of worker processes, or 1 to run in this process (default: all cores).
+    - directory (Path, optional): The run cache (default: data/.cache/psu_runs).
+    - parameters: Any further arguments for solve_psu (e.g. n_realisations, mgca_calibration, seed).
+
+    Returns:
+    - dict[str, pandas.DataFrame]: The solved quantiles of each site.
+
+    Each run is addressed by a hash of its input samples, solver parameters and solver code. Runs whose hash is already
+    in the cache are read back; the others are spread across a process pool, and their timings are stored with them
+    (see run_log).
+    Re-running a calibration sweep therefore only solves the combinations that changed.
+    """
+    # -------------- RESOLVE INPUTS --------------
+    if sites is None:
+        sites = {site: SETS_DIRECTORY / f"{site}_together.csv" for site in SITES
+                 if (SETS_DIRECTORY / f"{site}_together.csv").exists()}
+    elif not isinstance(sites, dict):
+        sites = {str(site): site_input(str(site)) for site in sites}
+    inputs = {site: (data if isinstance(data, DataFrame) else read_input_set(data)) for site, data in sites.items()}
+    directory = Path(directory)
+    parameters = {**SOLVER_DEFAULTS, **parameters}
+
+    # -------------- READ CACHED RUNS --------------
+    results = {}
+    pending = []
+    for site, data in inputs.items():
+        key = run_key(data, parameters)
+        metadata_path = directory / f"{key}.json"
+        try:
+            results[site] = read_frame(directory / json.loads(metadata_path.read_text())["file"])
+        except (OSError, ValueError, KeyError, ImportError):
+            pending.append((site, data, parameters, key, directory))
+
+    # -------------- SOLVE NEW RUNS --------------
+    if workers == 1 or len(pending) <= 1:
+        solved = [_solve_site(*run) for run in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            solved = list(executor.map(_solve_site, *zip(*pending)))
+    for metadata in solved:
+        results[metadata["site"]] = read_frame(directory / metadata["file"])
+    return {site: results[site] for site in inputs}
+
+
+def run_log(directory: Path = RUN_CACHE_DIRECTORY) -> DataFrame:
+    """
+    List every cached run with its site, parameters, number of samples and the time it took to solve.
+    """
+    runs = [json.loads(path.read_text()) for path in Path(directory).glob("*.json")]
+    columns = ["site", "key", "samples", "seconds", "created", "parameters"]
+    log = DataFrame(runs, columns=columns + ["file"])[columns]
+    return log.sort_values(by="created", ignore_index=True)
+
+
+def check_run(site: str = "1208", run: int | str = 15, tolerance: dict[str, float] = None,
+              directory: Path = RUN_CACHE_DIRECTORY, **parameters) -> DataFrame:
+    """
+    Check that solve_psu reproduces a PSU Solver RUN output of a site (by default RUN_15, data/cores/1208_psu.csv).
+
+    Parameters:
+    - site (str, optional): The site, solved from its default input set (default: '1208').
+    - run (int or str, optional): The run to reproduce (default: 15).
+    - tolerance (dict, optional): The accepted differences, of the same form as RUN_TOLERANCE (default: RUN_TOLERANCE).
+    - directory (Path, optional): The run cache (default: data/.cache/psu_runs).
+    - parameters: Any further arguments for solve_psu.
+
+    Returns:
+    - pandas.DataFrame: For each variable, the median difference from the run ('difference') and the median 1 sigma
+      half-widths of the solver and the run ('width', 'run_width') with their ratio ('width_ratio').
+
+    Raises:
+    - ValueError: If any difference is beyond the tolerance.
+
+    The PSU Solver smooths its outputs through time, so they are compared over the samples matched by age (within
+    2 ka) through their median differences and band widths rather than sample by sample.
+    """
+    tolerance = {**RUN_TOLERANCE, **(tolerance or {})}
+    solved = run_sites([site], workers=1, directory=directory, **parameters)[site].sort_values(by="age_ka")
+    output = read_raw_run(run, site).sort_values(by="age_ka")
+    matched = pd.merge_asof(solved, output, on="age_ka", direction="nearest", tolerance=2.0,
+                            suffixes=("", "_run")).dropna(subset=["temp_run"])
+    if matched.empty:
+        raise ValueError(f"No samples of site {site} match the ages of run {run}")
+
+    rows = []
+    for name, (label, prefix) in OUTPUT_NAMES.items():
+        width = np.median(matched[f"{prefix}_plus1"] - matched[f"{prefix}_min1"]) / 2
+        run_width = np.median(matched[f"{prefix}_plus1_run"] - matched[f"{prefix}_min1_run"]) / 2
+        rows.append({"variable": name, "difference": np.median(matched[label] - matched[f"{label}_run"]),
+                     "width": width, "run_width": run_width, "width_ratio": width / run_width})
+    check = DataFrame(rows)
+    failed = check[(check.difference.abs() > check.variable.map(tolerance))
+                   | ((check.width_ratio - 1).abs() > tolerance["width"])]
+    if not failed.empty:
+        raise ValueError(f"Site {site} differs from run {run} beyond the tolerance in {', '.join(failed.variable)}")
+    return check
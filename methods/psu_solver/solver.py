@@ -0,0 +1,205 @@
+import numpy as np
+from pandas import DataFrame, read_csv
+
+from methods.density.calculations import sea_level_lookup
+
+# Mg/Ca-temperature calibrations, as (mean, 1 sigma) of each coefficient. 'linear' is Mg/Ca = a + b * T and
+# 'exponential' is Mg/Ca = a * exp(b * T); pass a dictionary of the same form to use another.
+MGCA_CALIBRATIONS = {
+    "uvigerina": {"form": "linear", "a": (0.9, 0.07), "b": (0.1, 0.01)},  # Elderfield et al., 2010
+    "cibicidoides": {"form": "exponential", "a": (0.867, 0.049), "b": (0.109, 0.007)},  # Lear et al., 2002
+}
+# d18O paleotemperature equations of the form d18O_c - d18O_sw + offset = a - b * T, as (mean, 1 sigma). 'psu_solver'
+# is Marchitto et al., 2014 with an offset fitted to the RUN outputs (data/cores/*_psu.csv, RUN_15) rather than
+# published: the RUN d18O_sw of 1208 sits about 1.3 permil below the equation with its own VPDB-VSMOW offset of 0.27,
+# for a correction the RUNs do not record. Use 'marchitto_2014' for the published equation
+D18O_CALIBRATIONS = {
+    "psu_solver": {"a": (3.53, 0.02), "b": (0.224, 0.005), "offset": -1.04},
+    "marchitto_2014": {"a": (3.53, 0.02), "b": (0.224, 0.005), "offset": 0.27},
+    "shackleton_1974": {"a": (4.225, 0.0), "b": (0.25, 0.0), "offset": 0.0},
+}
+# Seawater d18O-salinity relations, d18O_sw = slope * S + intercept. 'psu_solver' is the relation in the RUN outputs
+SALINITY_RELATIONS = {
+    "psu_solver": (0.27, -8.88),
+    "legrande_schmidt_2006": (0.44, -15.13),
+}
+# Quantiles reported for each variable: the median and the 1 and 2 sigma bounds of a normal distribution
+QUANTILES = {"": 0.5, "_min1": 0.158655, "_plus1": 0.841345, "_min2": 0.02275, "_plus2": 0.97725}
+# Names of each variable in the output columns, matching data/cores/*_psu.csv
+OUTPUT_NAMES = {"temp": ("temp", "temp"), "salinity": ("salinity", "sal"), "d18O_sw": ("d18O_sw", "d18O")}
+# Candidate input columns, in order of preference
+D18O_COLUMNS = ("d18O_uvi", "d18O", "d18O_unadj")
+MGCA_COLUMNS = ("MgCa_merged", "MgCa_adj", "MgCa")
+# Largest number of (realisation x sample) cells held in memory at once
+SOLVER_CHUNK_CELLS = 4_000_000
+# Number of age sigmas beyond which a sampled age is taken never to land, bounding the neighbours solved with a chunk
+AGE_HALO_SIGMAS = 6.0
+
+
+def read_input_set(path: str, d18O_column: str = None, mgca_column: str = None) -> DataFrame:
+    """
+    Read a PSU Solver input set (e.g. data/PSU_Solver/sets/1208_together.csv).
+
+    Parameters:
+    - path (str): The input set.
+    - d18O_column (str, optional): The foraminiferal d18O column (default: the first of D18O_COLUMNS present).
+    - mgca_column (str, optional): The Mg/Ca column (default: the first of MGCA_COLUMNS present).
+
+    Returns:
+    - pandas.DataFrame: The columns 'age_ka', 'd18O' and 'MgCa' for the samples with both measurements, sorted by age.
+    """
+    data = read_csv(path)
+    if d18O_column is None:
+        d18O_column = next((column for column in D18O_COLUMNS if column in data.columns), None)
+    if mgca_column is None:
+        mgca_column = next((column for column in MGCA_COLUMNS if column in data.columns), None)
+    if d18O_column is None or mgca_column is None:
+        raise ValueError(f"{path} needs both a d18O and a Mg/Ca column")
+    data = data[["age_ka", d18O_column, mgca_column]].set_axis(["age_ka", "d18O", "MgCa"], axis=1)
+    return data.dropna().sort_values(by="age_ka", ignore_index=True)
+
+
+def _calibration(calibration: str | dict, calibrations: dict, kind: str) -> dict:
+    # Look up a named calibration, or accept a dictionary of the same form
+    if isinstance(calibration, dict):
+        return calibration
+    if calibration not in calibrations:
+        raise ValueError(f"The {kind} calibration must be one of {', '.join(calibrations)}")
+    return calibrations[calibration]
+
+
+def _draw(rng: np.random.Generator, coefficient: tuple[float, float], size: int) -> np.ndarray:
+    # One draw of a calibration coefficient per realisation, as a column to broadcast across samples
+    mean, sigma = coefficient
+    return (mean + sigma * rng.standard_normal(size))[:, None]
+
+
+def _interpolate_rows(ages: np.ndarray, values: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # Linear interpolation of each realisation (row) of values, at its own sampled ages, onto the target ages, holding
+    # the end values beyond the ages of a row as np.interp does. The rows are offset by more than the span of all the
+    # ages so that a single search finds every target in its own row
+    rows, n = ages.shape
+    order = np.argsort(ages, axis=1)
+    ages = np.take_along_axis(ages, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    if n == 1:
+        return np.repeat(values, len(targets), axis=1)
+    low = min(ages.min(), targets.min())
+    span = max(ages.max(), targets.max()) - low + 1.0
+    offsets = span * np.arange(rows)[:, None]
+    found = np.searchsorted((ages - low + offsets).ravel(), (targets[None, :] - low + offsets).ravel())
+    right = np.clip(found.reshape(rows, -1) - n * np.arange(rows)[:, None], 1, n - 1)
+    left_age, right_age = np.take_along_axis(ages, right - 1, axis=1), np.take_along_axis(ages, right, axis=1)
+    left_value, right_value = np.take_along_axis(values, right - 1, axis=1), np.take_along_axis(values, right, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.clip((targets[None, :] - left_age) / (right_age - left_age), 0.0, 1.0)
+    weight = np.where(right_age > left_age, weight, 0.0)
+    return left_value + weight * (right_value - left_value)
+
+
+def solve_psu(data: DataFrame, n_realisations: int = 10000, mgca_calibration: str | dict = "uvigerina",
+              d18O_calibration: str | dict = "psu_solver", salinity_relation: str = "psu_solver",
+              mgca_error: float = 0.02, d18O_error: float = 0.08, age_error: float = 2.0,
+              ice_volume: bool = False, seed: int = 0) -> DataFrame:
+    """
+    Solve for bottom water temperature, seawater d18O and salinity by Monte Carlo simulation.
+
+    Parameters:
+    - data (pandas.DataFrame): The samples, with the columns 'age_ka', 'd18O' and 'MgCa' (see read_input_set).
+    - n_realisations (int, optional): The number of Monte Carlo realisations (default: 10000).
+    - mgca_calibration (str or dict, optional): A key of MGCA_CALIBRATIONS or a calibration of the same form
+      (default: 'uvigerina').
+    - d18O_calibration (str or dict, optional): A key of D18O_CALIBRATIONS or an equation of the same form
+      (default: 'psu_solver').
+    - salinity_relation (str, optional): A key of SALINITY_RELATIONS (default: 'psu_solver').
+    - mgca_error (float, optional): The 1 sigma analytical uncertainty of Mg/Ca, relative to the value (default: 0.02).
+    - d18O_error (float, optional): The 1 sigma analytical uncertainty of d18O in permil (default: 0.08).
+    - age_error (float, optional): The 1 sigma age uncertainty in ka (default: 2).
+    - ice_volume (bool, optional): Remove the ice volume component of Rohling et al., 2021 from d18O_sw before
+      converting it to salinity (default: False, as in the RUN outputs).
+    - seed (int, optional): The seed of the random draws (default: 0).
+
+    Returns:
+    - pandas.DataFrame: The columns of data/cores/*_psu.csv; 'age_ka' (the ages of data) followed by the median and
+      the 1 and 2 sigma bounds ('_min1', '_plus1', '_min2', '_plus2') of the temperature, salinity and d18O_sw of each
+      sample.
+
+    Each realisation draws one set of calibration coefficients, shared by every sample, together with independent
+    analytical and age errors for each sample. A realisation places each solved sample at its sampled age (where the
+    ice volume component is also read) and is interpolated back onto the ages of data, so the age error spreads each
+    sample into its neighbours as in the PSU Solver. All realisations are evaluated as (realisation x sample) arrays,
+    in chunks of samples (each with the neighbours its interpolation can reach) when they would not fit in
+    SOLVER_CHUNK_CELLS.
+    """
+    # -------------- CHECK INPUTS --------------
+    if n_realisations < 2:
+        raise ValueError("At least two realisations are required")
+    if salinity_relation not in SALINITY_RELATIONS:
+        raise ValueError(f"The salinity relation must be one of {', '.join(SALINITY_RELATIONS)}")
+    mgca_calibration = _calibration(mgca_calibration, MGCA_CALIBRATIONS, "Mg/Ca")
+    d18O_calibration = _calibration(d18O_calibration, D18O_CALIBRATIONS, "d18O")
+    if mgca_calibration["form"] not in ("linear", "exponential"):
+        raise ValueError("The Mg/Ca calibration must be either 'linear' or 'exponential'")
+    ages = data.age_ka.to_numpy(dtype=float)
+    d18O = data.d18O.to_numpy(dtype=float)
+    mgca = data.MgCa.to_numpy(dtype=float)
+
+    # -------------- CALIBRATION DRAWS --------------
+    rng = np.random.default_rng(seed)
+    mgca_a = _draw(rng, mgca_calibration["a"], n_realisations)
+    mgca_b = _draw(rng, mgca_calibration["b"], n_realisations)
+    d18O_a = _draw(rng, d18O_calibration["a"], n_realisations)
+    d18O_b = _draw(rng, d18O_calibration["b"], n_realisations)
+    slope, intercept = SALINITY_RELATIONS[salinity_relation]
+
+    # -------------- SOLVE IN CHUNKS OF SAMPLES --------------
+    chunk = max(1, SOLVER_CHUNK_CELLS // n_realisations)
+    halo = AGE_HALO_SIGMAS * age_error
+    order = np.argsort(ages, kind="stable")
+    sorted_ages = ages[order]
+    # Each sample draws its analytical and age errors from its own stream, so that a neighbour solved with two chunks
+    # has the same errors in both
+    sample_seeds = rng.bit_generator.seed_seq.spawn(len(ages))
+    results = {name: [] for name in ("temp", "salinity", "d18O_sw")}
+    for first in range(0, len(ages), chunk):
+        part = order[first:first + chunk]
+        # The samples of the chunk and their neighbours. The first sample at least a halo beyond each end of the chunk
+        # stays on its side of every target and within a halo of its age, so no sample more than two halos beyond it
+        # can be the nearest to a target of the chunk
+        solved = part
+        if age_error > 0:
+            below = np.searchsorted(sorted_ages, sorted_ages[first] - halo, side="right") - 1
+            above = np.searchsorted(sorted_ages, sorted_ages[first + len(part) - 1] + halo, side="left")
+            below = sorted_ages[max(0, below)] - 2 * halo
+            above = sorted_ages[min(len(ages) - 1, above)] + 2 * halo
+            solved = order[np.searchsorted(sorted_ages, below, side="left"):
+                           np.searchsorted(sorted_ages, above, side="right")]
+        errors = np.stack([np.random.default_rng(sample_seeds[sample]).standard_normal((3, n_realisations))
+                           for sample in solved], axis=-1)
+        sample_mgca = mgca[solved] * (1.0 + mgca_error * errors[0])
+        sample_d18O = d18O[solved] + d18O_error * errors[1]
+        sample_ages = ages[solved] + age_error * errors[2]
+        if mgca_calibration["form"] == "linear":
+            temp = (sample_mgca - mgca_a) / mgca_b
+        else:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                temp = np.log(sample_mgca / mgca_a) / mgca_b
+        d18O_sw = sample_d18O + d18O_calibration["offset"] - d18O_a + (d18O_b * temp)
+        local_d18O_sw = d18O_sw
+        if ice_volume:
+            local_d18O_sw = d18O_sw - sea_level_lookup(sample_ages, "d18Ow_IV", interpolate=True)
+        salinity = (local_d18O_sw - intercept) / slope
+        for name, values in (("temp", temp), ("salinity", salinity), ("d18O_sw", d18O_sw)):
+            if age_error > 0:
+                values = _interpolate_rows(sample_ages, values, ages[part])
+            results[name].append(np.nanquantile(values, list(QUANTILES.values()), axis=0))
+
+    # -------------- COLLECT QUANTILES --------------
+    # The chunks follow the samples in order of age; put them back in the order of data
+    unsorted = np.argsort(order)
+    output = {"age_ka": ages}
+    for name, (label, prefix) in OUTPUT_NAMES.items():
+        quantiles = np.concatenate(results[name], axis=1)[:, unsorted]
+        for row, suffix in enumerate(QUANTILES):
+            output[(label if suffix == "" else prefix + suffix)] = quantiles[row]
+    return DataFrame(output)
@@ -0,0 +1,134 @@
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+from methods.merge_files.merge_psu_files import PSU_SOLVER_DIRECTORY, RAW_FILES, read_raw_run, run_cores
+from objects.caching.columnar import ROOT, read_frame, write_frame
+
+try:
+    import pyarrow.dataset as arrow_dataset
+    import pyarrow.parquet as parquet
+except ImportError:  # Fall back to one pickled frame per run when pyarrow is not installed
+    arrow_dataset = parquet = None
+
+# The consolidated store of PSU Solver runs, with one partition per run
+STORE_DIRECTORY = ROOT / "data" / ".cache" / "psu_store"
+# The measurement columns of every row, in the order of data/cores/*_psu.csv
+PSU_COLUMNS = ["age_ka"] + [column for name, columns in RAW_FILES.items() if name != "ages" for column in columns]
+
+
+def _partition(run: str, directory: Path) -> Path:
+    # The directory of one run, named in the hive style so that pyarrow reads 'run' back as a column
+    return Path(directory) / f"run={run}"
+
+
+def stored_runs(directory: Path = STORE_DIRECTORY) -> list[str]:
+    """
+    The runs already in the store.
+    """
+    return sorted(path.name[len("run="):] for path in Path(directory).glob("run=*") if any(path.iterdir()))
+
+
+def append_run(run: str, sites: dict[str, DataFrame], directory: Path = STORE_DIRECTORY) -> Path:
+    """
+    Add one run to the store, replacing any earlier copy of that run and leaving every other run untouched.
+
+    Parameters:
+    - run (str): The name of the run (e.g. 'RUN_5').
+    - sites (dict[str, pandas.DataFrame]): The output of each site (or core), with the columns of *_psu.csv.
+    - directory (Path, optional): The store (default: data/.cache/psu_store).
+
+    Returns:
+    - Path: The file written for the run.
+    """
+    frames = [frame.reindex(columns=PSU_COLUMNS).assign(site=str(site)) for site, frame in sites.items()]
+    data = pd.concat(frames, ignore_index=True)[["site"] + PSU_COLUMNS].sort_values(by=["site", "age_ka"],
+                                                                                     ignore_index=True)
+    partition = _partition(run, directory)
+    partition.mkdir(parents=True, exist_ok=True)
+    for old in partition.iterdir():
+        old.unlink()
+    if parquet is not None:
+        path = partition / "data.parquet"
+        data.to_parquet(path, index=False)
+        return path
+    return write_frame(data, partition / "data")
+
+
+def ingest_runs(runs: list[str] = None, refresh: bool = False, directory: Path = STORE_DIRECTORY) -> list[str]:
+    """
+    Load the raw files of the PSU Solver runs in data/PSU_Solver into the store.
+
+    Parameters:
+    - runs (list[str], optional): The runs to load (default: every directory with raw data, e.g. 'RUN_5' or
+      'CORE_TOPS').
+    - refresh (bool, optional): Reload runs already in the store (default: False).
+    - directory (Path, optional): The store (default: data/.cache/psu_store).
+
+    Returns:
+    - list[str]: The runs that were loaded.
+    """
+    if runs is None:
+        runs = sorted(path.parent.name for path in PSU_SOLVER_DIRECTORY.glob("*/*") if path.name.lower() == "raw_data")
+    existing = set() if refresh else set(stored_runs(directory))
+    loaded = []
+    for run in runs:
+        if run in existing:
+            continue
+        run_directory = PSU_SOLVER_DIRECTORY / run
+        append_run(run, {core: read_raw_run(run_directory, core) for core in run_cores(run_directory)}, directory)
+        loaded.append(run)
+    return loaded
+
+
+def query_psu(sites: list[str] = None, runs: list[str] = None, age_min: float = None, age_max: float = None,
+              columns: list[str] = None, directory: Path = STORE_DIRECTORY) -> DataFrame:
+    """
+    Read PSU Solver outputs across runs from the store.
+
+    Parameters:
+    - sites (list[str], optional): The sites (or cores, e.g. '1209_mPWP') to read (default: all).
+    - runs (list[str], optional): The runs to read (default: all).
+    - age_min (float, optional): The youngest age to read, inclusive (default: no limit).
+    - age_max (float, optional): The oldest age to read, inclusive (default: no limit).
+    - columns (list[str], optional): The measurement columns to read, e.g. ['temp', 'temp_min1'] (default: all).
+    - directory (Path, optional): The store (default: data/.cache/psu_store).
+
+    Returns:
+    - pandas.DataFrame: The columns 'run', 'site' and 'age_ka' followed by the requested columns, one row per sample.
+
+    For example, the bottom water temperature at 1209 across every run between 2500 and 2700 ka is
+    query_psu(sites=['1209'], age_min=2500, age_max=2700, columns=['temp']). With pyarrow the query is a single
+    filtered read, which skips the runs and row groups outside the selection.
+    """
+    columns = [column for column in PSU_COLUMNS if column != "age_ka"] if columns is None else list(columns)
+    selected = ["run", "site", "age_ka"] + [column for column in columns if column != "age_ka"]
+    if arrow_dataset is not None:
+        if not any(Path(directory).glob("run=*/*.parquet")):
+            return DataFrame(columns=selected)
+        dataset = arrow_dataset.dataset(directory, format="parquet", partitioning="hive")
+        condition = None
+        for clause in (
+            arrow_dataset.field("run").isin(runs) if runs is not None else None,
+            arrow_dataset.field("site").isin([str(site) for site in sites]) if sites is not None else None,
+            arrow_dataset.field("age_ka") >= age_min if age_min is not None else None,
+            arrow_dataset.field("age_ka") <= age_max if age_max is not None else None,
+        ):
+            if clause is not None:
+                condition = clause if condition is None else (condition & clause)
+        data = dataset.to_table(columns=selected, filter=condition).to_pandas()
+        data["run"] = data.run.astype(str)
+    else:
+        frames = []
+        for run in stored_runs(directory):
+            if runs is None or run in runs:
+                frames.extend(read_frame(path).assign(run=run) for path in _partition(run, directory).iterdir())
+        data = pd.concat(frames, ignore_index=True) if frames else DataFrame(columns=selected)
+        if sites is not None:
+            data = data[data.site.isin([str(site) for site in sites])]
+        if age_min is not None:
+            data = data[data.age_ka >= age_min]
+        if age_max is not None:
+            data = data[data.age_ka <= age_max]
+    return data[selected].sort_values(by=["run", "site", "age_ka"], ignore_index=True)
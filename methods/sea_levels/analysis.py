@@ -16,7 +16,7 @@ resampled_data = binning_multiple_series(
     end=age_max
 ).dropna()
 # Filter the difference in d18O
-filtered_1208, filtered_1209 = filter_difference(resampled_data, 5)
+filtered_1208, filtered_1209 = filter_difference(resampled_data, 30)
 
 resampled_data["difference_d18O"] = resampled_data.d18O_unadj_mean_1208 - resampled_data.d18O_unadj_mean_1209
 rolling_corr = rolling_pearson(resampled_data, "difference_d18O", "d18O_unadj_mean_sea_level", start=age_min, end=age_max)
@@ -0,0 +1,161 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.stats import kstwobign, t as t_distribution
+
+# The statistic and p value of a test of two samples, read like the results of scipy's ttest_ind and kstest
+TestResult = namedtuple("TestResult", ["statistic", "pvalue"])
+# Number of moving-block resamples of each pair of samples
+BLOCK_RESAMPLES = 10000
+# Maximum number of resampled values drawn at once for one sample
+BLOCK_CHUNK_CELLS = 10_000_000
+
+
+# -------------- AUTOCORRELATION --------------
+def lag1_autocorrelation(samples: list[np.ndarray]) -> np.ndarray:
+    """
+    The lag-1 autocorrelation of each of several series, in one pass over all of them.
+
+    Each series is taken in its given (age) order. Series with fewer than three values give NaN.
+    """
+    lengths = np.array([len(sample) for sample in samples])
+    if lengths.sum() == 0:
+        return np.full(len(samples), np.nan)
+    values = np.concatenate([np.asarray(sample, dtype=float) for sample in samples])
+    series = np.repeat(np.arange(len(samples)), lengths)
+    means = np.bincount(series, values, minlength=len(samples)) / np.maximum(lengths, 1)
+    deviations = values - means[series]
+    # Products of neighbours within the same series
+    neighbours = series[:-1] == series[1:]
+    lagged = np.bincount(series[:-1][neighbours], (deviations[:-1] * deviations[1:])[neighbours],
+                         minlength=len(samples))
+    squares = np.bincount(series, np.square(deviations), minlength=len(samples))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(lengths > 2, lagged / squares, np.nan)
+
+
+def effective_sample_size(samples: list[np.ndarray]) -> np.ndarray:
+    """
+    The effective number of independent values of each of several series, n (1 - r1) / (1 + r1) for a lag-1
+    autocorrelation r1, which is the number of samples an AR(1) series is worth when estimating its mean.
+
+    Series without positive autocorrelation keep their full size.
+    """
+    lengths = np.array([len(sample) for sample in samples], dtype=float)
+    r1 = np.clip(np.nan_to_num(lag1_autocorrelation(samples)), 0.0, 0.99)
+    return np.minimum(lengths, np.maximum(lengths * (1 - r1) / (1 + r1), np.minimum(lengths, 2.0)))
+
+
+def block_length(samples: list[np.ndarray]) -> np.ndarray:
+    """
+    The moving-block length of each series, from the AR(1) plug-in rule (2 r1 / (1 - r1^2))^(2/3) n^(1/3), and at least
+    one sample.
+    """
+    lengths = np.array([len(sample) for sample in samples], dtype=float)
+    r1 = np.clip(np.nan_to_num(lag1_autocorrelation(samples)), 0.0, 0.99)
+    optimal = np.power(2 * r1 / (1 - np.square(r1)), 2 / 3) * np.cbrt(lengths)
+    return np.clip(np.ceil(optimal), 1, np.maximum(lengths, 1)).astype(int)
+
+
+# -------------- TESTS --------------
+def welch_ess_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Welch's t-test for every pair of samples at once, with each sample counted at its effective size rather than its
+    number of values.
+    """
+    n_1, n_2 = effective_sample_size(samples_1), effective_sample_size(samples_2)
+    mean_1 = np.array([sample.mean() if len(sample) else np.nan for sample in samples_1])
+    mean_2 = np.array([sample.mean() if len(sample) else np.nan for sample in samples_2])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        error_1 = np.array([sample.var(ddof=1) if len(sample) > 1 else np.nan for sample in samples_1]) / n_1
+        error_2 = np.array([sample.var(ddof=1) if len(sample) > 1 else np.nan for sample in samples_2]) / n_2
+        statistic = (mean_1 - mean_2) / np.sqrt(error_1 + error_2)
+        freedom = np.square(error_1 + error_2) / (np.square(error_1) / (n_1 - 1) + np.square(error_2) / (n_2 - 1))
+    return statistic, 2 * t_distribution.sf(np.abs(statistic), freedom)
+
+
+def ks_ess_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The two-sample Kolmogorov-Smirnov test for every pair of samples, with the asymptotic p value of the statistic
+    taken at the effective sample sizes.
+    """
+    statistic = np.full(len(samples_1), np.nan)
+    for i, (sample_1, sample_2) in enumerate(zip(samples_1, samples_2)):
+        if len(sample_1) and len(sample_2):
+            sample_1, sample_2 = np.sort(sample_1), np.sort(sample_2)
+            values = np.concatenate((sample_1, sample_2))
+            cdf_1 = np.searchsorted(sample_1, values, side="right") / len(sample_1)
+            cdf_2 = np.searchsorted(sample_2, values, side="right") / len(sample_2)
+            statistic[i] = np.abs(cdf_1 - cdf_2).max()
+    n_1, n_2 = effective_sample_size(samples_1), effective_sample_size(samples_2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        size = n_1 * n_2 / (n_1 + n_2)
+    return statistic, np.minimum(kstwobign.sf(statistic * np.sqrt(size)), 1.0)
+
+
+def _block_means(sample: np.ndarray, length: int, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    # The means of moving-block resamples of one series, drawn as a (resamples x blocks) matrix of block starts
+    n = len(sample)
+    n_blocks = -(-n // length)
+    means = np.empty(n_resamples)
+    step = max(1, BLOCK_CHUNK_CELLS // (n_blocks * length))
+    offsets = np.arange(length)
+    for first in range(0, n_resamples, step):
+        last = min(first + step, n_resamples)
+        starts = rng.integers(0, n - length + 1, size=(last - first, n_blocks))
+        index = (starts[:, :, None] + offsets).reshape(last - first, -1)[:, :n]
+        means[first:last] = sample[index].mean(axis=1)
+    return means
+
+
+def block_bootstrap_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray],
+                         n_resamples: int = BLOCK_RESAMPLES, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    A moving-block bootstrap test of the difference in means of every pair of samples.
+
+    Each sample is centred on its mean and resampled in overlapping blocks of the length given by block_length, which
+    keeps the autocorrelation within each block. The p value is the share of resampled differences in means at least
+    as large as the observed one, and the statistic is the observed difference over its bootstrap standard error.
+    """
+    statistic = np.full(len(samples_1), np.nan)
+    pvalue = np.full(len(samples_1), np.nan)
+    lengths_1, lengths_2 = block_length(samples_1), block_length(samples_2)
+    seeds = np.random.SeedSequence(seed).spawn(len(samples_1))
+    for i, (sample_1, sample_2) in enumerate(zip(samples_1, samples_2)):
+        if len(sample_1) < 2 or len(sample_2) < 2:
+            continue
+        rng = np.random.default_rng(seeds[i])
+        observed = sample_1.mean() - sample_2.mean()
+        resampled = (_block_means(sample_1 - sample_1.mean(), lengths_1[i], n_resamples, rng)
+                     - _block_means(sample_2 - sample_2.mean(), lengths_2[i], n_resamples, rng))
+        error = resampled.std(ddof=1)
+        statistic[i] = observed / error if error > 0 else np.nan
+        pvalue[i] = (1 + np.sum(np.abs(resampled) >= abs(observed))) / (n_resamples + 1)
+    return statistic, pvalue
+
+
+# -------------- SINGLE PAIRS --------------
+def ess_ttest(sample_1: np.ndarray, sample_2: np.ndarray) -> TestResult:
+    """
+    Welch's t-test at the effective sample sizes, in place of ttest_ind(sample_1, sample_2, equal_var=False).
+    """
+    statistic, pvalue = welch_ess_test([np.asarray(sample_1, dtype=float)], [np.asarray(sample_2, dtype=float)])
+    return TestResult(statistic[0], pvalue[0])
+
+
+def ess_kstest(sample_1: np.ndarray, sample_2: np.ndarray) -> TestResult:
+    """
+    The KS test at the effective sample sizes, in place of kstest(sample_1, sample_2).
+    """
+    statistic, pvalue = ks_ess_test([np.asarray(sample_1, dtype=float)], [np.asarray(sample_2, dtype=float)])
+    return TestResult(statistic[0], pvalue[0])
+
+
+def block_ttest(sample_1: np.ndarray, sample_2: np.ndarray, n_resamples: int = BLOCK_RESAMPLES,
+                seed: int = 0) -> TestResult:
+    """
+    The moving-block bootstrap test of the difference in means, in place of ttest_ind(sample_1, sample_2).
+    """
+    statistic, pvalue = block_bootstrap_test([np.asarray(sample_1, dtype=float)], [np.asarray(sample_2, dtype=float)],
+                                             n_resamples, seed)
+    return TestResult(statistic[0], pvalue[0])
@@ -0,0 +1,227 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pandas import DataFrame
+from scipy.stats import bootstrap, norm
+
+from methods.stats.comparisons import group_samples, pair_groups
+
+# The statistics that can be bootstrapped, each reducing the last axis of a block of resamples
+STATISTICS = {
+    "mean": lambda block: block.mean(axis=-1),
+    "median": lambda block: np.median(block, axis=-1),
+}
+# Maximum number of resampled values drawn at once for one sample
+BOOTSTRAP_CHUNK_CELLS = 10_000_000
+
+
+def _resample(samples: tuple[np.ndarray, ...], statistic: str, n_resamples: int,
+              seed: np.random.SeedSequence) -> np.ndarray:
+    # The statistic of a batch of resamples: of one sample, or the difference between two. Each sample is resampled
+    # with a (n_resamples x n) matrix of indices
+    rng = np.random.default_rng(seed)
+    reduce = STATISTICS[statistic]
+    estimates = [reduce(sample[rng.integers(0, len(sample), size=(n_resamples, len(sample)))]) for sample in samples]
+    return estimates[0] if len(estimates) == 1 else estimates[0] - estimates[1]
+
+
+def _chunks(samples: tuple[np.ndarray, ...], n_resamples: int) -> list[int]:
+    # The sizes of the batches of resamples, each drawing at most BOOTSTRAP_CHUNK_CELLS values per sample
+    step = max(1, BOOTSTRAP_CHUNK_CELLS // max(len(sample) for sample in samples))
+    return [min(step, n_resamples - first) for first in range(0, n_resamples, step)]
+
+
+def _jackknife(sample: np.ndarray, statistic: str) -> np.ndarray:
+    # The statistic of the sample with each value left out in turn
+    n = len(sample)
+    if statistic == "mean":
+        return (sample.sum() - sample) / (n - 1)
+    reduce = STATISTICS[statistic]
+    offsets = np.arange(n - 1)
+    estimates = np.empty(n)
+    step = max(1, BOOTSTRAP_CHUNK_CELLS // n)
+    for first in range(0, n, step):
+        left_out = np.arange(first, min(first + step, n))[:, None]
+        estimates[left_out[:, 0]] = reduce(sample[offsets + (offsets >= left_out)])
+    return estimates
+
+
+def _intervals(samples: tuple[np.ndarray, ...], statistic: str, replicates: np.ndarray,
+               confidence: float) -> dict[str, float]:
+    # The estimate and the percentile and bias-corrected and accelerated (BCa) intervals of one set of replicates
+    reduce = STATISTICS[statistic]
+    estimates = [reduce(sample) for sample in samples]
+    estimate = estimates[0] if len(estimates) == 1 else estimates[0] - estimates[1]
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(replicates, [alpha, 1 - alpha])
+
+    # The bias correction, from the share of replicates below the estimate
+    share = (np.sum(replicates < estimate) + 0.5 * np.sum(replicates == estimate)) / len(replicates)
+    bias = norm.ppf(share)
+    # The acceleration, from the jackknife of the job's statistic leaving out each value of each sample in turn
+    # (summed over the samples, as scipy.stats.bootstrap). The second sample enters the difference negated
+    numerator, denominator = 0.0, 0.0
+    for sign, sample in zip((1, -1), samples):
+        if len(sample) < 2:
+            numerator = denominator = np.nan
+            break
+        jackknife = sign * _jackknife(sample, statistic)
+        deviations = jackknife.mean() - jackknife
+        numerator += np.sum(deviations ** 3) / len(sample) ** 3
+        denominator += np.sum(deviations ** 2) / len(sample) ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acceleration = numerator / (6 * denominator ** 1.5)
+        z = norm.ppf([alpha, 1 - alpha])
+        levels = norm.cdf(bias + (bias + z) / (1 - acceleration * (bias + z)))
+    if np.all(np.isfinite(levels)):
+        bca_low, bca_high = np.quantile(replicates, levels)
+    else:
+        bca_low = bca_high = np.nan
+    return {"estimate": estimate, "standard_error": replicates.std(ddof=1), "percentile_low": low,
+            "percentile_high": high, "bca_low": bca_low, "bca_high": bca_high}
+
+
+def bootstrap_batch(jobs: list[tuple[np.ndarray, ...]], statistic: str = "mean", n_resamples: int = 10000,
+                    confidence: float = 0.95, seed: int = 0, workers: int = None) -> DataFrame:
+    """
+    Bootstrap confidence intervals for many samples, or differences between pairs of samples, at once.
+
+    Parameters:
+    - jobs (list[tuple]): Each a tuple of one sample (for its statistic) or two samples (for the difference of their
+      statistics, first less second).
+    - statistic (str, optional): One of STATISTICS (default: 'mean').
+    - n_resamples (int, optional): The number of resamples of each job (default: 10000).
+    - confidence (float, optional): The confidence level of the intervals (default: 0.95).
+    - seed (int, optional): The seed of the resamples; the same seed gives the same result for any number of workers
+      (default: 0).
+    - workers (int, optional): The number of worker processes, or 1 to run in this process (default: all cores).
+
+    Returns:
+    - pandas.DataFrame: One row per job with its estimate, bootstrap standard error and the percentile
+      ('percentile_low', 'percentile_high') and BCa ('bca_low', 'bca_high') intervals.
+
+    Each job is split into batches of resamples drawn as one (batch x n) index matrix per sample and reduced with
+    NumPy, with every batch given its own seed spawned from 'seed'. The batches of all the jobs run together across a
+    process pool.
+    """
+    # -------------- CHECK INPUTS --------------
+    if statistic not in STATISTICS:
+        raise ValueError(f"Statistic must be one of {', '.join(STATISTICS)}")
+    if n_resamples < 2:
+        raise ValueError("At least two resamples are required")
+    jobs = [tuple(np.asarray(sample, dtype=float) for sample in job) for job in jobs]
+    if any(len(job) not in (1, 2) or min(len(sample) for sample in job) == 0 for job in jobs):
+        raise ValueError("Each job must hold one or two non-empty samples")
+
+    # -------------- RESAMPLE --------------
+    sizes = [_chunks(job, n_resamples) for job in jobs]
+    job_seeds = np.random.SeedSequence(seed).spawn(len(jobs))
+    arguments = [(job, statistic, size, chunk_seed) for job, job_sizes, job_seed in zip(jobs, sizes, job_seeds)
+                 for size, chunk_seed in zip(job_sizes, job_seed.spawn(len(job_sizes)))]
+    if workers == 1 or len(arguments) <= 1:
+        chunks = [_resample(*chunk) for chunk in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_resample, *zip(*arguments)))
+
+    # -------------- INTERVALS --------------
+    rows = []
+    first = 0
+    for job, job_sizes in zip(jobs, sizes):
+        replicates = np.concatenate(chunks[first:first + len(job_sizes)])
+        first += len(job_sizes)
+        rows.append(_intervals(job, statistic, replicates, confidence))
+    return DataFrame(rows, columns=["estimate", "standard_error", "percentile_low", "percentile_high", "bca_low",
+                                    "bca_high"])
+
+
+def bootstrap_interval(sample_1: np.ndarray, sample_2: np.ndarray = None, statistic: str = "mean",
+                       n_resamples: int = 10000, confidence: float = 0.95, seed: int = 0,
+                       workers: int = 1) -> dict[str, float]:
+    """
+    The bootstrap confidence intervals of the statistic of one sample, or of the difference between two samples.
+
+    The arguments and the intervals are those of bootstrap_batch, for a single job run in this process by default.
+    """
+    job = (sample_1,) if sample_2 is None else (sample_1, sample_2)
+    return bootstrap_batch([job], statistic, n_resamples, confidence, seed, workers).iloc[0].to_dict()
+
+
+def check_bootstrap(sizes: tuple[int, int] = (40, 25), n_resamples: int = 20000, tolerance: float = 0.05,
+                    seed: int = 0) -> DataFrame:
+    """
+    Check the two-sample intervals of bootstrap_interval against scipy.stats.bootstrap.
+
+    Parameters:
+    - sizes (tuple, optional): The sizes of the two skewed (lognormal) samples compared (default: (40, 25)).
+    - n_resamples (int, optional): The number of resamples of each bootstrap (default: 20000).
+    - tolerance (float, optional): The accepted difference of each bound, as a share of the width of scipy's interval
+      (default: 0.05).
+    - seed (int, optional): The seed of the samples and of both bootstraps (default: 0).
+
+    Returns:
+    - pandas.DataFrame: For each statistic and method ('percentile', 'BCa'), the bounds of bootstrap_interval ('low',
+      'high'), those of scipy ('scipy_low', 'scipy_high') and the larger difference as a share of scipy's width
+      ('difference').
+
+    Raises:
+    - ValueError: If any bound differs beyond the tolerance.
+
+    The two bootstraps draw different resamples, so their bounds agree only to within the Monte Carlo error of the
+    number of resamples. A wrong sign of the acceleration shifts the BCa bounds by far more than that.
+    """
+    rng = np.random.default_rng(seed)
+    samples = (rng.lognormal(0.0, 1.0, sizes[0]), rng.lognormal(0.2, 1.0, sizes[1]))
+    rows = []
+    for statistic in STATISTICS:
+        ours = bootstrap_interval(*samples, statistic=statistic, n_resamples=n_resamples, seed=seed)
+
+        def difference(sample_1, sample_2, axis=-1):
+            return STATISTICS[statistic](np.moveaxis(sample_1, axis, -1)) - \
+                STATISTICS[statistic](np.moveaxis(sample_2, axis, -1))
+
+        for method, prefix in (("percentile", "percentile"), ("BCa", "bca")):
+            theirs = bootstrap(samples, difference, n_resamples=n_resamples, method=method,
+                               random_state=np.random.default_rng(seed)).confidence_interval
+            low, high = ours[f"{prefix}_low"], ours[f"{prefix}_high"]
+            width = theirs.high - theirs.low
+            rows.append({"statistic": statistic, "method": method, "low": low, "high": high,
+                         "scipy_low": theirs.low, "scipy_high": theirs.high,
+                         "difference": max(abs(low - theirs.low), abs(high - theirs.high)) / width})
+    check = DataFrame(rows)
+    failed = check[~(check.difference <= tolerance)]
+    if not failed.empty:
+        raise ValueError(f"The bootstrap differs from scipy.stats.bootstrap beyond the tolerance for "
+                         f"{', '.join(failed.statistic + ' ' + failed.method)}")
+    return check
+
+
+def bootstrap_groups(datasets: dict[str, DataFrame], value: str, compare: str = "site",
+                     within: tuple[str, ...] = ("epoch", "glacial"), pairs: list[tuple] = None,
+                     statistic: str = "mean", n_resamples: int = 10000, confidence: float = 0.95, seed: int = 0,
+                     workers: int = None, age_min: float = None, age_max: float = None) -> DataFrame:
+    """
+    Bootstrap the difference in a statistic for every pair of groups compared by compare_groups.
+
+    Parameters:
+    - datasets, value, compare, within, pairs, age_min, age_max: The records and groups, as for compare_groups.
+    - statistic, n_resamples, confidence, seed, workers: The bootstrap, as for bootstrap_batch.
+
+    Returns:
+    - pandas.DataFrame: One row per pair of groups with the levels of 'within', the compared levels ('group_1',
+      'group_2'), their sizes and the estimate and intervals of bootstrap_batch for the difference (first less second).
+
+    For example, the Pliocene less Pleistocene difference of mean d18O at each site and glacial state, as printed by
+    same_isotope_stats, is bootstrap_groups({'1208': iso_1208, '1209': iso_1209}, 'd18O_unadj', compare='epoch',
+    within=('site', 'glacial'), pairs=[('Pliocene', 'Pleistocene')]).
+    """
+    within = tuple(within)
+    groups = group_samples(datasets, value, within + (compare,), age_min, age_max)
+    rows, samples_1, samples_2 = pair_groups(groups, within, pairs)
+    if not rows:
+        return DataFrame(columns=list(within) + ["group_1", "group_2", "n_1", "n_2"])
+    table = DataFrame(rows)
+    table["n_1"] = [len(sample) for sample in samples_1]
+    table["n_2"] = [len(sample) for sample in samples_2]
+    intervals = bootstrap_batch(list(zip(samples_1, samples_2)), statistic, n_resamples, confidence, seed, workers)
+    return table.join(intervals)
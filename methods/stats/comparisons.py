@@ -0,0 +1,289 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy.stats import ks_2samp, mannwhitneyu, t as t_distribution
+
+from methods.stats.autocorrelation import (block_bootstrap_test, block_length, effective_sample_size, ks_ess_test,
+                                           lag1_autocorrelation, welch_ess_test)
+from objects.misc.mis_boundaries import label_mis
+
+# The grouping factors that label_mis adds to a record
+MIS_FACTORS = ("mis", "glacial", "epoch", "pliocene")
+# The multiple-comparison corrections of adjust_pvalues
+CORRECTIONS = ("holm", "bh", "bonferroni")
+# The columns of compare_groups that follow the levels of the factors held fixed
+COMPARISON_COLUMNS = ["group_1", "group_2", "n_1", "n_2", "mean_1", "mean_2", "difference", "cohen_d", "hedges_g",
+                      "test", "statistic", "pvalue", "p_adjusted"]
+# The adjusted p value below which print_comparisons answers that a difference is significant
+SIGNIFICANCE = 0.05
+
+
+# -------------- TESTS --------------
+def welch_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Welch's unequal variance t-test for every pair of samples at once, as ttest_ind(equal_var=False).
+    """
+    n_1 = np.array([len(sample) for sample in samples_1], dtype=float)
+    n_2 = np.array([len(sample) for sample in samples_2], dtype=float)
+    mean_1 = np.array([sample.mean() if len(sample) else np.nan for sample in samples_1])
+    mean_2 = np.array([sample.mean() if len(sample) else np.nan for sample in samples_2])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        error_1 = np.array([sample.var(ddof=1) if len(sample) > 1 else np.nan for sample in samples_1]) / n_1
+        error_2 = np.array([sample.var(ddof=1) if len(sample) > 1 else np.nan for sample in samples_2]) / n_2
+        statistic = (mean_1 - mean_2) / np.sqrt(error_1 + error_2)
+        freedom = np.square(error_1 + error_2) / (np.square(error_1) / (n_1 - 1) + np.square(error_2) / (n_2 - 1))
+    return statistic, 2 * t_distribution.sf(np.abs(statistic), freedom)
+
+
+def ks_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The two-sample Kolmogorov-Smirnov test for every pair of samples, as kstest(sample_1, sample_2).
+    """
+    results = [ks_2samp(sample_1, sample_2) if len(sample_1) and len(sample_2) else None
+               for sample_1, sample_2 in zip(samples_1, samples_2)]
+    return (np.array([np.nan if result is None else result.statistic for result in results]),
+            np.array([np.nan if result is None else result.pvalue for result in results]))
+
+
+def mann_whitney_test(samples_1: list[np.ndarray], samples_2: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The two-sided Mann-Whitney U test for every pair of samples.
+    """
+    results = [mannwhitneyu(sample_1, sample_2) if len(sample_1) and len(sample_2) else None
+               for sample_1, sample_2 in zip(samples_1, samples_2)]
+    return (np.array([np.nan if result is None else result.statistic for result in results]),
+            np.array([np.nan if result is None else result.pvalue for result in results]))
+
+
+# The tests available to compare_groups, each taking the two lists of paired samples and returning the statistic and
+# p value of every pair. Further tests are added by registering them here. The '_ess' and 'block_bootstrap' tests
+# allow for the autocorrelation of each sample (see methods/stats/autocorrelation.py)
+TESTS = {
+    "welch": welch_test,
+    "ks": ks_test,
+    "mann_whitney": mann_whitney_test,
+    "welch_ess": welch_ess_test,
+    "ks_ess": ks_ess_test,
+    "block_bootstrap": block_bootstrap_test,
+}
+
+
+# -------------- CORRECTIONS --------------
+def adjust_pvalues(pvalues: np.ndarray, method: str = "holm") -> np.ndarray:
+    """
+    Correct a family of p values for multiple comparisons.
+
+    Parameters:
+    - pvalues (numpy.ndarray): The p values; missing values are left out of the family and stay missing.
+    - method (str, optional): 'holm' (Holm-Bonferroni), 'bh' (Benjamini-Hochberg false discovery rate) or
+      'bonferroni' (default: 'holm').
+
+    Returns:
+    - numpy.ndarray: The adjusted p values, capped at 1.
+    """
+    if method not in CORRECTIONS:
+        raise ValueError(f"Correction must be one of {', '.join(CORRECTIONS)}")
+    pvalues = np.asarray(pvalues, dtype=float)
+    adjusted = np.full_like(pvalues, np.nan)
+    finite = np.flatnonzero(np.isfinite(pvalues))
+    m = len(finite)
+    if m == 0:
+        return adjusted
+    order = finite[np.argsort(pvalues[finite], kind="stable")]
+    ranked = pvalues[order]
+    if method == "bonferroni":
+        corrected = ranked * m
+    elif method == "holm":
+        corrected = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:
+        corrected = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    adjusted[order] = np.minimum(corrected, 1.0)
+    return adjusted
+
+
+# -------------- GROUPS --------------
+def group_samples(datasets: dict[str, DataFrame], value: str, factors: tuple[str, ...] = ("site", "epoch", "glacial"),
+                  age_min: float = None, age_max: float = None) -> dict[tuple, np.ndarray]:
+    """
+    Split several records into the samples of every combination of grouping factors, with a single groupby.
+
+    Parameters:
+    - datasets (dict[str, pandas.DataFrame]): The records, keyed by site (e.g. {'1208': iso_1208, '1209': iso_1209}).
+    - value (str): The column to compare (e.g. 'd18O_unadj' or 'temp').
+    - factors (tuple[str, ...], optional): The columns to group by. 'site' is the key of each record, and the MIS
+      labels ('glacial', 'epoch', 'mis', 'pliocene') are added with label_mis when a record does not already have them
+      (default: ('site', 'epoch', 'glacial')).
+    - age_min (float, optional): The youngest age used, in ka (default: no limit).
+    - age_max (float, optional): The oldest age used, in ka (default: no limit).
+
+    Returns:
+    - dict[tuple, numpy.ndarray]: The values of each group in age order, keyed by its levels in the order of
+      'factors'.
+    """
+    frames = []
+    for site, frame in datasets.items():
+        if any(factor in MIS_FACTORS and factor not in frame.columns for factor in factors):
+            frame = label_mis(frame)
+        frames.append(frame.assign(site=str(site)))
+    # Groups keep the samples in age order, for the tests that allow for autocorrelation
+    data = pd.concat(frames, ignore_index=True).dropna(subset=[value]).sort_values(by=["site", "age_ka"],
+                                                                                  kind="stable")
+    if age_min is not None:
+        data = data[data.age_ka >= age_min]
+    if age_max is not None:
+        data = data[data.age_ka <= age_max]
+    return {(key if isinstance(key, tuple) else (key,)): group.to_numpy(dtype=float)
+            for key, group in data.groupby(list(factors), sort=True)[value]}
+
+
+def autocorrelation_table(datasets: dict[str, DataFrame], value: str,
+                          factors: tuple[str, ...] = ("site", "epoch", "glacial"), age_min: float = None,
+                          age_max: float = None) -> DataFrame:
+    """
+    The lag-1 autocorrelation, effective sample size and moving-block length of every group of group_samples.
+
+    Returns one row per group with its levels, its number of samples ('n'), 'lag1_autocorrelation',
+    'effective_size' and 'block_length', all computed in one pass over every group.
+    """
+    groups = group_samples(datasets, value, factors, age_min, age_max)
+    samples = list(groups.values())
+    table = DataFrame(list(groups.keys()), columns=list(factors))
+    table["n"] = [len(sample) for sample in samples]
+    table["lag1_autocorrelation"] = lag1_autocorrelation(samples)
+    table["effective_size"] = effective_sample_size(samples)
+    table["block_length"] = block_length(samples)
+    return table
+
+
+def pair_groups(groups: dict[tuple, np.ndarray], within: tuple[str, ...],
+                pairs: list[tuple] = None) -> tuple[list[dict], list[np.ndarray], list[np.ndarray]]:
+    """
+    Pair the groups of group_samples, whose last factor is the one compared, within each combination of the others.
+
+    Returns the levels of each pair (one dictionary per pair, with 'group_1' and 'group_2') and the two lists of paired
+    samples. The pairs are every pair of levels in sorted order, or the ordered 'pairs' of levels present.
+    """
+    strata = {}
+    for key in groups:
+        strata.setdefault(key[:-1], []).append(key[-1])
+    rows, samples_1, samples_2 = [], [], []
+    for stratum, levels in strata.items():
+        stratum_pairs = combinations(levels, 2) if pairs is None else (pair for pair in pairs
+                                                                       if set(pair) <= set(levels))
+        for level_1, level_2 in stratum_pairs:
+            rows.append(dict(zip(within, stratum), group_1=level_1, group_2=level_2))
+            samples_1.append(groups[stratum + (level_1,)])
+            samples_2.append(groups[stratum + (level_2,)])
+    return rows, samples_1, samples_2
+
+
+def compare_groups(datasets: dict[str, DataFrame], value: str, compare: str = "site",
+                   within: tuple[str, ...] = ("epoch", "glacial"), tests: tuple[str, ...] = ("welch", "ks"),
+                   correction: str = "holm", pairs: list[tuple] = None, age_min: float = None,
+                   age_max: float = None) -> DataFrame:
+    """
+    Run every pairwise comparison of the levels of one factor, within each combination of other factors.
+
+    Parameters:
+    - datasets (dict[str, pandas.DataFrame]): The records, keyed by site (e.g. {'1208': iso_1208, '1209': iso_1209}).
+    - value (str): The column to compare (e.g. 'd18O_unadj' or 'temp').
+    - compare (str, optional): The factor whose levels are compared (default: 'site').
+    - within (tuple[str, ...], optional): The factors held fixed in each comparison (default: ('epoch', 'glacial')).
+    - tests (tuple[str, ...], optional): The tests to run, from TESTS (default: ('welch', 'ks')).
+    - correction (str, optional): The multiple-comparison correction applied across the comparisons of each test, one
+      of CORRECTIONS, or None for none (default: 'holm').
+    - pairs (list[tuple], optional): The ordered pairs of levels of 'compare' to test, e.g. [('Pliocene',
+      'Pleistocene')] (default: every pair of levels, in sorted order).
+    - age_min (float, optional): The youngest age used, in ka (default: no limit).
+    - age_max (float, optional): The oldest age used, in ka (default: no limit).
+
+    Returns:
+    - pandas.DataFrame: One row per comparison and test, with the levels of 'within', the two compared levels
+      ('group_1', 'group_2'), their sizes, means and difference in means, Cohen's d and Hedges' g, the test, its
+      statistic and p value, and the corrected p value ('p_adjusted').
+
+    For example, isotope_stats compares 1208 with 1209 in each Pliocene/Pleistocene glacial/interglacial with
+    compare_groups({'1208': iso_1208, '1209': iso_1209}, 'd18O_unadj'), and same_isotope_stats compares the epochs at
+    each site with compare='epoch', within=('site', 'glacial'). Adding a site only means adding its record.
+    """
+    # -------------- CHECK INPUTS --------------
+    unknown = [test for test in tests if test not in TESTS]
+    if unknown:
+        raise ValueError(f"Tests must be among {', '.join(TESTS)}")
+    if correction is not None and correction not in CORRECTIONS:
+        raise ValueError(f"Correction must be one of {', '.join(CORRECTIONS)}")
+    within = tuple(within)
+    groups = group_samples(datasets, value, within + (compare,), age_min, age_max)
+
+    rows, samples_1, samples_2 = pair_groups(groups, within, pairs)
+    columns = list(within) + COMPARISON_COLUMNS
+    if not rows:
+        return DataFrame(columns=columns)
+
+    # -------------- EFFECT SIZES --------------
+    table = DataFrame(rows)
+    table["n_1"] = [len(sample) for sample in samples_1]
+    table["n_2"] = [len(sample) for sample in samples_2]
+    table["mean_1"] = [sample.mean() if len(sample) else np.nan for sample in samples_1]
+    table["mean_2"] = [sample.mean() if len(sample) else np.nan for sample in samples_2]
+    table["difference"] = table.mean_1 - table.mean_2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        squares = np.array([(len(sample_1) - 1) * sample_1.var(ddof=1) + (len(sample_2) - 1) * sample_2.var(ddof=1)
+                            if len(sample_1) > 1 and len(sample_2) > 1 else np.nan
+                            for sample_1, sample_2 in zip(samples_1, samples_2)])
+        total = (table.n_1 + table.n_2).to_numpy(dtype=float)
+        table["cohen_d"] = table.difference / np.sqrt(squares / (total - 2))
+        table["hedges_g"] = table.cohen_d * (1 - 3 / (4 * total - 9))
+
+    # -------------- TESTS --------------
+    results = []
+    for test in tests:
+        statistic, pvalue = TESTS[test](samples_1, samples_2)
+        results.append(table.assign(test=test, statistic=statistic, pvalue=pvalue,
+                                    p_adjusted=adjust_pvalues(pvalue, correction) if correction else pvalue))
+    return pd.concat(results, ignore_index=True)[columns]
+
+
+# -------------- REPORTS --------------
+def _level_name(factor: str, level) -> str:
+    # The printed name of a level of a grouping factor, e.g. 'glacials' for glacial == True
+    if factor == "glacial":
+        return "glacials" if level else "interglacials"
+    if factor == "pliocene":
+        return "Pliocene" if level else "Pleistocene"
+    return str(level)
+
+
+def print_comparisons(table: DataFrame, quantity: str, correction: str = "holm") -> DataFrame:
+    """
+    Print the comparisons of compare_groups as questions and answers, correcting their p values together.
+
+    Parameters:
+    - table (pandas.DataFrame): Rows of one or more compare_groups tables, one per comparison to report with the test
+      it is reported by, each with a 'compare' column naming the factor compared (as isotope_comparisons adds). Tables
+      compared within different factors can be concatenated.
+    - quantity (str): The name of the compared value in the questions (e.g. 'd18O' or 'BWT').
+    - correction (str, optional): The multiple-comparison correction applied across every row, one of CORRECTIONS, or
+      None for none (default: 'holm').
+
+    Returns:
+    - pandas.DataFrame: The table with 'p_adjusted' corrected across its rows.
+
+    A difference is answered as significant when its adjusted p value is below SIGNIFICANCE.
+    """
+    table = table.reset_index(drop=True)
+    table["p_adjusted"] = adjust_pvalues(table.pvalue, correction) if correction else table.pvalue
+    within = [column for column in table.columns if column not in COMPARISON_COLUMNS + ["compare"]]
+    for _, row in table.iterrows():
+        name_1, name_2 = _level_name(row["compare"], row["group_1"]), _level_name(row["compare"], row["group_2"])
+        stratum = " ".join(_level_name(column, row[column]) for column in within if pd.notna(row[column]))
+        answer = "Yes" if row["p_adjusted"] < SIGNIFICANCE else "No"
+        print(f"Is the {quantity} of {name_1} significantly different to {name_2}" +
+              (f" ({stratum})?" if stratum else "?"))
+        print(f"{answer}, p value = {row['pvalue']:.4g} ({row['test']}), adjusted p value = {row['p_adjusted']:.4g}, "
+              f"N = {row['n_1'] + row['n_2']}")
+        print(f"{name_1} Mean: {row['mean_1']:.4f}, {name_2} Mean: {row['mean_2']:.4f}, "
+              f"Difference: {row['difference']:.4f}")
+    return table
@@ -1,79 +1,48 @@
 import numpy as np
+import pandas as pd
 
+from methods.stats.bootstrap import bootstrap_batch
+from methods.stats.comparisons import compare_groups, group_samples, print_comparisons
 from methods.stats.overlaps import generate_differences
 from objects.core_data.isotopes import iso_1208, iso_1209
 from objects.arguments.args_Nature import colours
 from objects.core_data.psu import psu_1208, psu_1209
-from objects.misc.mis_boundaries import mis_boundaries
+from objects.misc.mis_boundaries import label_mis
 from methods.figures.highlight_mis import highlight_all_mis_greyscale
 
-from scipy.stats import kstest, ttest_ind, shapiro
+from scipy.stats import kstest, shapiro
 import matplotlib.pyplot as plt
 
 
-sample_data = generate_differences(2).dropna(subset='difference_d18O')
-sample_data['glacial'] = False
-iso_1208['glacial'] = False
-iso_1209['glacial'] = False
-for _, row in mis_boundaries.iterrows():
-    lower_age = row["age_start"]
-    upper_age = row['age_end']
-    if row["glacial"] == "glacial":
-        sample_data.loc[(sample_data.age_ka >= lower_age) & (sample_data.age_ka < upper_age), 'glacial'] = True
-        iso_1208.loc[(iso_1208.age_ka >= lower_age) & (iso_1208.age_ka < upper_age), 'glacial'] = True
-        iso_1209.loc[(iso_1209.age_ka >= lower_age) & (iso_1209.age_ka < upper_age), 'glacial'] = True
+# Label the glacials and the Pliocene samples (on copies, so the shared datasets are left unchanged)
+sample_data = label_mis(generate_differences(2).dropna(subset='difference_d18O'))
+iso_1208 = label_mis(iso_1208)
+iso_1209 = label_mis(iso_1209)
 
-sample_data['pliocene'] = False
-sample_data.loc[sample_data.age_ka > 2700, 'pliocene'] = True
 
-iso_1208['pliocene'] = False
-iso_1209['pliocene'] = False
-iso_1208.loc[iso_1208.age_ka > 2700, 'pliocene'] = True
-iso_1209.loc[iso_1209.age_ka > 2700, 'pliocene'] = True
+def site_datasets() -> dict:
+    """
+    The isotope records compared by isotope_stats, same_isotope_stats and isotope_comparisons, keyed by site, with
+    1208 cut to the span of 1209.
+    """
+    return {"1208": iso_1208.loc[iso_1208.age_ka > iso_1209.age_ka.min()], "1209": iso_1209}
 
 
 def isotope_stats():
-    sel_iso_1208 = iso_1208.loc[iso_1208.age_ka > iso_1209.age_ka.min()]
-
-    pliocene_glacial_1208 = sel_iso_1208.loc[sel_iso_1208.pliocene & sel_iso_1208.glacial].d18O_unadj.values
-    pliocene_glacial_1209 = iso_1209.loc[iso_1209.pliocene & iso_1209.glacial].d18O_unadj.values
-    pliocene_interglacial_1208 = sel_iso_1208.loc[sel_iso_1208.pliocene & (sel_iso_1208.glacial == False)].d18O_unadj.values
-    pliocene_interglacial_1209 = iso_1209.loc[iso_1209.pliocene & (iso_1209.glacial == False)].d18O_unadj.values
-    pleistocene_glacial_1208 = sel_iso_1208.loc[(sel_iso_1208.pliocene == False) & sel_iso_1208.glacial].d18O_unadj.values
-    pleistocene_glacial_1209 = iso_1209.loc[(iso_1209.pliocene == False) & iso_1209.glacial].d18O_unadj.values
-    pleistocene_interglacial_1208 = sel_iso_1208.loc[
-        (sel_iso_1208.pliocene == False) & (sel_iso_1208.glacial == False)].d18O_unadj.values
-    pleistocene_interglacial_1209 = iso_1209.loc[
-        (iso_1209.pliocene == False) & (iso_1209.glacial == False)].d18O_unadj.values
-
-    pliocene_1208 = sel_iso_1208.loc[(sel_iso_1208.age_ka > 2700)].d18O_unadj.values
-    pliocene_1209 = iso_1209.loc[(iso_1209.age_ka > 2700)].d18O_unadj.values
-
-    print('KS test')
-    print("Is the d18O during Pliocene glacials significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {kstest(pliocene_glacial_1208, pliocene_glacial_1209).pvalue:.4g}')
-    print(f'Pliocene Glacial 1208 Mean: {pliocene_glacial_1208.mean():.4f}, Pliocene Glacial 1209 Mean: {pliocene_glacial_1209.mean():.4f}')
-    print(f'Difference in Pliocene Glacial Means: {(pliocene_glacial_1208.mean() - pliocene_glacial_1209.mean()):.4f}')
-    print("Is the d18O during Pliocene interglacials significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {kstest(pliocene_interglacial_1208, pliocene_interglacial_1209).pvalue:.4g}')
-    print(f'Pliocene Interglacial 1208 Mean: {pliocene_interglacial_1208.mean():.4f}, Pliocene Interglacial 1209 Mean: {pliocene_interglacial_1209.mean():.4f}')
-    print(f'Difference in Pliocene Interglacial Means: {(pliocene_interglacial_1208.mean() - pliocene_interglacial_1209.mean()):.4f}')
-    print("Is the d18O during Pleistocene glacials significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {kstest(pleistocene_glacial_1208, pleistocene_glacial_1209).pvalue:.4g}')
-    print(f'Yes, p value = {ttest_ind(pleistocene_glacial_1208, pleistocene_glacial_1209, equal_var=False).pvalue:.4g} (T-test)')
-    print(f'Pleistocene Glacial 1208 Mean: {pleistocene_glacial_1208.mean():.4f}, Pleistocene Glacial 1209 Mean: {pleistocene_glacial_1209.mean():.4f}')
-    print(f'Difference in Pleistocene Glacial Means: {(pleistocene_glacial_1208.mean() - pleistocene_glacial_1209.mean()):.4f}')
-    print("Is the d18O during Pleistocene interglacials significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {kstest(pleistocene_interglacial_1208, pleistocene_interglacial_1209).pvalue:.4g}')
-    print(f'Pleistocene Interglacial 1208 Mean: {pleistocene_interglacial_1208.mean():.4f}, Pleistocene Interglacial 1209 Mean: {pleistocene_interglacial_1209.mean():.4f}')
-    print(f'Difference in Pleistocene Interglacial Means: {(pleistocene_interglacial_1208.mean() - pleistocene_interglacial_1209.mean()):.4f}')
-
-
-    print("Is the d18O during the Pliocene significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {kstest(pliocene_1208, pliocene_1209).pvalue:.4g}, N = {len(pliocene_1208) + len(pliocene_1209)}')
-    print(f'Pliocene 1208 Mean: {pliocene_1208.mean():.4f}, Pliocene 1209 Mean: {pliocene_1209.mean():.4f}')
-    print(f'Difference in Pliocene Means: {(pliocene_1208.mean() - pliocene_1209.mean()):.4f}')
-
+    datasets = site_datasets()
+    # The KS test in each Pliocene/Pleistocene glacial/interglacial, with Welch's t-test for the Pleistocene glacials,
+    # and the KS test over the whole Pliocene
+    between_sites = compare_groups(datasets, "d18O_unadj", compare="site", within=("epoch", "glacial"),
+                                   correction=None)
+    pleistocene_glacials = (between_sites.epoch == "Pleistocene") & (between_sites.glacial == True)
+    pliocene = compare_groups(datasets, "d18O_unadj", compare="site", within=("epoch",), tests=("ks",),
+                              correction=None)
+    between_sites = between_sites[(between_sites.test == "ks") | pleistocene_glacials]
+    comparisons = pd.concat([between_sites.sort_values(by=["epoch", "glacial", "test"], ascending=[False, False, True]),
+                             pliocene[pliocene.epoch == "Pliocene"]]).assign(compare="site")
+    print_comparisons(comparisons, "d18O")
+
+    samples = group_samples(datasets, "d18O_unadj", ("epoch", "glacial", "site"))
 
     fig, axs = plt.subplots(
             nrows = 2,
@@ -83,25 +52,12 @@ def isotope_stats():
             figsize = (8, 8)
     )
 
-    axs[0, 0].hist(pliocene_glacial_1208, alpha=0.2, label='1208 Pliocene Glacials')
-    axs[0, 0].axvline(pliocene_glacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[0, 0].hist(pliocene_glacial_1209, alpha=0.2, label='1209 Pliocene Glacials')
-    axs[0, 0].axvline(pliocene_glacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
-
-    axs[0, 1].hist(pliocene_interglacial_1208, alpha=0.2, label='1208 Pliocene Interglacials')
-    axs[0, 1].axvline(pliocene_interglacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[0, 1].hist(pliocene_interglacial_1209, alpha=0.2, label='1209 Pliocene Interglacials')
-    axs[0, 1].axvline(pliocene_interglacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
-
-    axs[1, 0].hist(pleistocene_glacial_1208, alpha=0.2, label='1208 Pleistocene Glacials')
-    axs[1, 0].axvline(pleistocene_glacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[1, 0].hist(pleistocene_glacial_1209, alpha=0.2, label='1209 Pleistocene Glacials')
-    axs[1, 0].axvline(pleistocene_glacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
-
-    axs[1, 1].hist(pleistocene_interglacial_1208, alpha=0.2, label='1208 Pleistocene Interglacials')
-    axs[1, 1].axvline(pleistocene_interglacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[1, 1].hist(pleistocene_interglacial_1209, alpha=0.2, label='1209 Pleistocene Interglacials')
-    axs[1, 1].axvline(pleistocene_interglacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
+    for ax, (epoch, glacial) in zip(axs.flat, [("Pliocene", True), ("Pliocene", False), ("Pleistocene", True),
+                                               ("Pleistocene", False)]):
+        name = "Glacials" if glacial else "Interglacials"
+        for site, colour in [("1208", "tab:blue"), ("1209", "tab:orange")]:
+            ax.hist(samples[(epoch, glacial, site)], alpha=0.2, label=f'{site} {epoch} {name}')
+            ax.axvline(samples[(epoch, glacial, site)].mean(), ls='--', color=colour, label=f'{site} Mean')
 
     for axes in axs:
         for ax in axes:
@@ -112,36 +68,14 @@ def isotope_stats():
 
 
 def same_isotope_stats():
-    sel_iso_1208 = iso_1208.loc[iso_1208.age_ka > iso_1209.age_ka.min()]
-
-    pliocene_glacial_1208 = sel_iso_1208.loc[sel_iso_1208.pliocene & sel_iso_1208.glacial].d18O_unadj.values
-    pliocene_glacial_1209 = iso_1209.loc[iso_1209.pliocene & iso_1209.glacial].d18O_unadj.values
-    pliocene_interglacial_1208 = sel_iso_1208.loc[sel_iso_1208.pliocene & (sel_iso_1208.glacial == False)].d18O_unadj.values
-    pliocene_interglacial_1209 = iso_1209.loc[iso_1209.pliocene & (iso_1209.glacial == False)].d18O_unadj.values
-    pleistocene_glacial_1208 = sel_iso_1208.loc[(sel_iso_1208.pliocene == False) & sel_iso_1208.glacial].d18O_unadj.values
-    pleistocene_glacial_1209 = iso_1209.loc[(iso_1209.pliocene == False) & iso_1209.glacial].d18O_unadj.values
-    pleistocene_interglacial_1208 = sel_iso_1208.loc[
-        (sel_iso_1208.pliocene == False) & (sel_iso_1208.glacial == False)].d18O_unadj.values
-    pleistocene_interglacial_1209 = iso_1209.loc[
-        (iso_1209.pliocene == False) & (iso_1209.glacial == False)].d18O_unadj.values
-
-    print('Welch T-test')
-    print("Is the d18O at 1208 during Pliocene glacials significantly different to Pleistocene glacials?")
-    print(f'Yes, p value = {ttest_ind(pliocene_glacial_1208, pleistocene_glacial_1208, equal_var=False).pvalue:.4g}')
-    print(f'Pliocene Glacial 1208 Mean: {pliocene_glacial_1208.mean():.4f}, Pleistocene Glacial 1208 Mean: {pleistocene_glacial_1208.mean():.4f}')
-    print(f'Difference in 1208 Glacial Means: {(pliocene_glacial_1208.mean() - pleistocene_glacial_1208.mean()):.4f}')
-    print("Is the d18O at 1209 during Pliocene glacials significantly different to Pleistocene glacials?")
-    print(f'Yes, p value = {ttest_ind(pliocene_glacial_1209, pleistocene_glacial_1209, equal_var=False).pvalue:.4g}')
-    print(f'Pliocene Glacial 1209 Mean: {pliocene_glacial_1209.mean():.4f}, Pleistocene Glacial 1209 Mean: {pleistocene_glacial_1209.mean():.4f}')
-    print(f'Difference in 1209 Glacial Means: {(pliocene_glacial_1209.mean() - pleistocene_glacial_1209.mean()):.4f}')
-    print("Is the d18O at 1208 during Pliocene interglacials significantly to Pleistocene interglacials?")
-    print(f'Yes, p value = {ttest_ind(pliocene_interglacial_1208, pleistocene_interglacial_1208, equal_var=False).pvalue:.4g}')
-    print(f'Pliocene Interglacial 1208 Mean: {pliocene_interglacial_1208.mean():.4f}, Pleistocene interglacial 1208 Mean: {pleistocene_interglacial_1208.mean():.4f}')
-    print(f'Difference in 1208 Interglacial Means: {(pliocene_interglacial_1208.mean() - pleistocene_interglacial_1208.mean()):.4f}')
-    print("Is the d18O at 1209 during Pliocene interglacials significantly different to Pleistocene interglacials?")
-    print(f'Yes, p value = {ttest_ind(pliocene_interglacial_1209, pleistocene_interglacial_1209, equal_var=False).pvalue:.4g}')
-    print(f'Pliocene Interglacial 1209 Mean: {pliocene_interglacial_1209.mean():.4f}, Pleistocene Interglacial 1209 Mean: {pleistocene_interglacial_1209.mean():.4f}')
-    print(f'Difference in 1209 Interglacial Means: {(pliocene_interglacial_1209.mean() - pleistocene_interglacial_1209.mean()):.4f}')
+    datasets = site_datasets()
+    # Welch's t-test between the epochs at each site, in glacials and in interglacials
+    between_epochs = compare_groups(datasets, "d18O_unadj", compare="epoch", within=("site", "glacial"),
+                                    tests=("welch",), correction=None, pairs=[("Pliocene", "Pleistocene")])
+    between_epochs = between_epochs.sort_values(by=["glacial", "site"], ascending=[False, True])
+    print_comparisons(between_epochs.assign(compare="epoch"), "d18O")
+
+    samples = group_samples(datasets, "d18O_unadj", ("site", "glacial", "epoch"))
 
     fig, axs = plt.subplots(
             nrows = 2,
@@ -151,25 +85,11 @@ def same_isotope_stats():
             figsize = (8, 8)
     )
 
-    axs[0, 0].hist(pliocene_glacial_1208, alpha=0.2, label='1208 Pliocene Glacials')
-    axs[0, 0].axvline(pliocene_glacial_1208.mean(), ls='--', color='tab:blue', label='Pliocene Mean')
-    axs[0, 0].hist(pleistocene_glacial_1208, alpha=0.2, label='1208 Pleistocene Glacials')
-    axs[0, 0].axvline(pleistocene_glacial_1208.mean(), ls='--', color='tab:orange', label='Pleistocene Mean')
-
-    axs[0, 1].hist(pliocene_glacial_1209, alpha=0.2, label='1209 Pliocene Glacials')
-    axs[0, 1].axvline(pliocene_glacial_1209.mean(), ls='--', color='tab:blue', label='Pliocene Mean')
-    axs[0, 1].hist(pleistocene_glacial_1209, alpha=0.2, label='1209 Pleistocene Glacials')
-    axs[0, 1].axvline(pleistocene_glacial_1209.mean(), ls='--', color='tab:orange', label='Pleistocene Mean')
-
-    axs[1, 0].hist(pliocene_interglacial_1208, alpha=0.2, label='1208 Pliocene Interglacials')
-    axs[1, 0].axvline(pliocene_interglacial_1208.mean(), ls='--', color='tab:blue', label='Pliocene Mean')
-    axs[1, 0].hist(pleistocene_interglacial_1208, alpha=0.2, label='1208 Pleistocene Interglacials')
-    axs[1, 0].axvline(pleistocene_interglacial_1208.mean(), ls='--', color='tab:orange', label='Pleistocene Mean')
-
-    axs[1, 1].hist(pliocene_interglacial_1209, alpha=0.2, label='1209 Pliocene Interglacials')
-    axs[1, 1].axvline(pliocene_interglacial_1209.mean(), ls='--', color='tab:blue', label='Pliocene Mean')
-    axs[1, 1].hist(pleistocene_interglacial_1209, alpha=0.2, label='1209 Pleistocene Interglacials')
-    axs[1, 1].axvline(pleistocene_interglacial_1209.mean(), ls='--', color='tab:orange', label='Pleistocene Mean')
+    for ax, (site, glacial) in zip(axs.flat, [("1208", True), ("1209", True), ("1208", False), ("1209", False)]):
+        name = "Glacials" if glacial else "Interglacials"
+        for epoch, colour in [("Pliocene", "tab:blue"), ("Pleistocene", "tab:orange")]:
+            ax.hist(samples[(site, glacial, epoch)], alpha=0.2, label=f'{site} {epoch} {name}')
+            ax.axvline(samples[(site, glacial, epoch)].mean(), ls='--', color=colour, label=f'{epoch} Mean')
 
     for axes in axs:
         for ax in axes:
@@ -179,6 +99,22 @@ def same_isotope_stats():
     plt.show()
 
 
+def isotope_comparisons(correction: str = "holm"):
+    """
+    The comparisons of isotope_stats and same_isotope_stats as one table, from compare_groups.
+
+    Sites are compared within each Pliocene/Pleistocene glacial/interglacial, and the epochs within each site and
+    glacial state, with Welch's t-test and the KS test and the p values corrected across each set of comparisons.
+    """
+    datasets = site_datasets()
+    between_sites = compare_groups(datasets, "d18O_unadj", compare="site", within=("epoch", "glacial"),
+                                   correction=correction)
+    between_epochs = compare_groups(datasets, "d18O_unadj", compare="epoch", within=("site", "glacial"),
+                                    pairs=[("Pliocene", "Pleistocene")], correction=correction)
+    return pd.concat([between_sites.assign(compare="site"), between_epochs.assign(compare="epoch")],
+                     ignore_index=True)
+
+
 def isotope_overlaps():
     fig, ax = plt.subplots(
         figsize=(8, 8)
@@ -286,47 +222,45 @@ def isotope_overlaps():
 
 
 def difference_stats(save_fig: bool = False):
-
-    pliocene_glacial_difference = sample_data.loc[sample_data.pliocene & sample_data.glacial].difference_d18O.values
-    pliocene_interglacial_difference = sample_data.loc[sample_data.pliocene & (sample_data.glacial == False)].difference_d18O.values
-    pleistocene_glacial_difference = sample_data.loc[(sample_data.pliocene == False) & sample_data.glacial].difference_d18O.values
-    pleistocene_interglacial_difference = sample_data.loc[(sample_data.pliocene == False) & (sample_data.glacial == False)].difference_d18O.values
-
-    pliocene_difference = sample_data.loc[sample_data.pliocene].difference_d18O.values
-
-    print('KS test')
-    print(
-        "Is the difference in d18O during glacials significantly different in the Pliocene compared to the Pleistocene?")
-    print(f'No, p value = {ttest_ind(pliocene_glacial_difference, pleistocene_glacial_difference, equal_var=False).pvalue:.4f}')
-    print(f'Pliocene Glacials: {pliocene_glacial_difference.mean():.4f}, Pleistocene Glacials: {pleistocene_glacial_difference.mean():.4f}')
-    print(f'Difference: {pliocene_glacial_difference.mean() - pleistocene_glacial_difference.mean():.4f}')
-    print(
-        "Is the difference in d18O during interglacials significantly different in the Pliocene compared to the Pleistocene?")
-    print(f'Yes, p value = {kstest(pliocene_interglacial_difference, pleistocene_interglacial_difference).pvalue:.4f}')
-    print(f'Pliocene Interglacials: {pliocene_interglacial_difference.mean():.4f}, Pleistocene Interglacials: {pleistocene_interglacial_difference.mean():.4f}')
-    print(f'Difference: {pliocene_interglacial_difference.mean() - pleistocene_interglacial_difference.mean():.4f}')
-    print(
-        "Is the difference in d18O in the Pliocene significantly different in glacials compared to interglacials?")
-    print(f'No, p value = {ttest_ind(pliocene_glacial_difference, pliocene_interglacial_difference, equal_var=False).pvalue:.4f}, N = {len(pliocene_glacial_difference) + len(pliocene_interglacial_difference)}')
-    print(f'Pliocene Glacials: {pliocene_glacial_difference.mean():.4f}, Pliocene Interglacials: {pliocene_interglacial_difference.mean():.4f}')
-    print(f'Difference: {pliocene_glacial_difference.mean() - pliocene_interglacial_difference.mean():.4f}')
-    print(
-        "Is the difference in d18O in the Pleistocene significantly different in glacials compared to interglacials?")
-    print(f'Yes, p value = {ttest_ind(pleistocene_glacial_difference, pleistocene_interglacial_difference, equal_var=False).pvalue:.4f}, N = {len(pleistocene_glacial_difference) + len(pleistocene_interglacial_difference)}')
-    print(f'Pleistocene Glacials: {pleistocene_glacial_difference.mean():.4f}, Pleistocene Interglacials: {pleistocene_interglacial_difference.mean():.4f}')
-    print(f'Difference: {pleistocene_glacial_difference.mean() - pleistocene_interglacial_difference.mean():.4f}')
-
-    print(
-        "Is the difference in d18O in the Pleistocene glacials significantly different to the Pliocene?")
-    print(f'No, p value = {ttest_ind(pleistocene_glacial_difference, pliocene_difference, equal_var=False).pvalue:.4f}')
-    print(f'Pleistocene Glacials: {pleistocene_glacial_difference.mean():.4f}, Pliocene: {pliocene_difference.mean():.4f}')
-    print(f'Difference: {pleistocene_glacial_difference.mean() - pliocene_difference.mean():.4f}')
-
-    print(
-        "Is the difference in d18O in the Pleistocene interglacials significantly different to the Pliocene?")
-    print(f'Yes, p value = {ttest_ind(pleistocene_interglacial_difference, pliocene_difference, equal_var=False).pvalue:.4f}')
-    print(f'Pleistocene Glacials: {pleistocene_interglacial_difference.mean():.4f}, Pliocene: {pliocene_difference.mean():.4f}')
-    print(f'Difference: {pleistocene_interglacial_difference.mean() - pliocene_difference.mean():.4f}')
+    # The Pleistocene glacials and interglacials are each also compared with the whole Pliocene
+    stages = np.where(sample_data.pliocene, "Pliocene",
+                      np.where(sample_data.glacial, "Pleistocene glacials", "Pleistocene interglacials"))
+    datasets = {"difference": sample_data.assign(stage=stages)}
+
+    # Welch's t-test between the epochs in glacials and the KS test in interglacials, Welch's t-test between glacials
+    # and interglacials in each epoch, and between each Pleistocene stage and the Pliocene
+    between_epochs = compare_groups(datasets, "difference_d18O", compare="epoch", within=("glacial",),
+                                    correction=None, pairs=[("Pliocene", "Pleistocene")])
+    between_epochs = between_epochs[(between_epochs.test == "welch") == (between_epochs.glacial == True)]
+    between_glacials = compare_groups(datasets, "difference_d18O", compare="glacial", within=("epoch",),
+                                      tests=("welch",), correction=None, pairs=[(True, False)])
+    between_stages = compare_groups(datasets, "difference_d18O", compare="stage", within=(), tests=("welch",),
+                                    correction=None, pairs=[("Pleistocene glacials", "Pliocene"),
+                                                            ("Pleistocene interglacials", "Pliocene")])
+    print_comparisons(pd.concat([between_epochs.sort_values(by="glacial", ascending=False).assign(compare="epoch"),
+                                 between_glacials.sort_values(by="epoch", ascending=False).assign(compare="glacial"),
+                                 between_stages.assign(compare="stage")]), "difference in d18O")
+
+    samples = group_samples(datasets, "difference_d18O", ("epoch", "glacial"))
+    pliocene_glacial_difference = samples[("Pliocene", True)]
+    pliocene_interglacial_difference = samples[("Pliocene", False)]
+    pleistocene_glacial_difference = samples[("Pleistocene", True)]
+    pleistocene_interglacial_difference = samples[("Pleistocene", False)]
+    pliocene_difference = group_samples(datasets, "difference_d18O", ("epoch",))[("Pliocene",)]
+
+    # Bootstrap intervals of the differences in means above, drawn together
+    comparisons = {
+        'Pliocene - Pleistocene Glacials': (pliocene_glacial_difference, pleistocene_glacial_difference),
+        'Pliocene - Pleistocene Interglacials': (pliocene_interglacial_difference, pleistocene_interglacial_difference),
+        'Pliocene Glacials - Interglacials': (pliocene_glacial_difference, pliocene_interglacial_difference),
+        'Pleistocene Glacials - Interglacials': (pleistocene_glacial_difference, pleistocene_interglacial_difference),
+        'Pleistocene Glacials - Pliocene': (pleistocene_glacial_difference, pliocene_difference),
+        'Pleistocene Interglacials - Pliocene': (pleistocene_interglacial_difference, pliocene_difference),
+    }
+    intervals = bootstrap_batch(list(comparisons.values()), n_resamples=100000)
+    print('Bootstrap 95% intervals (BCa) of the differences in means')
+    for name, interval in zip(comparisons, intervals.itertuples()):
+        print(f'{name}: {interval.estimate:.4f} [{interval.bca_low:.4f}, {interval.bca_high:.4f}]')
 
     fig, axs = plt.subplots(
         ncols = 2,
@@ -1,5 +1,4 @@
-from objects.core_data.isotopes import iso_1209, iso_1208
-from objects.core_data.psu import psu_1209, psu_1208
+from objects.core_data import isotopes, psu
 from objects.arguments.args_Nature import args_1209, args_1208, args_diff
 
 from methods.interpolations.binning_records import binning_multiple_series
@@ -11,6 +10,10 @@ import pandas as pd
 
 
 def generate_differences(resampling_freq:float = 2.0,  age_min:int = 2200, age_max:int = 3600) -> pd.DataFrame:
+    iso_1208 = isotopes.iso_1208
+    iso_1209 = isotopes.iso_1209
+    psu_1208 = psu.psu_1208
+    psu_1209 = psu.psu_1209
     ## ------------- GENERATE DIFFERENCES  -------------
     resampled_data_iso = binning_multiple_series(
         iso_1208, iso_1209,
@@ -1,78 +1,39 @@
 from methods.simple_figures.core_tops import temp_from_mgca
-from objects.misc.mis_boundaries import mis_boundaries
+from methods.stats.comparisons import compare_groups, group_samples, print_comparisons
+from objects.misc.mis_boundaries import label_mis
 from objects.core_data.psu import psu_1209, psu_1208
 
 from scipy.stats import kstest, ttest_ind
 import matplotlib.pyplot as plt
+import pandas as pd
 
-psu_1208['glacial'] = False
-psu_1209['glacial'] = False
-for _, row in mis_boundaries.iterrows():
-    lower_age = row["age_start"]
-    upper_age = row['age_end']
-    if row["glacial"] == "glacial":
-        psu_1208.loc[(psu_1208.age_ka >= lower_age) & (psu_1208.age_ka < upper_age), 'glacial'] = True
-        psu_1209.loc[(psu_1209.age_ka >= lower_age) & (psu_1209.age_ka < upper_age), 'glacial'] = True
-
-
-psu_1208['pliocene'] = False
-psu_1209['pliocene'] = False
-psu_1208.loc[psu_1208.age_ka > 2700, 'pliocene'] = True
-psu_1209.loc[psu_1209.age_ka > 2700, 'pliocene'] = True
+# Label the glacials and the Pliocene samples (on copies, so the shared datasets are left unchanged)
+psu_1208 = label_mis(psu_1208)
+psu_1209 = label_mis(psu_1209)
 
 def bwt_stats():
-
-    pleistocene_glacial_1208 = psu_1208.loc[(psu_1208.pliocene == False) & psu_1208.glacial].temp.values
-    pleistocene_glacial_1209 = psu_1209.loc[(psu_1209.pliocene == False) & psu_1209.glacial].temp.values
-    pleistocene_interglacial_1208 = psu_1208.loc[
-        (psu_1208.pliocene == False) & (psu_1208.glacial == False)].temp.values
-    pleistocene_interglacial_1209 = psu_1209.loc[
-        (psu_1209.pliocene == False) & (psu_1209.glacial == False)].temp.values
-
-    pliocene_1208 = psu_1208.loc[(psu_1208.age_ka < 3000) & (psu_1208.age_ka > 2700)].temp.values
-    pliocene_1209 = psu_1209.loc[(psu_1209.age_ka < 3000) & (psu_1209.age_ka > 2700)].dropna(subset='temp').temp.values
-
-    pleistocene_1209 = psu_1209.loc[(psu_1209.age_ka < 2700)].dropna(subset='temp').temp.values
-    pleistocene_1208 = psu_1208.loc[(psu_1208.age_ka < 2700)].dropna(subset='temp').temp.values
-
-
-
-    print('Welch T-test')
-    print("Is the BWT during Pleistocene glacials significantly different at 1208 compared to 1209?")
-    print(f'No, p value = {ttest_ind(pleistocene_glacial_1208, pleistocene_glacial_1209, equal_var=False).pvalue:.4g}')
-    print(f'Pleistocene Glacial 1208 Mean: {pleistocene_glacial_1208.mean():.4f}, Pleistocene Glacial 1209 Mean: {pleistocene_glacial_1209.mean():.4f}')
-    print(f'Difference in Pleistocene Glacial Means: {(pleistocene_glacial_1208.mean() - pleistocene_glacial_1209.mean()):.4f}')
-    print("Is the BWT during Pleistocene interglacials significantly different at 1208 compared to 1209?")
-    print(f'Yes, p value = {ttest_ind(pleistocene_interglacial_1208, pleistocene_interglacial_1209, equal_var=False).pvalue:.4g}')
-    print(f'Pleistocene Interglacial 1208 Mean: {pleistocene_interglacial_1208.mean():.4f}, Pleistocene Interglacial 1209 Mean: {pleistocene_interglacial_1209.mean():.4f}')
-    print(f'Difference in Pleistocene Interglacial Means: {(pleistocene_interglacial_1208.mean() - pleistocene_interglacial_1209.mean()):.4f}')
-
-    print("Is the BWT at 1209 during Pleistocene significantly different during glacials and interglacials?")
-    print(f'No, p value = {ttest_ind(pleistocene_glacial_1209, pleistocene_interglacial_1209, equal_var=False).pvalue:.4g}')
-    print(f'Pleistocene Glacial 1209 Mean: {pleistocene_glacial_1209.mean():.4f}, Pleistocene Interglacial 1209 Mean: {pleistocene_interglacial_1209.mean():.4f}')
-    print(f'Difference in 1209 Pleistocene Means: {(pleistocene_glacial_1209.mean() - pleistocene_interglacial_1209.mean()):.4f}')
-    print("Is the BWT at 1208 during Pleistocene significantly different during glacials and interglacials?")
-    print(f'Yes, p value = {ttest_ind(pleistocene_glacial_1208, pleistocene_interglacial_1208, equal_var=False).pvalue:.4g}')
-    print(f'Pleistocene Glacial 1208 Mean: {pleistocene_glacial_1208.mean():.4f}, Pleistocene Interglacial 1208 Mean: {pleistocene_interglacial_1208.mean():.4f}')
-    print(f'Difference in Pleistocene 1208 Means: {(pleistocene_glacial_1208.mean() - pleistocene_interglacial_1208.mean()):.4f}')
-
-
-    print("Is the BWT at 1208 during Late Pliocene different to 1209?")
-    print(f'Yes, p value = {ttest_ind(pliocene_1208, pliocene_1209, equal_var=False).pvalue:.4g}')
-    print(f'Late Pliocene 1208 Mean: {pliocene_1208.mean():.4f}, Late Pliocene 1209 Mean: {pliocene_1209.mean():.4f}')
-    print(f'Difference in Pliocene Means: {(pliocene_1208.mean() - pliocene_1209.mean()):.4f}')
-
-
-    print("Is the BWT at 1208 during Late Pliocene different to Pleistocene?")
-    print(f'Yes, p value = {ttest_ind(pliocene_1208, pleistocene_1208, equal_var=False).pvalue:.4g}')
-    print(f'Late Pliocene 1208 Mean: {pliocene_1208.mean():.4f}, Pleistocene 1208 Mean: {pleistocene_1208.mean():.4f}')
-    print(f'Difference in Means: {(pliocene_1208.mean() - pleistocene_1208.mean()):.4f}')
-
-    print("Is the BWT at 1209 during Late Pliocene different to Pleistocene?")
-    print(f'Yes, p value = {ttest_ind(pliocene_1209, pleistocene_1209, equal_var=False).pvalue:.4g}')
-    print(f'Late Pliocene 1209 Mean: {pliocene_1209.mean():.4f}, Pleistocene 1209 Mean: {pleistocene_1209.mean():.4f}')
-    print(f'Difference in Means: {(pliocene_1209.mean() - pleistocene_1209.mean()):.4f}')
-
+    datasets = {"1208": psu_1208, "1209": psu_1209}
+    # Welch's t-test between the sites and between glacials and interglacials in the Pleistocene, and between the
+    # sites and between the epochs in the late Pliocene (2700-3000 ka)
+    between_sites = compare_groups(datasets, "temp", compare="site", within=("epoch", "glacial"), tests=("welch",),
+                                   correction=None)
+    between_glacials = compare_groups(datasets, "temp", compare="glacial", within=("site", "epoch"),
+                                      tests=("welch",), correction=None, pairs=[(True, False)])
+    late_pliocene_sites = compare_groups(datasets, "temp", compare="site", within=("epoch",), tests=("welch",),
+                                         correction=None, age_max=3000)
+    late_pliocene_epochs = compare_groups(datasets, "temp", compare="epoch", within=("site",), tests=("welch",),
+                                          correction=None, pairs=[("Pliocene", "Pleistocene")], age_max=3000)
+    print_comparisons(pd.concat([
+        between_sites[between_sites.epoch == "Pleistocene"].sort_values(by="glacial", ascending=False)
+        .assign(compare="site"),
+        between_glacials[between_glacials.epoch == "Pleistocene"].sort_values(by="site", ascending=False)
+        .assign(compare="glacial"),
+        late_pliocene_sites[late_pliocene_sites.epoch == "Pliocene"].assign(compare="site"),
+        late_pliocene_epochs.assign(compare="epoch"),
+    ]), "BWT")
+
+    samples = group_samples(datasets, "temp", ("epoch", "glacial", "site"))
+    late_pliocene = group_samples(datasets, "temp", ("epoch", "site"), age_max=3000)
 
     fig, axs = plt.subplots(
             ncols = 2,
@@ -81,15 +42,11 @@ def bwt_stats():
             figsize = (10, 5)
     )
 
-    axs[0].hist(pleistocene_glacial_1208, alpha=0.2, label='1208 Pleistocene Glacials')
-    axs[0].axvline(pleistocene_glacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[0].hist(pleistocene_glacial_1209, alpha=0.2, label='1209 Pleistocene Glacials')
-    axs[0].axvline(pleistocene_glacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
-
-    axs[1].hist(pleistocene_interglacial_1208, alpha=0.2, label='1208 Pleistocene Interglacials')
-    axs[1].axvline(pleistocene_interglacial_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    axs[1].hist(pleistocene_interglacial_1209, alpha=0.2, label='1209 Pleistocene Interglacials')
-    axs[1].axvline(pleistocene_interglacial_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
+    for ax, glacial in zip(axs, [True, False]):
+        name = "Glacials" if glacial else "Interglacials"
+        for site, colour in [("1208", "tab:blue"), ("1209", "tab:orange")]:
+            ax.hist(samples[("Pleistocene", glacial, site)], alpha=0.2, label=f'{site} Pleistocene {name}')
+            ax.axvline(samples[("Pleistocene", glacial, site)].mean(), ls='--', color=colour, label=f'{site} Mean')
 
     for ax in axs:
         ax.legend(ncols=2)
@@ -97,10 +54,9 @@ def bwt_stats():
 
     fig, ax = plt.subplots()
 
-    ax.hist(pliocene_1208, alpha=0.2, label='1208 Pliocene')
-    ax.axvline(pliocene_1208.mean(), ls='--', color='tab:blue', label='1208 Mean')
-    ax.hist(pliocene_1209, alpha=0.2, label='1209 Pliocene')
-    ax.axvline(pliocene_1209.mean(), ls='--', color='tab:orange', label='1209 Mean')
+    for site, colour in [("1208", "tab:blue"), ("1209", "tab:orange")]:
+        ax.hist(late_pliocene[("Pliocene", site)], alpha=0.2, label=f'{site} Pliocene')
+        ax.axvline(late_pliocene[("Pliocene", site)].mean(), ls='--', color=colour, label=f'{site} Mean')
 
     ax.legend()
 
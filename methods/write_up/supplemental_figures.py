@@ -157,11 +157,11 @@ def figure_s2(save_fig: bool = False):
 
 
 # FIGURE S3 is a modelling output from the Burls et al., 2017 model and so is not generated here.
-def figure_s4(save_fig: bool = False, filter_frequency: float = 5):
+def figure_s4(save_fig: bool = False, filter_frequency: float = 30):
     """
     This figure shows the interpolated difference in the d18O_c record of 1208 and 1209
     :param save_fig: determines whether this figure needs to be saved to Figure_S4.svg
-    :param filter_frequency: the frequency (in ka) that is resampled to
+    :param filter_frequency: the period (in ka) of the low pass filter applied to the difference
     :return:
     """
     # ------------------- RESAMPLING -------------
@@ -222,7 +222,7 @@ def figure_s4(save_fig: bool = False, filter_frequency: float = 5):
         plt.show()
 
 
-def figure_s5(window_size: int = 100, filter_period: float = 4.0, save_fig: bool = False):
+def figure_s5(window_size: int = 100, filter_period: float = 40.0, save_fig: bool = False):
     # --------------- GENERATE DIFFERENCES ---------------
     resampling_freq = 5.0  # Resampling frequency in ka
     age_min, age_max = 2400, 3400  # Minimum and maximum ages in ka
@@ -337,6 +337,6 @@ def figure_s7(save_fig: bool = False):
 if __name__ == "__main__":
     # figure_s1(save_fig=True)
     # figure_s2(save_fig=True)
-    figure_s4(save_fig=False, filter_frequency=5)
-    # figure_s5(save_fig=False, filter_period=5)
+    figure_s4(save_fig=False, filter_frequency=30)
+    # figure_s5(save_fig=False, filter_period=50)
     # figure_s7(save_fig=False)
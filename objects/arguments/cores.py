@@ -1,4 +1,4 @@
-from pandas import read_csv
+from objects.caching.columnar import read_cached_csv
 
 
 class Core:
@@ -11,6 +11,6 @@ class Core:
     def get_data(self, location: str, sort: str, drop: str = None):
         loc = "data/{}/{}.csv".format(location, "{}_{}".format(self.site, self.method))
         if drop is None:
-            return read_csv(loc).sort_values(by=sort)
+            return read_cached_csv(loc).sort_values(by=sort)
         else:
-            return read_csv(loc).sort_values(by=sort).dropna(subset=drop)
+            return read_cached_csv(loc).sort_values(by=sort).dropna(subset=drop)
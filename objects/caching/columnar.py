@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from pandas import DataFrame, read_csv, read_pickle
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # Fall back to pickled frames when pyarrow is not installed
+    feather = None
+
+# The repository root and the directory holding the binary copies of the CSV files
+ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIRECTORY = ROOT / "data" / ".cache"
+# Set to False to always parse the CSV files
+CACHE_ENABLED = True
+
+
+def hash_file(path: Path) -> str:
+    """
+    SHA-1 hash of the contents of a file.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_frame(frame: DataFrame, path: Path) -> Path:
+    """
+    Write a DataFrame to a typed binary file, as Feather if pyarrow is available and as a pickle otherwise. The
+    suffix of the format used is appended to 'path', and the written path is returned.
+    """
+    path = Path(path)
+    temporary = None
+    try:
+        if feather is not None:
+            try:
+                target = path.with_name(path.name + ".feather")
+                temporary = target.with_name(target.name + ".tmp")
+                feather.write_feather(frame, temporary)
+                os.replace(temporary, target)
+                return target
+            except (TypeError, ValueError, ImportError, AttributeError):
+                # Frames that Feather cannot store (e.g. mixed-type object columns or a custom index) are pickled
+                pass
+        target = path.with_name(path.name + ".pkl")
+        temporary = target.with_name(target.name + ".tmp")
+        frame.to_pickle(temporary)
+        os.replace(temporary, target)
+        return target
+    finally:
+        if temporary is not None and temporary.exists():
+            temporary.unlink()
+
+
+def read_frame(path: Path) -> DataFrame:
+    """
+    Read a DataFrame written by write_frame, memory-mapping Feather files.
+    """
+    path = Path(path)
+    if path.suffix == ".feather":
+        if feather is None:
+            raise ImportError("Reading a Feather file requires pyarrow")
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return read_pickle(path)
+
+
+def read_cached_csv(path: str, **kwargs) -> DataFrame:
+    """
+    Read a CSV file through a binary columnar cache.
+
+    Parameters:
+    - path (str): The CSV file, absolute or relative to the repository root.
+    - kwargs: Any further arguments for pandas.read_csv.
+
+    Returns:
+    - pandas.DataFrame: The same frame as pandas.read_csv(path, **kwargs).
+
+    The first read parses the CSV and writes a typed binary copy to data/.cache. Later reads use the copy while the
+    modification time and size of the CSV are unchanged. If either has changed, the contents are hashed, and the copy
+    is rebuilt only when the hash differs. Different read_csv arguments are cached separately.
+    """
+    path = Path(path)
+    if not path.is_absolute():
+        path = ROOT / path
+    if not CACHE_ENABLED:
+        return read_csv(path, **kwargs)
+
+    # -------------- LOCATE CACHE --------------
+    source = os.path.relpath(path, ROOT).replace(os.sep, "__")
+    options = hashlib.sha1(repr(sorted(kwargs.items())).encode()).hexdigest()[:8]
+    metadata_path = CACHE_DIRECTORY / f"{source}.{options}.json"
+    stat = path.stat()
+
+    # -------------- CHECK CACHE --------------
+    try:
+        metadata = json.loads(metadata_path.read_text())
+        cached = CACHE_DIRECTORY / metadata["file"]
+        if cached.exists():
+            if metadata["mtime_ns"] == stat.st_mtime_ns and metadata["size"] == stat.st_size:
+                return read_frame(cached)
+            content_hash = hash_file(path)
+            if metadata["sha1"] == content_hash:
+                metadata.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                metadata_path.write_text(json.dumps(metadata))
+                return read_frame(cached)
+    except (OSError, ValueError, KeyError, ImportError):
+        pass
+
+    # -------------- BUILD CACHE --------------
+    frame = read_csv(path, **kwargs)
+    try:
+        CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        cached = write_frame(frame, CACHE_DIRECTORY / f"{source}.{options}")
+        metadata = {"file": cached.name, "sha1": hash_file(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        metadata_path.write_text(json.dumps(metadata))
+    except OSError:
+        # A read-only data directory simply means the CSV is parsed every time
+        pass
+    return frame
@@ -0,0 +1,29 @@
+import hashlib
+
+import numpy as np
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
+
+
+def hash_array(array: np.ndarray) -> str:
+    """
+    Content hash of a numpy array, including its shape and dtype.
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha1(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def hash_frame(frame: DataFrame, columns: list[str] = None) -> str:
+    """
+    Content hash of a DataFrame (or a subset of its columns), ignoring the index.
+
+    Two frames holding the same values in the same column order give the same hash, so the hash can key caches of
+    results derived from the data rather than from the identity of a particular DataFrame object.
+    """
+    if columns is not None:
+        frame = frame[list(columns)]
+    digest = hashlib.sha1(repr(list(frame.columns)).encode())
+    digest.update(hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,156 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+from pandas import DataFrame
+
+from objects.caching.columnar import CACHE_DIRECTORY, read_frame, write_frame
+from objects.caching.result_cache import _code_files, _source_hash
+
+# The directory holding the products that are kept on disk
+PRODUCT_DIRECTORY = CACHE_DIRECTORY / "products"
+
+
+class ProductGraph:
+    """
+    A graph of named analysis products, each computed by a function from other products and parameters.
+
+    Products are only computed when they are requested, together with the products they depend on, and are kept in
+    memory for each combination of the parameters that reach them. Products registered with 'persist' are also written
+    to disk (DataFrames only), so a later session reads them back rather than recomputing them. Persisted products
+    are keyed, as the results of cached_result, by their parameters, the data sources and the code files of the
+    product and of every product it depends on.
+    """
+
+    def __init__(self, directory: Path = PRODUCT_DIRECTORY):
+        self._nodes = {}
+        self._results = {}
+        # The directory of the persisted products
+        self.directory = Path(directory)
+
+    def node(self, name: str = None, inputs: tuple[str, ...] = (), parameters: dict[str, Any] = None,
+             sources: tuple[str, ...] = (), persist: bool = False) -> Callable[[Callable], Callable]:
+        """
+        Register a function as a product.
+
+        Parameters:
+        - name (str, optional): The name of the product (default: the name of the function).
+        - inputs (tuple[str, ...], optional): The products the function takes, as keyword arguments of the same name.
+          They must already be registered, which keeps the graph acyclic.
+        - parameters (dict, optional): The parameters the function takes, as keyword arguments, with their defaults
+          (e.g. {'resampling_freq': 2, 'age_min': 2200}).
+        - sources (tuple[str, ...], optional): The data files or directories, relative to the repository root, that
+          the function reads besides its inputs (e.g. 'data/cores/1208_d18O.csv'), which key the persisted product.
+        - persist (bool, optional): Also keep the product on disk (default: False).
+
+        Returns:
+        - The decorator, which returns the function unchanged.
+        """
+        def register(function: Callable) -> Callable:
+            key = name or function.__name__
+            unknown = [product for product in inputs if product not in self._nodes]
+            if unknown:
+                raise ValueError(f"Product {key} depends on unregistered products: {', '.join(unknown)}")
+            self._nodes[key] = {"function": function, "inputs": tuple(inputs), "parameters": dict(parameters or {}),
+                                "sources": tuple(sources), "persist": persist}
+            return function
+
+        return register
+
+    def upstream(self, name: str) -> list[str]:
+        """
+        The product and every product it depends on, dependencies first.
+        """
+        order = []
+        for product in self._nodes[name]["inputs"]:
+            order.extend(upstream for upstream in self.upstream(product) if upstream not in order)
+        return order + [name]
+
+    def parameters(self, name: str) -> dict[str, Any]:
+        """
+        The default of every parameter that reaches a product, through it or the products it depends on.
+        """
+        parameters = {}
+        for product in self.upstream(name):
+            parameters.update(self._nodes[product]["parameters"])
+        return parameters
+
+    def get(self, name: str, **parameters) -> Any:
+        """
+        Return a product, computing it and any products it depends on that are not already held.
+
+        Parameters are given by name and reach every product that declares them, e.g.
+        graph.get('rolling_corr_spear', resampling_freq=4, window=50). Each product is held separately for every
+        combination of the parameters that reach it, so changing 'window' does not recompute the binned data.
+        """
+        if name not in self._nodes:
+            raise KeyError(f"No product is registered as {name!r}")
+        unknown = [parameter for parameter in parameters
+                   if not any(parameter in node["parameters"] for node in self._nodes.values())]
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+        effective = {parameter: parameters.get(parameter, default)
+                     for parameter, default in self.parameters(name).items()}
+        key = (name, tuple(sorted(effective.items())))
+        if key in self._results:
+            return self._results[key]
+
+        # -------------- READ FROM DISK --------------
+        node = self._nodes[name]
+        path = self.directory / f"{name}-{self._digest(name, effective)}" if node["persist"] else None
+        if path is not None:
+            for stored in sorted(self.directory.glob(f"{path.name}.*")):
+                try:
+                    self._results[key] = read_frame(stored)
+                    return self._results[key]
+                except (OSError, ValueError, ImportError):
+                    continue
+
+        # -------------- COMPUTE --------------
+        arguments = {product: self.get(product, **parameters) for product in node["inputs"]}
+        arguments.update({parameter: effective[parameter] for parameter in node["parameters"]})
+        result = node["function"](**arguments)
+        if path is not None and isinstance(result, DataFrame):
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_frame(result, path)
+        self._results[key] = result
+        return result
+
+    def _digest(self, name: str, parameters: dict[str, Any]) -> str:
+        # A hash of the parameters, and of the data sources and code files of the product and everything it depends on:
+        # the module of each function and those of the helpers of the repository it calls, as in cached_result
+        digest = hashlib.sha1(json.dumps(parameters, sort_keys=True, default=str).encode())
+        for product in self.upstream(name):
+            node = self._nodes[product]
+            code_files = _code_files(node["function"])
+            if not code_files:
+                # Functions without a source file (e.g. defined interactively) are identified by their bytecode
+                digest.update(node["function"].__code__.co_code)
+            for path in code_files:
+                digest.update(_source_hash(path).encode())
+            for source in node["sources"]:
+                digest.update(_source_hash(Path(source)).encode())
+        return digest.hexdigest()
+
+    def evaluated(self) -> list[str]:
+        """
+        The products held in memory, in the order they were computed or read.
+        """
+        return list(dict.fromkeys(name for name, _ in self._results))
+
+    def clear(self, disk: bool = False) -> None:
+        """
+        Forget every product held in memory, and with 'disk' every persisted product too (e.g. after the data change).
+        """
+        self._results.clear()
+        if disk:
+            for name in self._nodes:
+                for path in self.directory.glob(f"{name}-*"):
+                    path.unlink()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._nodes
+
+    def __iter__(self):
+        return iter(self._nodes)
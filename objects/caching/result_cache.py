@@ -0,0 +1,330 @@
+import argparse
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from objects.caching.columnar import CACHE_DIRECTORY, ROOT, hash_file
+from objects.caching.hashing import hash_array, hash_frame
+
+try:
+    import pyarrow  # noqa: F401 (parquet support for pandas)
+except ImportError:  # Fall back to compressed pickles when pyarrow is not installed
+    pyarrow = None
+
+# The directory holding the cached results, with one sub-directory per function
+RESULT_DIRECTORY = CACHE_DIRECTORY / "results"
+# Largest total size of the cached results, in bytes, beyond which the least recently used are removed
+RESULT_CACHE_LIMIT = 512 * 1024 ** 2
+# Set to False to always recompute (or set the environment variable RESULT_CACHE=0)
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE", "1") != "0"
+# File hashes of the sources and code files, kept while their size and modification time are unchanged
+_SOURCE_HASHES = {}
+
+
+# -------------- KEYS --------------
+def _source_hash(path: Path) -> str:
+    # The hash of a source file, or of every file under a source directory
+    path = ROOT / path
+    files = sorted(file for file in path.rglob("*") if file.is_file()) if path.is_dir() else [path]
+    digest = hashlib.sha1()
+    for file in files:
+        status = file.stat()
+        stamp = (str(file), status.st_size, status.st_mtime_ns)
+        if stamp not in _SOURCE_HASHES:
+            _SOURCE_HASHES[stamp] = hash_file(file)
+        digest.update(f"{file.relative_to(ROOT)}{_SOURCE_HASHES[stamp]}".encode())
+    return digest.hexdigest()
+
+
+def _code_files(function: Callable) -> list[Path]:
+    # The source file of a function and, transitively, of the functions, classes and modules of the repository that it
+    # refers to by name (e.g. sliding_pearson or detect_changepoints imported from another module)
+    files, seen, pending = set(), set(), [function]
+    while pending:
+        item = inspect.unwrap(pending.pop())
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            path = Path(inspect.getsourcefile(item)).resolve()
+        except TypeError:
+            continue
+        if ROOT not in path.parents or not path.is_file():
+            # Installed libraries (and code without a file, e.g. typed at the prompt) are not followed
+            continue
+        files.add(path)
+        if inspect.isfunction(item):
+            codes, names = [item.__code__], set()
+            while codes:
+                code = codes.pop()
+                names.update(code.co_names)
+                codes.extend(constant for constant in code.co_consts if inspect.iscode(constant))
+            pending.extend(item.__globals__[name] for name in names if name in item.__globals__ and (
+                inspect.isfunction(item.__globals__[name]) or inspect.isclass(item.__globals__[name])
+                or inspect.ismodule(item.__globals__[name])))
+    return sorted(files)
+
+
+def _argument_key(value) -> str:
+    # A stable text key of one argument value; None where the value cannot be keyed by its content
+    if isinstance(value, DataFrame):
+        return f"frame:{hash_frame(value)}"
+    if isinstance(value, Series):
+        return f"series:{hash_frame(value.to_frame())}"
+    if isinstance(value, np.ndarray):
+        return f"array:{hash_array(value)}"
+    if isinstance(value, (np.generic, str, int, float, bool, type(None))):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        keys = [_argument_key(item) for item in value]
+        return None if None in keys else f"{type(value).__name__}({','.join(keys)})"
+    if isinstance(value, dict):
+        keys = {str(name): _argument_key(item) for name, item in value.items()}
+        return None if None in keys.values() else json.dumps(keys, sort_keys=True)
+    if isinstance(value, Path):
+        return f"path:{value}"
+    return None
+
+
+# -------------- STORAGE --------------
+def _write_result(result, path: Path) -> Path:
+    # Store a result as a compressed columnar file: Parquet (zstd) for frames, compressed npz for arrays, and a
+    # compressed pickle for anything else
+    if isinstance(result, DataFrame) and pyarrow is not None:
+        target = path.with_name(path.name + ".parquet")
+        try:
+            result.to_parquet(target, compression="zstd")
+            return target
+        except (TypeError, ValueError, ImportError):
+            # Frames that Parquet cannot store (e.g. mixed-type object columns) are pickled
+            target.unlink(missing_ok=True)
+    if isinstance(result, np.ndarray) or (isinstance(result, tuple) and result
+                                          and all(isinstance(item, np.ndarray) for item in result)):
+        target = path.with_name(path.name + ".npz")
+        arrays = {"result": result} if isinstance(result, np.ndarray) else {f"item_{i}": item
+                                                                             for i, item in enumerate(result)}
+        with open(target, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        return target
+    target = path.with_name(path.name + ".pkl.gz")
+    pd.to_pickle(result, target, compression="gzip")
+    return target
+
+
+def _read_result(path: Path):
+    # Read a result written by _write_result
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    if path.suffix == ".npz":
+        with np.load(path, allow_pickle=False) as arrays:
+            if "result" in arrays.files:
+                return arrays["result"]
+            return tuple(arrays[f"item_{i}"] for i in range(len(arrays.files)))
+    return pd.read_pickle(path, compression="gzip")
+
+
+def _entries(directory: Path = RESULT_DIRECTORY) -> list[dict]:
+    # The metadata of every cached result
+    entries = []
+    for metadata in Path(directory).glob("*/*.json"):
+        try:
+            entry = json.loads(metadata.read_text())
+        except (OSError, ValueError):
+            continue
+        entry["metadata"] = str(metadata)
+        entries.append(entry)
+    return entries
+
+
+def _remove(entry: dict) -> None:
+    # Remove one cached result and its metadata
+    metadata = Path(entry["metadata"])
+    (metadata.parent / entry["file"]).unlink(missing_ok=True)
+    metadata.unlink(missing_ok=True)
+
+
+def prune(limit: int = RESULT_CACHE_LIMIT, function: str = None, directory: Path = RESULT_DIRECTORY) -> list[dict]:
+    """
+    Remove the least recently used results until the cache (or the results of one function) fits in 'limit' bytes.
+
+    Returns the metadata of the removed results.
+    """
+    entries = [entry for entry in _entries(directory) if function is None or entry["function"] == function]
+    entries.sort(key=lambda entry: entry["last_used"])
+    total = sum(entry["bytes"] for entry in entries)
+    removed = []
+    for entry in entries:
+        if total <= limit:
+            break
+        _remove(entry)
+        total -= entry["bytes"]
+        removed.append(entry)
+    return removed
+
+
+# -------------- DECORATOR --------------
+def cached_result(sources: tuple[str, ...] = (), version: str = "1", ignore: tuple[str, ...] = (),
+                  directory: Path = RESULT_DIRECTORY, limit: int = RESULT_CACHE_LIMIT) -> Callable[[Callable], Callable]:
+    """
+    Keep the results of a function on disk, keyed by its arguments, its data sources and its code.
+
+    Parameters:
+    - sources (tuple[str, ...], optional): The data files or directories, relative to the repository root, that the
+      function reads besides its arguments (e.g. 'data/misc/rohling_SL_LR04.csv').
+    - version (str, optional): A version to bump when a change the key cannot see (e.g. in an installed library or a
+      helper reached through an attribute of an object) alters the results (default: '1').
+    - ignore (tuple[str, ...], optional): Arguments that do not change the result (e.g. 'workers').
+    - directory (Path, optional): The cache (default: data/.cache/results).
+    - limit (int, optional): The size of the whole cache in bytes kept after each new result (default:
+      RESULT_CACHE_LIMIT).
+
+    Returns:
+    - The decorator. The decorated function has a 'cache_key' attribute giving the key of a call, or None for calls
+      that are not cached.
+
+    The key combines the version, the hash of every source, the hash of the module defining the function and of the
+    modules of the repository holding the helpers it calls (followed through their own calls, e.g. sliding_pearson
+    under rolling_significance), and the values of the arguments with their defaults filled in, hashing DataFrames
+    and arrays by their content. Calls with arguments that cannot be keyed by content (e.g. matplotlib axes) are
+    passed straight through. Results are stored as zstd Parquet (DataFrames), compressed npz (arrays and tuples of
+    arrays) or gzip pickles (anything else), and the least recently used are pruned once the cache outgrows 'limit'.
+    A cache that cannot be written (e.g. a read-only or full disk) only means the result is computed every time.
+    Inspect and prune the cache with 'python -m objects.caching.result_cache'.
+    """
+    def decorate(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+        name = f"{function.__module__}.{function.__qualname__}"
+        function_directory = Path(directory) / name
+        # The source files of the function and its helpers, found on the first call once every helper is defined
+        code_files = []
+
+        def cache_key(*args, **kwargs) -> str | None:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {}
+            for argument, value in bound.arguments.items():
+                if argument in ignore:
+                    continue
+                key = _argument_key(value)
+                if key is None:
+                    return None
+                arguments[argument] = key
+            if not code_files:
+                code_files.extend(_code_files(function))
+            digest = hashlib.sha1(f"{name}{version}".encode())
+            if not code_files:
+                # Functions without a source file (e.g. defined interactively) are identified by their bytecode
+                digest.update(function.__code__.co_code)
+            for path in code_files:
+                digest.update(_source_hash(path).encode())
+            for source in sources:
+                digest.update(_source_hash(Path(source)).encode())
+            digest.update(json.dumps(arguments, sort_keys=True).encode())
+            return digest.hexdigest()
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = cache_key(*args, **kwargs) if RESULT_CACHE_ENABLED else None
+            if key is None:
+                return function(*args, **kwargs)
+            metadata_path = function_directory / f"{key}.json"
+
+            # -------------- READ CACHED RESULT --------------
+            try:
+                metadata = json.loads(metadata_path.read_text())
+                result = _read_result(function_directory / metadata["file"])
+            except (OSError, ValueError, KeyError, ImportError, EOFError):
+                pass
+            else:
+                try:
+                    metadata["last_used"] = time.time()
+                    metadata["hits"] = metadata.get("hits", 0) + 1
+                    metadata_path.write_text(json.dumps(metadata))
+                except OSError:
+                    # A read-only cache still serves its results, without recording their use
+                    pass
+                return result
+
+            # -------------- COMPUTE AND STORE --------------
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - started
+            try:
+                function_directory.mkdir(parents=True, exist_ok=True)
+                path = _write_result(result, function_directory / key)
+                metadata = {"function": name, "key": key, "file": path.name, "bytes": path.stat().st_size,
+                            "seconds": seconds, "created": time.time(), "last_used": time.time(), "hits": 0}
+                metadata_path.write_text(json.dumps(metadata))
+                prune(limit, directory=directory)
+            except OSError:
+                # A read-only or full disk simply means the result is computed every time; any partial files are
+                # removed so that they are not read back
+                for partial in function_directory.glob(f"{key}.*"):
+                    try:
+                        partial.unlink()
+                    except OSError:
+                        pass
+            return result
+
+        wrapper.cache_key = cache_key
+        return wrapper
+
+    return decorate
+
+
+# -------------- COMMAND LINE --------------
+def cache_table(directory: Path = RESULT_DIRECTORY) -> DataFrame:
+    """
+    List the cached results with their function, size, compute time, hits and when they were created and last used.
+    """
+    columns = ["function", "key", "bytes", "seconds", "hits", "created", "last_used"]
+    table = DataFrame(_entries(directory), columns=columns)
+    for column in ("created", "last_used"):
+        table[column] = pd.to_datetime(table[column], unit="s").dt.floor("s")
+    return table.sort_values(by="last_used", ascending=False, ignore_index=True)
+
+
+def main(arguments: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m objects.caching.result_cache",
+                                     description="Inspect and prune the on-disk cache of analysis results.")
+    parser.add_argument("--directory", type=Path, default=RESULT_DIRECTORY, help="The cache directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("list", help="List the cached results, most recently used first.")
+    show.add_argument("--function", help="Only list the results of this function.")
+    summary = commands.add_parser("summary", help="Total the cached results of each function.")
+    summary.add_argument("--function", help="Only total the results of this function.")
+    shrink = commands.add_parser("prune", help="Remove the least recently used results beyond a size limit.")
+    shrink.add_argument("--limit", type=float, default=RESULT_CACHE_LIMIT / 1024 ** 2, help="The limit in MB.")
+    shrink.add_argument("--function", help="Only prune the results of this function.")
+    clear = commands.add_parser("clear", help="Remove every cached result (of one function).")
+    clear.add_argument("--function", help="Only remove the results of this function.")
+    options = parser.parse_args(arguments)
+
+    table = cache_table(options.directory)
+    if options.function is not None:
+        table = table[table.function == options.function]
+    if options.command == "list":
+        print(table.to_string(index=False) if len(table) else "The cache is empty")
+    elif options.command == "summary":
+        totals = table.groupby("function").agg(results=("key", "size"), bytes=("bytes", "sum"),
+                                                seconds=("seconds", "sum"), hits=("hits", "sum"))
+        print(totals.to_string() if len(totals) else "The cache is empty")
+    elif options.command == "prune":
+        removed = prune(int(options.limit * 1024 ** 2), options.function, options.directory)
+        print(f"Removed {len(removed)} results ({sum(entry['bytes'] for entry in removed) / 1024 ** 2:.1f} MB)")
+    else:
+        removed = prune(0, options.function, options.directory)
+        print(f"Removed {len(removed)} results")
+
+
+if __name__ == "__main__":
+    main()
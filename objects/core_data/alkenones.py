@@ -1,16 +1,27 @@
 import os
 
-import pandas as pd
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/comparisons"):
     os.chdir('../..')
 
-# Load the Alkenone SST datasets
-sst_593 = pd.read_csv("data/comparisons/alkenones/593_alkenones.csv")  # New Zealand
-sst_594 = pd.read_csv("data/comparisons/alkenones/594_alkenones.csv")  # New Zealand
-sst_846 = pd.read_csv("data/comparisons/alkenones/846_alkenones.csv")  # EEP, Near Mexico
-sst_1012 = pd.read_csv("data/comparisons/alkenones/1012_alkenones.csv")  # California
-sst_1208 = pd.read_csv("data/comparisons/alkenones/1208_alkenones.csv")  # NW Pacific
-sst_1417 = pd.read_csv("data/comparisons/alkenones/1417_alkenones.csv")  # Gulf of Alaska
-sst_882 = pd.read_csv("data/comparisons/alkenones/882_alkenones.csv")  # Gulf of Okhotsk
-sst_806 = pd.read_csv("data/comparisons/alkenones/806_alkenones.csv")  # WEP, Near New Guinea
\ No newline at end of file
+# Register the Alkenone SST datasets, which are loaded on first use
+registry.register_csv("593", "alkenones", "data/comparisons/alkenones/593_alkenones.csv")  # New Zealand
+registry.register_csv("594", "alkenones", "data/comparisons/alkenones/594_alkenones.csv")  # New Zealand
+registry.register_csv("846", "alkenones", "data/comparisons/alkenones/846_alkenones.csv")  # EEP, Near Mexico
+registry.register_csv("1012", "alkenones", "data/comparisons/alkenones/1012_alkenones.csv")  # California
+registry.register_csv("1208", "alkenones", "data/comparisons/alkenones/1208_alkenones.csv")  # NW Pacific
+registry.register_csv("1417", "alkenones", "data/comparisons/alkenones/1417_alkenones.csv")  # Gulf of Alaska
+registry.register_csv("882", "alkenones", "data/comparisons/alkenones/882_alkenones.csv")  # Gulf of Okhotsk
+registry.register_csv("806", "alkenones", "data/comparisons/alkenones/806_alkenones.csv")  # WEP, Near New Guinea
+
+__getattr__ = lazy_names(__name__, {
+    "sst_593": ("593", "alkenones"),
+    "sst_594": ("594", "alkenones"),
+    "sst_846": ("846", "alkenones"),
+    "sst_1012": ("1012", "alkenones"),
+    "sst_1208": ("1208", "alkenones"),
+    "sst_1417": ("1417", "alkenones"),
+    "sst_882": ("882", "alkenones"),
+    "sst_806": ("806", "alkenones"),
+})
@@ -1,14 +1,32 @@
 import os
 
-from pandas import read_csv
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the Oxygen Isotope datasets
-iso_925 = read_csv("data/ceara_rise/925_d18O.csv").dropna(subset="d18O_corr").sort_values(by="age_ka")
-iso_927 = read_csv("data/ceara_rise/927_d18O.csv").dropna(subset="d18O_corr").sort_values(by="age_ka")
-iso_929 = read_csv("data/ceara_rise/929_d18O.csv").dropna(subset="d18O_corr").sort_values(by="age_ka")
 
-iso_925_cibs = iso_925[iso_925.type == "CWUE"]
-iso_929_cibs = iso_929[iso_929.type == "CWUE"]
+def _prepare_ceara(data):
+    return data.dropna(subset="d18O_corr").sort_values(by="age_ka")
+
+
+def _cibs(site):
+    iso = registry.get(site, "d18O")
+    return iso[iso.type == "CWUE"]
+
+
+# Register the Oxygen Isotope datasets, which are loaded on first use
+registry.register_csv("925", "d18O", "data/ceara_rise/925_d18O.csv", _prepare_ceara)
+registry.register_csv("927", "d18O", "data/ceara_rise/927_d18O.csv", _prepare_ceara)
+registry.register_csv("929", "d18O", "data/ceara_rise/929_d18O.csv", _prepare_ceara)
+
+registry.register("925", "cibs", lambda: _cibs("925"))
+registry.register("929", "cibs", lambda: _cibs("929"))
+
+__getattr__ = lazy_names(__name__, {
+    "iso_925": ("925", "d18O"),
+    "iso_927": ("927", "d18O"),
+    "iso_929": ("929", "d18O"),
+    "iso_925_cibs": ("925", "cibs"),
+    "iso_929_cibs": ("929", "cibs"),
+})
@@ -1,14 +1,21 @@
 import os
 
-import pandas as pd
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/comparisons"):
     os.chdir('../..')
 
-# Load the Oxygen Isotope datasets - Uvigerina
-core_top_1209_uvi = pd.read_csv("data/comparisons/1209_core_tops_uvi.csv")
-core_top_1208 = pd.read_csv("data/comparisons/1208_core_tops_uvi.csv")
+# Register the Oxygen Isotope datasets - Uvigerina, which are loaded on first use
+registry.register_csv("1209", "core_tops_uvi", "data/comparisons/1209_core_tops_uvi.csv")
+registry.register_csv("1208", "core_tops_uvi", "data/comparisons/1208_core_tops_uvi.csv")
 
-core_top_1209_cibs = pd.read_csv("data/comparisons/1209_core_tops_cibs.csv")
+registry.register_csv("1209", "core_tops_cibs", "data/comparisons/1209_core_tops_cibs.csv")
 
-bordiga_data = pd.read_csv("data/comparisons/1209_bordiga.csv")
\ No newline at end of file
+registry.register_csv("1209", "bordiga", "data/comparisons/1209_bordiga.csv")
+
+__getattr__ = lazy_names(__name__, {
+    "core_top_1209_uvi": ("1209", "core_tops_uvi"),
+    "core_top_1208": ("1208", "core_tops_uvi"),
+    "core_top_1209_cibs": ("1209", "core_tops_cibs"),
+    "bordiga_data": ("1209", "bordiga"),
+})
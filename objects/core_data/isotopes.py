@@ -1,22 +1,40 @@
 import os
 
-from pandas import read_csv
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the Oxygen Isotope datasets
-iso_1208 = read_csv("data/cores/1208_cibs.csv").dropna(subset="d18O_unadj")
-iso_1209 = read_csv('data/cores/1209_cibs.csv').dropna(subset="d18O_unadj")
-iso_1207 = read_csv('data/cores/1207_cibs.csv')
-iso_607 = read_csv("data/cores/607_cibs.csv")
-iso_1313 = read_csv("data/cores/U1313_cibs_adj.csv")
-iso_849 = read_csv("data/cores/849_cibs_adj.csv").dropna(subset="d18O")
 
-iso_1014 = read_csv('data/cores/1014_cibs.csv').dropna(subset='d18O')
-iso_1018 = read_csv('data/cores/1018_cibs.csv').dropna(subset='d18O')
+def _adjust_849(data):
+    data = data.dropna(subset="d18O")
+    data["d18O_unadj"] = data['d18O'] - 0.64
+    return data
 
-iso_849["d18O_unadj"] = iso_849['d18O'] - 0.64
 
-uvi_1208 = read_csv('data/cores/1208_uvi.csv').dropna(subset="d18O")
-uvi_1209 = read_csv('data/cores/1209_uvi.csv').dropna(subset="d18O")
\ No newline at end of file
+# Register the Oxygen Isotope datasets, which are loaded on first use
+registry.register_csv("1208", "cibs", "data/cores/1208_cibs.csv", lambda data: data.dropna(subset="d18O_unadj"))
+registry.register_csv("1209", "cibs", "data/cores/1209_cibs.csv", lambda data: data.dropna(subset="d18O_unadj"))
+registry.register_csv("1207", "cibs", "data/cores/1207_cibs.csv")
+registry.register_csv("607", "cibs", "data/cores/607_cibs.csv")
+registry.register_csv("U1313", "cibs", "data/cores/U1313_cibs_adj.csv")
+registry.register_csv("849", "cibs", "data/cores/849_cibs_adj.csv", _adjust_849)
+
+registry.register_csv("1014", "cibs", "data/cores/1014_cibs.csv", lambda data: data.dropna(subset='d18O'))
+registry.register_csv("1018", "cibs", "data/cores/1018_cibs.csv", lambda data: data.dropna(subset='d18O'))
+
+registry.register_csv("1208", "uvi", "data/cores/1208_uvi.csv", lambda data: data.dropna(subset="d18O"))
+registry.register_csv("1209", "uvi", "data/cores/1209_uvi.csv", lambda data: data.dropna(subset="d18O"))
+
+__getattr__ = lazy_names(__name__, {
+    "iso_1208": ("1208", "cibs"),
+    "iso_1209": ("1209", "cibs"),
+    "iso_1207": ("1207", "cibs"),
+    "iso_607": ("607", "cibs"),
+    "iso_1313": ("U1313", "cibs"),
+    "iso_849": ("849", "cibs"),
+    "iso_1014": ("1014", "cibs"),
+    "iso_1018": ("1018", "cibs"),
+    "uvi_1208": ("1208", "uvi"),
+    "uvi_1209": ("1209", "uvi"),
+})
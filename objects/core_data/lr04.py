@@ -1,10 +1,15 @@
 import os
 
-from pandas import read_csv
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the Oxygen Isotope datasets
-iso_lr04 = read_csv("data/comparisons/LR04.csv")
-iso_probstack = read_csv("data/comparisons/probStack.csv")
+# Register the Oxygen Isotope datasets, which are loaded on first use
+registry.register_csv("LR04", "d18O", "data/comparisons/LR04.csv")
+registry.register_csv("probStack", "d18O", "data/comparisons/probStack.csv")
+
+__getattr__ = lazy_names(__name__, {
+    "iso_lr04": ("LR04", "d18O"),
+    "iso_probstack": ("probStack", "d18O"),
+})
@@ -1,11 +1,16 @@
 import os
 
-import pandas as pd
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the Oxygen Isotope datasets - Uvigerina
-opal_882 = pd.read_csv("data/cores/882_opal.csv")
+# Register the miscellaneous proxy datasets, which are loaded on first use
+registry.register_csv("882", "opal", "data/cores/882_opal.csv")
 
-productivity_1208 = pd.read_csv('data/cores/1208_productivity.csv')
+registry.register_csv("1208", "productivity", "data/cores/1208_productivity.csv")
+
+__getattr__ = lazy_names(__name__, {
+    "opal_882": ("882", "opal"),
+    "productivity_1208": ("1208", "productivity"),
+})
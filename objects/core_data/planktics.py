@@ -1,11 +1,18 @@
 import os
 
-import pandas as pd
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/comparisons"):
     os.chdir('../..')
 
-# Load the Alkenone SST datasets
-planktics_1207 = pd.read_csv("data/comparisons/planktics/planktics_1207A.csv")
-planktics_1208 = pd.read_csv("data/comparisons/planktics/planktics_1208.csv").dropna(subset="d18O")
-planktics_1209 = pd.read_csv("data/comparisons/planktics/planktics_1209A.csv")
\ No newline at end of file
+# Register the planktic datasets, which are loaded on first use
+registry.register_csv("1207", "planktics", "data/comparisons/planktics/planktics_1207A.csv")
+registry.register_csv("1208", "planktics", "data/comparisons/planktics/planktics_1208.csv",
+                      lambda data: data.dropna(subset="d18O"))
+registry.register_csv("1209", "planktics", "data/comparisons/planktics/planktics_1209A.csv")
+
+__getattr__ = lazy_names(__name__, {
+    "planktics_1207": ("1207", "planktics"),
+    "planktics_1208": ("1208", "planktics"),
+    "planktics_1209": ("1209", "planktics"),
+})
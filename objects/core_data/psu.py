@@ -1,24 +1,32 @@
 import os
 
-from pandas import read_csv
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the PSU datasets
-psu_1208 = read_csv("data/cores/1208_psu.csv").dropna()
-psu_1209_no_mPWP = read_csv("data/cores/1209_psu.csv").dropna()
-psu_607 = read_csv("data/cores/607_psu.csv").dropna()
-psu_1313 = read_csv("data/cores/U1313_psu.csv").dropna()
-
-psu_1209 = read_csv("data/cores/1209_psu_mPWP.csv")
-
-psu_core_tops_1209 = read_csv("data/cores/1209_psu_core_tops.csv").dropna()
-psu_core_tops_1208 = read_csv("data/cores/1208_core_tops_psu.csv").dropna()
-
-psu_1014 = read_csv("data/cores/1014_psu.csv").dropna()
-psu_1018 = read_csv("data/cores/1018_psu.csv").dropna()
-
-psu_1209 = psu_1209.astype("float")
-psu_1208 = psu_1208.astype("float")
-
+# Register the PSU datasets, which are loaded on first use
+registry.register_csv("1208", "psu", "data/cores/1208_psu.csv", lambda data: data.dropna().astype("float"))
+registry.register_csv("1209", "psu_no_mPWP", "data/cores/1209_psu.csv", lambda data: data.dropna())
+registry.register_csv("607", "psu", "data/cores/607_psu.csv", lambda data: data.dropna())
+registry.register_csv("U1313", "psu", "data/cores/U1313_psu.csv", lambda data: data.dropna())
+
+registry.register_csv("1209", "psu", "data/cores/1209_psu_mPWP.csv", lambda data: data.astype("float"))
+
+registry.register_csv("1209", "psu_core_tops", "data/cores/1209_psu_core_tops.csv", lambda data: data.dropna())
+registry.register_csv("1208", "psu_core_tops", "data/cores/1208_core_tops_psu.csv", lambda data: data.dropna())
+
+registry.register_csv("1014", "psu", "data/cores/1014_psu.csv", lambda data: data.dropna())
+registry.register_csv("1018", "psu", "data/cores/1018_psu.csv", lambda data: data.dropna())
+
+__getattr__ = lazy_names(__name__, {
+    "psu_1208": ("1208", "psu"),
+    "psu_1209_no_mPWP": ("1209", "psu_no_mPWP"),
+    "psu_607": ("607", "psu"),
+    "psu_1313": ("U1313", "psu"),
+    "psu_1209": ("1209", "psu"),
+    "psu_core_tops_1209": ("1209", "psu_core_tops"),
+    "psu_core_tops_1208": ("1208", "psu_core_tops"),
+    "psu_1014": ("1014", "psu"),
+    "psu_1018": ("1018", "psu"),
+})
@@ -0,0 +1,110 @@
+from pathlib import Path
+from typing import Callable
+
+from pandas import DataFrame
+
+from objects.caching.columnar import read_cached_csv
+
+# The repository root, so that datasets load the same way whatever the working directory
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class DatasetRegistry:
+    """
+    A registry of the core datasets, keyed by (site, proxy).
+
+    Each dataset is registered with a loader and only read the first time it is requested. The loaded DataFrame is
+    kept, so every later request (from any module) returns the same object. With 'compact' set, datasets are stored with
+    the compact dtypes of objects.core_data.schema (float32 measurements, categorical labels, unused columns dropped).
+    """
+
+    def __init__(self, compact: bool = False):
+        self._loaders = {}
+        self._datasets = {}
+        self._footprints = {}
+        # Whether datasets are passed through objects.core_data.schema.compact_frame when they are loaded
+        self.compact = compact
+
+    def register(self, site: str, proxy: str, loader: Callable[[], DataFrame]) -> None:
+        """
+        Register a loader (a function with no arguments returning a DataFrame) for a dataset.
+        """
+        self._loaders[(site, proxy)] = loader
+        self._datasets.pop((site, proxy), None)
+
+    def register_csv(self, site: str, proxy: str, path: str,
+                     prepare: Callable[[DataFrame], DataFrame] = None) -> None:
+        """
+        Register a dataset read from a CSV file (relative to the repository root), optionally passed through a
+        'prepare' function (e.g. to drop missing values) after it is read. The CSV is read through the binary cache in
+        objects.caching.columnar.
+        """
+        def loader() -> DataFrame:
+            data = read_cached_csv(ROOT / path)
+            return data if prepare is None else prepare(data)
+
+        self.register(site, proxy, loader)
+
+    def get(self, site: str, proxy: str) -> DataFrame:
+        """
+        Return the dataset for (site, proxy), loading it on the first request.
+        """
+        key = (site, proxy)
+        if key not in self._datasets:
+            if key not in self._loaders:
+                raise KeyError(f"No dataset is registered for site {site!r} and proxy {proxy!r}")
+            data = self._loaders[key]()
+            self._footprints[key] = int(data.memory_usage(deep=True).sum())
+            if self.compact:
+                from objects.core_data.schema import compact_frame
+                data = compact_frame(data, proxy)
+            self._datasets[key] = data
+        return self._datasets[key]
+
+    def footprint(self, site: str, proxy: str) -> int:
+        """
+        The bytes used by a loaded dataset as it was read, before any compaction.
+        """
+        return self._footprints[(site, proxy)]
+
+    def keys(self) -> list[tuple[str, str]]:
+        """
+        All registered (site, proxy) keys.
+        """
+        return list(self._loaders)
+
+    def loaded(self) -> list[tuple[str, str]]:
+        """
+        The (site, proxy) keys of the datasets that have been loaded so far.
+        """
+        return list(self._datasets)
+
+    def clear(self) -> None:
+        """
+        Forget every loaded dataset, so that the next request reads it again.
+        """
+        self._datasets.clear()
+        self._footprints.clear()
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._loaders
+
+
+registry = DatasetRegistry()
+
+
+def lazy_names(module_name: str, names: dict[str, tuple[str, str]]) -> Callable[[str], DataFrame]:
+    """
+    Build a module level __getattr__ that maps the historic dataset names of a module (e.g. 'iso_1208') onto registry
+    keys, so that 'from module import iso_1208' only loads that dataset.
+
+    A 'from' import still loads the dataset when the importing module is imported. Modules that are imported by others
+    (e.g. methods/paper/plotting.py) import the dataset module instead and read 'isotopes.iso_1208' inside the functions
+    that use it.
+    """
+    def __getattr__(name: str) -> DataFrame:
+        if name in names:
+            return registry.get(*names[name])
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+    return __getattr__
@@ -0,0 +1,75 @@
+import numpy as np
+from pandas import DataFrame
+from pandas.api.types import is_string_dtype
+
+from objects.core_data.registry import registry
+
+# Columns that hold ages or depths keep full precision, since bin and interval edges are compared against them
+EXACT_COLUMNS = {"age_ka", "Age_orig", "age_orig", "age_lower", "age_upper", "age_lower95", "age_upper95",
+                 "lower95_age", "upper95_age", "lower_age", "upper_age", "age_start", "age_end", "age_ma",
+                 "mcd", "mbsf", "rmcd", "depth", "depth (mcd)"}
+# Text columns with a few repeated labels
+CATEGORICAL_COLUMNS = {"Species", "species", "type", "Type", "glacial", "label", "Reference"}
+# The largest change a measurement may take from being stored as float32
+FLOAT32_TOLERANCE = 1e-5
+
+# Per-proxy schemas, listing any further columns to keep at full precision and the columns never used in the analyses
+SCHEMAS = {
+    "sea_level": {
+        "drop": ["V_LIS", "V_EIS", "V_AIS", "V_GrIS", "d18O_LIS", "d18O_EIS", "d18O_AIS", "d18O_GrIS", "d18O_T", "Tw"]
+    },
+    "uvi": {
+        "drop": ["Notes", "Unnamed: 5"]
+    },
+    "mis_boundaries": {
+        "exact": ["interval"]
+    },
+}
+
+
+def compact_frame(frame: DataFrame, proxy: str = None) -> DataFrame:
+    """
+    Return a copy of 'frame' with a smaller memory footprint, following the schema for 'proxy'.
+
+    Parameters:
+    - frame (pandas.DataFrame): The dataset to compact.
+    - proxy (str, optional): The proxy of the dataset (e.g. 'psu', 'cibs', 'sea_level'), used to look up its schema.
+
+    Returns:
+    - pandas.DataFrame: The dataset with unused columns dropped, label columns stored as categoricals and measurement
+      columns stored as float32 wherever that changes no value by more than FLOAT32_TOLERANCE. Age and depth columns
+      keep full precision.
+    """
+    schema = SCHEMAS.get(proxy, {})
+    frame = frame.drop(columns=[column for column in schema.get("drop", []) if column in frame.columns])
+    exact = EXACT_COLUMNS | set(schema.get("exact", []))
+
+    columns = {}
+    for column in frame.columns:
+        values = frame[column]
+        if column in CATEGORICAL_COLUMNS and is_string_dtype(values):
+            columns[column] = values.astype("category")
+        elif column not in exact and values.dtype == np.float64:
+            compact = values.astype(np.float32)
+            if np.nanmax(np.abs(compact.to_numpy(dtype=float) - values.to_numpy()), initial=0.0) <= FLOAT32_TOLERANCE:
+                columns[column] = compact
+    return frame.assign(**columns) if columns else frame
+
+
+def memory_report() -> DataFrame:
+    """
+    List the memory used by every dataset loaded through the registry, as loaded and once compacted.
+
+    Returns:
+    - pandas.DataFrame: One row per dataset with the site, proxy, number of rows and columns, the bytes used as read
+      from file ('bytes_loaded'), the bytes used once compacted ('bytes_compact') and the fraction saved.
+    """
+    rows = []
+    for site, proxy in registry.loaded():
+        frame = registry.get(site, proxy)
+        loaded = registry.footprint(site, proxy)
+        compact = int(compact_frame(frame, proxy).memory_usage(deep=True).sum())
+        rows.append({"site": site, "proxy": proxy, "rows": len(frame), "columns": frame.shape[1],
+                     "bytes_loaded": loaded, "bytes_compact": compact, "saving": 1 - (compact / loaded)})
+    report = DataFrame(rows, columns=["site", "proxy", "rows", "columns", "bytes_loaded", "bytes_compact", "saving"])
+    return report.sort_values(by="bytes_loaded", ascending=False, ignore_index=True)
@@ -1,15 +1,22 @@
 import os
 
-from pandas import read_csv
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/cores"):
     os.chdir('../..')
 
-# Load the Trace Element datasets
-te_1208 = read_csv("data/cores/1208_te.csv")
-te_1209 = read_csv("data/cores/1209_te.csv").sort_values(by=['mcd'])
+# Register the Trace Element datasets, which are loaded on first use
+registry.register_csv("1208", "te", "data/cores/1208_te.csv")
+registry.register_csv("1209", "te", "data/cores/1209_te.csv", lambda data: data.sort_values(by=['mcd']))
 
-te_849 = read_csv("data/cores/849_te.csv")
+registry.register_csv("849", "te", "data/cores/849_te.csv")
 
 
-bca_1209 = read_csv("data/cores/1209_BCa.csv")
+registry.register_csv("1209", "BCa", "data/cores/1209_BCa.csv")
+
+__getattr__ = lazy_names(__name__, {
+    "te_1208": ("1208", "te"),
+    "te_1209": ("1209", "te"),
+    "te_849": ("849", "te"),
+    "bca_1209": ("1209", "BCa"),
+})
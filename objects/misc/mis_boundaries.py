@@ -1,9 +1,85 @@
 import os
 
-import pandas as pd
+import numpy as np
+from pandas import DataFrame
+
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/misc"):
     os.chdir('../..')
 
+# The age (ka) of the Pliocene-Pleistocene boundary used to split the records, older ages being Pliocene
+PLIOCENE_BOUNDARY = 2700
+
+# Register the MIS boundaries, which are loaded on first use
+registry.register_csv("global", "mis_boundaries", "data/misc/MIS_boundaries.csv")
+
+__getattr__ = lazy_names(__name__, {"mis_boundaries": ("global", "mis_boundaries")})
+
+
+# The arrays of _mis_lookup and the loaded boundaries they were built from, rebuilt when the registry reloads them
+_lookup = {}
+
+
+def _mis_lookup() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # The MIS boundaries as sorted arrays of start and end ages, interval names and glacial flags
+    loaded = registry.get("global", "mis_boundaries")
+    if _lookup.get("boundaries") is not loaded:
+        boundaries = loaded.sort_values(by="age_start")
+        starts = boundaries.age_start.to_numpy(dtype=float)
+        ends = boundaries.age_end.to_numpy(dtype=float)
+        if np.any(starts[1:] < ends[:-1]):
+            raise ValueError("MIS intervals must not overlap")
+        names = boundaries.interval.to_numpy(dtype=object)
+        glacial = (boundaries.glacial == "glacial").to_numpy()
+        _lookup.update(boundaries=loaded, arrays=(starts, ends, names, glacial))
+    return _lookup["arrays"]
+
+
+def classify_mis(ages: np.ndarray, pliocene_boundary: float = PLIOCENE_BOUNDARY) -> DataFrame:
+    """
+    Classify ages by marine isotope stage.
+
+    Parameters:
+    - ages (numpy.ndarray): The ages to classify (ka).
+    - pliocene_boundary (float, optional): The age (ka) above which an age is Pliocene rather than Pleistocene
+      (default: 2700).
+
+    Returns:
+    - pandas.DataFrame: One row per age with the columns 'interval' (the MIS name, or NaN for ages outside every
+      interval), 'glacial' (True within a glacial interval) and 'epoch' ('Pliocene' or 'Pleistocene').
+
+    Each interval covers start <= age < end. The boundaries are read once into sorted arrays, and every age is placed
+    with a single binary search rather than comparing each age against every interval.
+    """
+    starts, ends, names, glacial = _mis_lookup()
+    ages = np.asarray(ages, dtype=float)
+    index = np.searchsorted(starts, ages, side="right") - 1
+    inside = (index >= 0) & (ages < ends[np.maximum(index, 0)])
+    return DataFrame({
+        "interval": np.where(inside, names[np.maximum(index, 0)], np.nan),
+        "glacial": inside & glacial[np.maximum(index, 0)],
+        "epoch": np.where(ages > pliocene_boundary, "Pliocene", "Pleistocene"),
+    })
+
+
+def label_mis(data: DataFrame, age_column: str = "age_ka", pliocene_boundary: float = PLIOCENE_BOUNDARY) -> DataFrame:
+    """
+    Return a copy of 'data' labelled by marine isotope stage, leaving 'data' itself unchanged.
+
+    Parameters:
+    - data (pandas.DataFrame): The data to label.
+    - age_column (str, optional): The column holding the ages (default: 'age_ka').
+    - pliocene_boundary (float, optional): The age (ka) above which an age is Pliocene (default: 2700).
 
-mis_boundaries = pd.read_csv("data/misc/MIS_boundaries.csv")
+    Returns:
+    - pandas.DataFrame: The data with the added columns 'mis' (the MIS name), 'glacial' (bool), 'epoch' and 'pliocene'
+      (bool).
+    """
+    labels = classify_mis(data[age_column].to_numpy(), pliocene_boundary)
+    return data.assign(
+        mis=labels.interval.to_numpy(),
+        glacial=labels.glacial.to_numpy(),
+        epoch=labels.epoch.to_numpy(),
+        pliocene=(labels.epoch == "Pliocene").to_numpy(),
+    )
@@ -1,9 +1,12 @@
 import os
 
-import pandas as pd
+from objects.core_data.registry import registry, lazy_names
 
 if not os.path.isdir("data/misc"):
     os.chdir('../..')
 
 
-sea_level = pd.read_csv("data/misc/rohling_SL_LR04.csv")
+# Register the sea level reconstruction, which is loaded on first use
+registry.register_csv("global", "sea_level", "data/misc/rohling_SL_LR04.csv")
+
+__getattr__ = lazy_names(__name__, {"sea_level": ("global", "sea_level")})